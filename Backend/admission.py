@@ -0,0 +1,172 @@
+import os
+import math
+import time
+import logging
+from jose import JWTError, jwt
+from fastapi.responses import JSONResponse
+import metrics
+import querylog
+import lanes
+from auth import SECRET_KEY, ALGORITHM
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+
+# Token buckets, in cost units: each request takes its route's cost. All
+# limits are per API worker process.
+ADMISSION_PRINCIPAL_RATE = float(os.getenv("ADMISSION_PRINCIPAL_RATE", 2))
+ADMISSION_PRINCIPAL_BURST = float(os.getenv("ADMISSION_PRINCIPAL_BURST", 30))
+ADMISSION_GLOBAL_RATE = float(os.getenv("ADMISSION_GLOBAL_RATE", 10))
+ADMISSION_GLOBAL_BURST = float(os.getenv("ADMISSION_GLOBAL_BURST", 60))
+# Principal buckets kept; idle ones are full and can be forgotten
+MAX_PRINCIPAL_BUCKETS = 10_000
+
+# Cost class of each lane: priority and cost in bucket tokens.
+#   high   - never shed here; money movement is only bounded by its lane
+#   normal - limited per principal
+#   low    - limited per principal and globally, and shed outright while
+#            posting requests are queueing
+COST_CLASSES = {
+    "posting": ("high", 1),
+    "lookups": ("normal", 1),
+    "reports": ("low", 5),
+    "batch": ("low", 10),
+    "uploads": ("low", 10),
+}
+# Routes far more expensive than the rest of their lane
+ROUTE_COSTS = {
+    "/views/report/customer-activity": 10,
+    "/views/report/monthly-interest-distribution": 10,
+    "/tasks/interest-projection": 10,
+    "/views/refresh-views": 20,
+}
+
+
+class TokenBucket:
+    """Classic token bucket. Only used from the event loop, so it needs no lock."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def retry_after(self, cost: float) -> float:
+        """Seconds until `cost` tokens are available."""
+        self._refill()
+        missing = min(cost, self.burst) - self.tokens
+        return max(0.0, missing / self.rate) if self.rate > 0 else 60.0
+
+    def take(self, cost: float):
+        self._refill()
+        self.tokens -= min(cost, self.burst)
+
+    @property
+    def full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.burst
+
+
+global_bucket = TokenBucket(ADMISSION_GLOBAL_RATE, ADMISSION_GLOBAL_BURST)
+principal_buckets = {}
+
+
+def principal_bucket(principal: str) -> TokenBucket:
+    bucket = principal_buckets.get(principal)
+    if bucket is None:
+        if len(principal_buckets) >= MAX_PRINCIPAL_BUCKETS:
+            for key in [k for k, b in principal_buckets.items() if b.full]:
+                del principal_buckets[key]
+        bucket = principal_buckets[principal] = TokenBucket(
+            ADMISSION_PRINCIPAL_RATE, ADMISSION_PRINCIPAL_BURST)
+    return bucket
+
+
+def principal_of(scope) -> str:
+    """Username from the bearer token, or the client address for anonymous calls."""
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                try:
+                    username = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+                    if username:
+                        return f"user:{username}"
+                except JWTError:
+                    pass
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def posting_congested() -> bool:
+    """Posting requests are waiting for a slot: the posting path is degrading."""
+    return lanes.LANES["posting"].waiting > 0
+
+
+def admit(lane: str, route: str, principal: str):
+    """(admitted, reason, retry_after_seconds) for one request."""
+    priority, cost = COST_CLASSES[lane]
+    cost = ROUTE_COSTS.get(route, cost)
+    if priority == "high":
+        return True, None, 0
+
+    if priority == "low" and posting_congested():
+        return False, "posting congested", 1
+
+    bucket = principal_bucket(principal)
+    wait = bucket.retry_after(cost)
+    if wait > 0:
+        return False, "principal limit", wait
+    if priority == "low":
+        wait = global_bucket.retry_after(cost)
+        if wait > 0:
+            return False, "global limit", wait
+        global_bucket.take(cost)
+    bucket.take(cost)
+    return True, None, 0
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware shedding expensive, low-priority requests with 429 and
+    Retry-After before they queue in their lane.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ADMISSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        route = querylog.current_route.get()
+        if route == "background":
+            route = metrics.resolve_route(scope["app"], scope)
+        lane = lanes.classify(scope["method"], route)
+        if lane is None:
+            await self.app(scope, receive, send)
+            return
+
+        admitted, reason, retry_after = admit(lane, route, principal_of(scope))
+        metrics.observe_admission(lane, reason or "admitted")
+        if not admitted:
+            retry_after = max(1, math.ceil(retry_after))
+            logger.info(f"Shed {scope['method']} {route}: {reason}, retry after {retry_after}s")
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": f"Too many expensive requests ({reason}). "
+                                   f"Please retry in {retry_after} seconds."},
+                headers={"Retry-After": str(retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
@@ -7,7 +7,9 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel
 from jose import JWTError, jwt
 from psycopg2.extras import RealDictCursor
-from database import get_db
+from starlette.concurrency import run_in_threadpool
+from database import get_db, pooled_connection
+from cache import principal_cache, normalize_key
 from schemas import Token, TokenData, Etype, AuthenticationCreate, AuthenticationRead
 
 
@@ -38,18 +40,24 @@ def get_password_hash(password):
     return bcrypt.hashpw(password, salt).decode('utf-8')
 
 
-def get_user_by_username(conn, username: str):
+def _load_user(conn, column: str, value: str):
     with conn.cursor(cursor_factory=RealDictCursor) as cursor:
         cursor.execute(
-            "SELECT * FROM authentication WHERE username = %s", (username,))
-        return cursor.fetchone()
+            f"SELECT * FROM authentication WHERE {column} = %s", (value,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+
+def get_user_by_username(conn, username: str):
+    user = principal_cache.get_or_load(
+        ("username", username), lambda: _load_user(conn, "username", username))
+    return dict(user) if user else None
 
 
 def get_user_by_id(conn, user_id: str):
-    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-        cursor.execute(
-            "SELECT * FROM authentication WHERE employee_id = %s", (user_id,))
-        return cursor.fetchone()
+    user = principal_cache.get_or_load(
+        ("employee", normalize_key(user_id)), lambda: _load_user(conn, "employee_id", user_id))
+    return dict(user) if user else None
 
 
 def authenticate_user(conn, username: str, password: str):
@@ -132,8 +140,8 @@ async def login_for_access_token(
     return {"access_token": access_token, "token_type": "bearer"}
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), conn=Depends(get_db)):
-    """Dependency that decodes JWT and returns user row or raises 401."""
+def user_from_token(conn, token: str):
+    """Decode a bearer token and return its user row, or raise 401."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -161,6 +169,24 @@ async def get_current_user(token: str = Depends(oauth2_scheme), conn=Depends(get
     return user
 
 
+async def get_current_user(token: str = Depends(oauth2_scheme), conn=Depends(get_db)):
+    """Dependency that decodes JWT and returns user row or raises 401."""
+    return user_from_token(conn, token)
+
+
+def lookup_user(token: str):
+    with pooled_connection() as conn:
+        return user_from_token(conn, token)
+
+
+async def get_current_user_detached(token: str = Depends(oauth2_scheme)):
+    """
+    get_current_user for long requests such as uploads: the connection goes
+    back to the pool right after the lookup instead of after the response.
+    """
+    return await run_in_threadpool(lookup_user, token)
+
+
 @router.get("/users/me", response_model=AuthenticationRead)
 async def read_users_me(current_user: dict = Depends(get_current_user)):
     """Protected endpoint that returns information about the currently authenticated user."""
@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from schemas import BranchCreate, BranchRead
 from database import get_db
 from auth import get_current_user
+from cache import get_employee_branch, branch_cache, normalize_key
 from typing import Optional
 
 router = APIRouter()
@@ -292,10 +293,7 @@ def get_branch_by_id(branch_id: str, conn=Depends(get_db), current_user=Depends(
 
         # Verify the user belongs to the requested branch
         with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-            cursor.execute("""
-                SELECT branch_id FROM employee WHERE employee_id = %s
-            """, (employee_id,))
-            user_branch = cursor.fetchone()
+            user_branch = get_employee_branch(cursor, employee_id)
 
             if not user_branch or str(user_branch['branch_id']) != str(branch_id):
                 raise HTTPException(
@@ -303,19 +301,22 @@ def get_branch_by_id(branch_id: str, conn=Depends(get_db), current_user=Depends(
     else:
         raise HTTPException(status_code=403, detail="Insufficient permissions")
 
-    try:
+    def load_branch():
         with conn.cursor(cursor_factory=RealDictCursor) as cursor:
             cursor.execute("""
                 SELECT branch_id, branch_name, location, branch_phone_number, status
                 FROM branch 
                 WHERE branch_id = %s
             """, (branch_id,))
-
             row = cursor.fetchone()
-            if not row:
-                raise HTTPException(status_code=404, detail="Branch not found")
+            return dict(row) if row else None
+
+    try:
+        row = branch_cache.get_or_load(normalize_key(branch_id), load_branch)
+        if not row:
+            raise HTTPException(status_code=404, detail="Branch not found")
 
-            return BranchRead(**row)
+        return BranchRead(**row)
 
     except HTTPException:
         raise
@@ -0,0 +1,144 @@
+import os
+import threading
+import logging
+import notifications
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_CHANNEL = "cache_invalidation"
+
+
+class InvalidationCache:
+    """
+    In-process cache whose entries live until a database change evicts them.
+    Entries are only served while the LISTEN connection is up; a lost
+    connection means missed notifications, so the cache is bypassed until
+    the listener reconnects and flushes everything.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._data = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, loader):
+        if not CACHE_ENABLED or not notifications.is_listening():
+            return loader()
+
+        with self._lock:
+            if key in self._data:
+                return self._data[key]
+            generation = self._generation
+
+        value = loader()
+
+        # Drop the value if anything was evicted while it was being loaded,
+        # otherwise a concurrent change could be cached as stale data
+        with self._lock:
+            if generation == self._generation and notifications.is_listening():
+                self._data[key] = value
+        return value
+
+    def evict(self, *keys):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+
+principal_cache = InvalidationCache("principals")
+employee_branch_cache = InvalidationCache("employee_branch")
+branch_cache = InvalidationCache("branches")
+plan_cache = InvalidationCache("plans")
+
+ALL_CACHES = [principal_cache, employee_branch_cache, branch_cache, plan_cache]
+
+
+def normalize_key(value):
+    """CHAR(n) columns come back space padded; cache keys never are."""
+    return value.rstrip() if isinstance(value, str) else value
+
+
+def _changed_values(event, column):
+    values = set()
+    for side in ("old", "new"):
+        keys = event.get(side) or {}
+        if keys.get(column) is not None:
+            values.add(normalize_key(keys[column]))
+    return values
+
+
+def handle_invalidation(event):
+    """Evict the cache entries touched by one cache_invalidation event."""
+    if not isinstance(event, dict):
+        clear_all()
+        return
+
+    table = event.get("table")
+    if event.get("op") == "TRUNCATE":
+        _truncate(table)
+        return
+
+    if table == "authentication":
+        keys = [("username", v) for v in _changed_values(event, "username")]
+        keys += [("employee", v)
+                 for v in _changed_values(event, "employee_id")]
+        principal_cache.evict(*keys)
+    elif table == "employee":
+        employee_branch_cache.evict(*_changed_values(event, "employee_id"))
+    elif table == "branch":
+        branch_cache.evict(*_changed_values(event, "branch_id"))
+    elif table in ("savingsaccount_plans", "fixeddeposit_plans"):
+        plan_cache.evict(table)
+    else:
+        logger.warning(f"Unknown cache invalidation table: {table}")
+
+
+def _truncate(table):
+    caches = {
+        "authentication": principal_cache,
+        "employee": employee_branch_cache,
+        "branch": branch_cache,
+        "savingsaccount_plans": plan_cache,
+        "fixeddeposit_plans": plan_cache,
+    }
+    if table in caches:
+        caches[table].clear()
+    else:
+        clear_all()
+
+
+def clear_all():
+    for cache in ALL_CACHES:
+        cache.clear()
+
+
+def get_employee_branch(cursor, employee_id):
+    """
+    Cached replacement for "SELECT branch_id FROM Employee WHERE employee_id = %s".
+    Returns {"branch_id": ...} or None, like the fetchone() it replaces.
+    """
+    if not employee_id:
+        return None
+
+    def load():
+        cursor.execute(
+            "SELECT branch_id FROM Employee WHERE employee_id = %s", (employee_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return {"branch_id": row["branch_id"] if isinstance(row, dict) else row[0]}
+
+    row = employee_branch_cache.get_or_load(normalize_key(employee_id), load)
+    return dict(row) if row is not None else None
+
+
+notifications.subscribe(CACHE_CHANNEL, handle_invalidation,
+                        on_reconnect=clear_all)
@@ -0,0 +1,122 @@
+import os
+import gzip
+import asyncio
+import metrics
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+# Smaller bodies fit in a packet or two; compressing them only costs CPU
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", 1024))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+# Larger bodies are compressed on a thread instead of the event loop
+COMPRESSION_OFFLOAD_BYTES = 64 * 1024
+
+COMPRESSIBLE_TYPES = ("application/json", "text/csv")
+
+
+def available_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding: str):
+    """Best encoding the client accepts, preferring brotli on ties; None for identity."""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for coding in available_encodings():
+        quality = accepted.get(coding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL)
+
+
+def _header(headers, name: bytes):
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing JSON and CSV response bodies above
+    COMPRESSION_MIN_BYTES with brotli (when installed) or gzip, whichever
+    the client prefers. Streamed responses (SSE, chunked downloads) are
+    passed through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(_header(scope["headers"], b"accept-encoding") or "")
+        start = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start = message
+                return
+
+            headers = start["headers"]
+            content_type = (_header(headers, b"content-type") or "").split(";")[0].strip()
+            eligible = content_type in COMPRESSIBLE_TYPES
+            vary = _header(headers, b"vary")
+            if eligible and "accept-encoding" not in (vary or "").lower():
+                headers = [(k, v) for k, v in headers if k.lower() != b"vary"] + [
+                    (b"vary", f"{vary}, Accept-Encoding".encode() if vary else b"Accept-Encoding")]
+
+            body = message.get("body", b"")
+            if (message.get("more_body") or not eligible or encoding is None
+                    or len(body) < COMPRESSION_MIN_BYTES
+                    or _header(headers, b"content-encoding") is not None):
+                passthrough = True
+                await send({**start, "headers": headers})
+                await send(message)
+                return
+
+            if len(body) >= COMPRESSION_OFFLOAD_BYTES:
+                compressed = await asyncio.get_running_loop().run_in_executor(
+                    None, compress, body, encoding)
+            else:
+                compressed = compress(body, encoding)
+            metrics.observe_compression(encoding, len(body), len(compressed))
+
+            headers = [(k, v) for k, v in headers if k.lower() != b"content-length"] + [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+            ]
+            passthrough = True
+            await send({**start, "headers": headers})
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
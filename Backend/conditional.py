@@ -0,0 +1,119 @@
+import os
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request
+from fastapi.responses import Response
+import metrics
+from cache import normalize_key
+from database import SCHEMA_VERSION
+
+CONDITIONAL_GET_ENABLED = os.getenv("CONDITIONAL_GET_ENABLED", "true").lower() == "true"
+
+# Stripes of the scopes asked for, limited to one branch (plus the global
+# '*' rows) or all of them. CURRENT_DATE is included because several lists
+# and reports depend on the date, so their validators roll over daily.
+MARKER_QUERY = """
+    SELECT scope, SUM(version) AS version, MAX(changed_at) AS changed_at
+    FROM change_markers
+    WHERE scope = ANY(%(scopes)s)
+    AND (%(branch_id)s::text IS NULL OR branch_id IN (%(branch_id)s, '*'))
+    GROUP BY scope
+    UNION ALL
+    SELECT 'today', 0, CURRENT_DATE::timestamptz
+"""
+
+
+class Validators:
+    """ETag and Last-Modified of one response, and whether the client's copy is still current."""
+
+    def __init__(self, etag: str, last_modified: datetime, not_modified: bool):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.not_modified = not_modified
+
+    def headers(self) -> dict:
+        if self.etag is None:
+            return {}
+        # Keep a copy, but revalidate it on every use
+        headers = {"ETag": self.etag, "Cache-Control": "private, no-cache"}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+        return headers
+
+    def not_modified_response(self) -> Response:
+        return Response(status_code=304, headers=self.headers())
+
+    def apply(self, response: Response) -> Response:
+        response.headers.update(self.headers())
+        return response
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # Weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored
+    if header.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == bare for candidate in header.split(","))
+
+
+def _not_modified_since(header: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def evaluate(request: Request, cursor, scopes, branch_id=None, current_user=None) -> Validators:
+    """
+    Validators for a list or report built from `scopes` (see
+    init-scripts/11-change-markers.sql), limited to `branch_id` or covering
+    every branch when it is None. Call it after access checks and before the
+    real query; when `not_modified` is set, return not_modified_response()
+    instead of running it. The ETag also covers the path, the query string
+    and the caller, since those decide which rows are in the response.
+    """
+    if not CONDITIONAL_GET_ENABLED:
+        return Validators(None, None, False)
+
+    branch_id = normalize_key(branch_id)
+    cursor.execute(MARKER_QUERY, {"scopes": list(scopes), "branch_id": branch_id})
+    markers = sorted((row["scope"], row["version"], row["changed_at"]) for row in cursor.fetchall())
+
+    last_modified = max(changed_at for _, _, changed_at in markers).astimezone(timezone.utc)
+    return _validate(request, current_user, (
+        branch_id, [(scope, version, changed_at.isoformat()) for scope, version, changed_at in markers],
+    ), last_modified)
+
+
+def for_content(request: Request, content, current_user=None) -> Validators:
+    """
+    Validators for small responses served from an in-process cache, where
+    hashing the content is cheaper than asking the database what changed.
+    """
+    if not CONDITIONAL_GET_ENABLED:
+        return Validators(None, None, False)
+    return _validate(request, current_user, content, None)
+
+
+def _validate(request: Request, current_user, version, last_modified) -> Validators:
+    caller = (current_user or {}).get("username"), (current_user or {}).get("type")
+    digest = hashlib.sha1(repr((
+        SCHEMA_VERSION, request.url.path, sorted(request.query_params.multi_items()), caller, version,
+    )).encode()).hexdigest()[:20]
+    etag = f'W/"{digest}"'
+
+    # If-None-Match wins when both are sent
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    elif request.headers.get("if-modified-since") and last_modified is not None:
+        not_modified = _not_modified_since(request.headers["if-modified-since"], last_modified)
+    else:
+        not_modified = False
+
+    metrics.observe_conditional_get(not_modified)
+    return Validators(etag, last_modified, not_modified)
@@ -1,8 +1,11 @@
 from psycopg2.extras import RealDictCursor
-from fastapi import HTTPException, APIRouter, Depends
+from fastapi import HTTPException, APIRouter, Depends, Request
 from schemas import CustomerCreate, CustomerRead, CustomerSearchRequest, CustomerUpdateRequest, CustomerStatusRequest
-from database import get_db
+from database import get_db, get_read_db
+from fastjson import model_rows_response
+import conditional
 from auth import get_current_user
+from cache import get_employee_branch
 
 
 router = APIRouter()
@@ -96,7 +99,7 @@ def search_customers(search_request: CustomerSearchRequest, conn=Depends(get_db)
                 raise HTTPException(
                     status_code=404, detail="No customers found")
 
-            return [CustomerRead(**row) for row in rows]
+            return model_rows_response(rows, CustomerRead)
 
     except HTTPException:
         raise
@@ -106,7 +109,7 @@ def search_customers(search_request: CustomerSearchRequest, conn=Depends(get_db)
 
 
 @router.get("/customers/", response_model=list[CustomerRead],)
-def get_all_customers(conn=Depends(get_db), current_user=Depends(get_current_user)) -> list[CustomerRead]:
+def get_all_customers(request: Request, conn=Depends(get_db), current_user=Depends(get_current_user)) -> list[CustomerRead]:
     query = """SELECT customer_id, name, nic, phone_number, address, date_of_birth, email, status, employee_id
             From customer
             """
@@ -118,10 +121,15 @@ def get_all_customers(conn=Depends(get_db), current_user=Depends(get_current_use
 
     try:
         with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            validators = conditional.evaluate(
+                request, cursor, ("customers", "employees"), None, current_user)
+            if validators.not_modified:
+                return validators.not_modified_response()
+
             cursor.execute(query, values)
 
             rows = cursor.fetchall()
-            return [CustomerRead(**row) for row in rows]
+            return validators.apply(model_rows_response(rows, CustomerRead))
 
     except Exception as e:
         raise HTTPException(
@@ -129,7 +137,7 @@ def get_all_customers(conn=Depends(get_db), current_user=Depends(get_current_use
 
 
 @router.get("/customers/agent/{employee_id}", response_model=list[CustomerRead])
-def get_customers_by_agent(employee_id: str, conn=Depends(get_db), current_user=Depends(get_current_user)) -> list[CustomerRead]:
+def get_customers_by_agent(employee_id: str, request: Request, conn=Depends(get_db), current_user=Depends(get_current_user)) -> list[CustomerRead]:
     """
     Get all customers assigned to a specific agent.
     - Agents: Can only view their own customers
@@ -174,11 +182,7 @@ def get_customers_by_agent(employee_id: str, conn=Depends(get_db), current_user=
                         status_code=403, detail="User is not associated with an employee record")
                 
                 # Get branch_id of the current branch manager
-                cursor.execute(
-                    "SELECT branch_id FROM employee WHERE employee_id = %s", 
-                    (current_employee_id,)
-                )
-                manager_row = cursor.fetchone()
+                manager_row = get_employee_branch(cursor, current_employee_id)
                 
                 if not manager_row or not manager_row['branch_id']:
                     raise HTTPException(
@@ -191,6 +195,11 @@ def get_customers_by_agent(employee_id: str, conn=Depends(get_db), current_user=
                         detail="Branch managers can only view customers of agents in their branch")
             
             # Get all customers for the specified agent
+            validators = conditional.evaluate(
+                request, cursor, ("customers", "employees"), agent_row['branch_id'], current_user)
+            if validators.not_modified:
+                return validators.not_modified_response()
+
             cursor.execute("""
                 SELECT customer_id, name, nic, phone_number, address, 
                        date_of_birth, email, status, employee_id
@@ -200,7 +209,7 @@ def get_customers_by_agent(employee_id: str, conn=Depends(get_db), current_user=
             """, (employee_id,))
             
             rows = cursor.fetchall()
-            return [CustomerRead(**row) for row in rows]
+            return validators.apply(model_rows_response(rows, CustomerRead))
     
     except HTTPException:
         raise
@@ -210,7 +219,7 @@ def get_customers_by_agent(employee_id: str, conn=Depends(get_db), current_user=
 
 
 @router.get("/customers/branch", response_model=list[CustomerRead])
-def get_customers_by_branch(conn=Depends(get_db), current_user=Depends(get_current_user)) -> list[CustomerRead]:
+def get_customers_by_branch(request: Request, conn=Depends(get_read_db), current_user=Depends(get_current_user)) -> list[CustomerRead]:
     """
     Get all customers in the same branch as the current branch manager.
     Only branch managers can access this endpoint.
@@ -230,15 +239,18 @@ def get_customers_by_branch(conn=Depends(get_db), current_user=Depends(get_curre
 
         with conn.cursor(cursor_factory=RealDictCursor) as cursor:
             # Get branch_id of the current branch manager
-            cursor.execute(
-                "SELECT branch_id FROM employee WHERE employee_id = %s", (employee_id,))
-            manager_row = cursor.fetchone()
+            manager_row = get_employee_branch(cursor, employee_id)
             if not manager_row or not manager_row['branch_id']:
                 raise HTTPException(
                     status_code=400, detail="Branch manager does not have a branch assigned")
 
             branch_id = manager_row['branch_id']
 
+            validators = conditional.evaluate(
+                request, cursor, ("customers", "employees"), branch_id, current_user)
+            if validators.not_modified:
+                return validators.not_modified_response()
+
             # Get all customers whose employees belong to the same branch
             cursor.execute("""
                 SELECT c.customer_id, c.name, c.nic, c.phone_number, c.address, 
@@ -250,7 +262,7 @@ def get_customers_by_branch(conn=Depends(get_db), current_user=Depends(get_curre
             """, (branch_id,))
 
             rows = cursor.fetchall()
-            return [CustomerRead(**row) for row in rows]
+            return validators.apply(model_rows_response(rows, CustomerRead))
 
     except HTTPException:
         raise
@@ -260,7 +272,7 @@ def get_customers_by_branch(conn=Depends(get_db), current_user=Depends(get_curre
 
 
 @router.get("/customers/agent/{employee_id}/stats")
-def get_agent_customer_stats(employee_id: str, conn=Depends(get_db), current_user=Depends(get_current_user)):
+def get_agent_customer_stats(employee_id: str, conn=Depends(get_read_db), current_user=Depends(get_current_user)):
     """
     Get customer statistics for a specific agent.
     - Agents: Can only view their own statistics
@@ -305,11 +317,7 @@ def get_agent_customer_stats(employee_id: str, conn=Depends(get_db), current_use
                         status_code=403, detail="User is not associated with an employee record")
                 
                 # Get branch_id of the current branch manager
-                cursor.execute(
-                    "SELECT branch_id FROM employee WHERE employee_id = %s", 
-                    (current_employee_id,)
-                )
-                manager_row = cursor.fetchone()
+                manager_row = get_employee_branch(cursor, current_employee_id)
                 
                 if not manager_row or not manager_row['branch_id']:
                     raise HTTPException(
@@ -365,7 +373,7 @@ def get_agent_customer_stats(employee_id: str, conn=Depends(get_db), current_use
 
 
 @router.get("/customers/branch/{branch_id}", response_model=list[CustomerRead])
-def get_customers_by_branch_id(branch_id: str, conn=Depends(get_db), current_user=Depends(get_current_user)) -> list[CustomerRead]:
+def get_customers_by_branch_id(branch_id: str, request: Request, conn=Depends(get_read_db), current_user=Depends(get_current_user)) -> list[CustomerRead]:
     """
     Get all customers under a specific branch ID.
     Only admins and branch managers can access this endpoint.
@@ -389,9 +397,7 @@ def get_customers_by_branch_id(branch_id: str, conn=Depends(get_db), current_use
                         status_code=403, detail="User is not associated with an employee record")
 
                 # Get branch_id of the current branch manager
-                cursor.execute(
-                    "SELECT branch_id FROM employee WHERE employee_id = %s", (employee_id,))
-                manager_row = cursor.fetchone()
+                manager_row = get_employee_branch(cursor, employee_id)
                 if not manager_row or not manager_row['branch_id']:
                     raise HTTPException(
                         status_code=400, detail="Branch manager does not have a branch assigned")
@@ -407,6 +413,11 @@ def get_customers_by_branch_id(branch_id: str, conn=Depends(get_db), current_use
             if not cursor.fetchone():
                 raise HTTPException(status_code=404, detail="Branch not found")
 
+            validators = conditional.evaluate(
+                request, cursor, ("customers", "employees"), branch_id, current_user)
+            if validators.not_modified:
+                return validators.not_modified_response()
+
             # Get all customers whose employees belong to the specified branch
             cursor.execute("""
                 SELECT c.customer_id, c.name, c.nic, c.phone_number, c.address, 
@@ -418,7 +429,7 @@ def get_customers_by_branch_id(branch_id: str, conn=Depends(get_db), current_use
             """, (branch_id,))
 
             rows = cursor.fetchall()
-            return [CustomerRead(**row) for row in rows]
+            return validators.apply(model_rows_response(rows, CustomerRead))
 
     except HTTPException:
         raise
@@ -428,7 +439,7 @@ def get_customers_by_branch_id(branch_id: str, conn=Depends(get_db), current_use
 
 
 @router.get("/customers/branch/{branch_id}/stats")
-def get_branch_customer_stats(branch_id: str, conn=Depends(get_db), current_user=Depends(get_current_user)):
+def get_branch_customer_stats(branch_id: str, conn=Depends(get_read_db), current_user=Depends(get_current_user)):
     """
     Get customer statistics for a specific branch.
     Only admins and branch managers can access this endpoint.
@@ -452,9 +463,7 @@ def get_branch_customer_stats(branch_id: str, conn=Depends(get_db), current_user
                         status_code=403, detail="User is not associated with an employee record")
 
                 # Get branch_id of the current branch manager
-                cursor.execute(
-                    "SELECT branch_id FROM employee WHERE employee_id = %s", (employee_id,))
-                manager_row = cursor.fetchone()
+                manager_row = get_employee_branch(cursor, employee_id)
                 if not manager_row or not manager_row['branch_id']:
                     raise HTTPException(
                         status_code=400, detail="Branch manager does not have a branch assigned")
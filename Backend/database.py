@@ -8,8 +8,20 @@ import psycopg2
 #     "sslmode": "require"
 # }
 import os
+import logging
+import threading
+import time
+from contextlib import contextmanager
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from psycopg2.extensions import TRANSACTION_STATUS_UNKNOWN
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+import metrics
+import lanes
+import querylog
+from querylog import TimedConnection
+
+logger = logging.getLogger(__name__)
 
 # Hardcoded config that works
 # DATABASE_CONFIG = {
@@ -30,10 +42,275 @@ DATABASE_CONFIG = {
     "sslmode": os.getenv("DB_SSLMODE", "disable")
 }
 
+# Highest init-scripts/ migration this code expects (see schema_migrations)
+SCHEMA_VERSION = 17
+
+# Connection pool configuration (per worker process)
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+
+# Optional read replica for report and list routes (see get_read_db)
+DB_REPLICA_HOST = os.getenv("DB_REPLICA_HOST")
+REPLICA_CONFIG = {
+    **DATABASE_CONFIG,
+    "host": DB_REPLICA_HOST,
+    "port": os.getenv("DB_REPLICA_PORT", DATABASE_CONFIG["port"]),
+} if DB_REPLICA_HOST else None
+DB_REPLICA_POOL_MAX = int(os.getenv("DB_REPLICA_POOL_MAX", DB_POOL_MAX))
+# Reads go to the primary while the replica is further behind than this
+DB_REPLICA_MAX_LAG_SECONDS = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", 5))
+# Replica lag is measured at most this often per worker
+DB_REPLICA_LAG_CHECK_SECONDS = float(os.getenv("DB_REPLICA_LAG_CHECK_SECONDS", 2))
+
+
+class PoolTimeout(PoolError):
+    """Raised when no pooled connection became free within DB_POOL_TIMEOUT."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe connection pool that waits for a free connection instead of
+    failing immediately like psycopg2's ThreadedConnectionPool does.
+    Connections are rolled back before going back to the pool.
+    """
+
+    def __init__(self, minconn: int, maxconn: int, timeout: float,
+                 name: str = "primary", **config):
+        self.name = name
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self._config = config
+        self._pool = None
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.waiting = 0
+
+    def _get_pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadedConnectionPool(
+                        self.minconn, self.maxconn, **self._config)
+        return self._pool
+
+    def getconn(self, timeout: float = None):
+        with self._lock:
+            self.waiting += 1
+        started = time.perf_counter()
+        try:
+            acquired = self._slots.acquire(
+                timeout=self.timeout if timeout is None else timeout)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        waited = time.perf_counter() - started
+
+        if not acquired:
+            metrics.observe_pool_checkout(self.name, waited, timed_out=True)
+            raise PoolTimeout("No database connection available")
+
+        try:
+            pool = self._get_pool()
+            conn = pool.getconn()
+            # Replace connections the server has dropped since last use
+            if conn.closed or conn.info.transaction_status == TRANSACTION_STATUS_UNKNOWN:
+                pool.putconn(conn, close=True)
+                conn = pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self.in_use += 1
+        metrics.observe_pool_checkout(self.name, waited)
+        metrics.set_pool_stats(self.name, self.stats())
+        return conn
+
+    def putconn(self, conn):
+        pool = self._get_pool()
+        try:
+            if conn.closed:
+                pool.putconn(conn, close=True)
+            else:
+                try:
+                    conn.rollback()
+                    pool.putconn(conn)
+                except Exception:
+                    pool.putconn(conn, close=True)
+        finally:
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+            metrics.set_pool_stats(self.name, self.stats())
+
+    def stats(self) -> dict:
+        return {
+            "max": self.maxconn,
+            "in_use": self.in_use,
+            "available": self.maxconn - self.in_use,
+            "waiting": self.waiting,
+        }
+
+
+db_pool = ConnectionPool(DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT,
+                         connection_factory=TimedConnection, **DATABASE_CONFIG)
+
+
+class ReplicaMonitor:
+    """
+    Tracks how far the replica is behind the primary. Lag is measured on a
+    checked-out replica connection at most every DB_REPLICA_LAG_CHECK_SECONDS;
+    in between, the last measurement decides. A replica that could not be
+    reached is not retried until the next check is due.
+    """
+
+    LAG_QUERY = """
+        SELECT CASE
+            WHEN NOT pg_is_in_recovery() THEN 0
+            -- Everything received is replayed: an idle primary, not lag
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+        END
+    """
+
+    def __init__(self, max_lag: float, check_interval: float):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag_seconds = None
+        self.error = None
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def check_due(self) -> bool:
+        return time.monotonic() - self.checked_at >= self.check_interval
+
+    @property
+    def usable(self) -> bool:
+        return (self.error is None and self.lag_seconds is not None
+                and self.lag_seconds <= self.max_lag)
+
+    def measure(self, conn):
+        """Refresh the lag from `conn` if no other request is doing so already."""
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(self.LAG_QUERY)
+                self.lag_seconds = float(cursor.fetchone()[0])
+            self.error = None
+            metrics.set_replica_lag(self.lag_seconds)
+        finally:
+            self.checked_at = time.monotonic()
+            self._lock.release()
+
+    def mark_failed(self, error: Exception):
+        self.error = str(error)
+        self.checked_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "usable": self.usable,
+            "lag_seconds": round(self.lag_seconds, 3) if self.lag_seconds is not None else None,
+            "max_lag_seconds": self.max_lag,
+            "error": self.error,
+        }
+
+
+replica_pool = ConnectionPool(DB_POOL_MIN, DB_REPLICA_POOL_MAX, DB_POOL_TIMEOUT, name="replica",
+                              connection_factory=TimedConnection,
+                              **REPLICA_CONFIG) if REPLICA_CONFIG else None
+replica_monitor = ReplicaMonitor(DB_REPLICA_MAX_LAG_SECONDS, DB_REPLICA_LAG_CHECK_SECONDS)
+
+
+def replica_connection():
+    """A replica connection if the replica is reachable and caught up, else None."""
+    if replica_pool is None:
+        return None
+    check_due = replica_monitor.check_due()
+    if not check_due and not replica_monitor.usable:
+        return None
+
+    try:
+        conn = replica_pool.getconn()
+    except PoolTimeout:
+        # A saturated replica pool must not spill dashboard load onto the primary
+        raise
+    except Exception as e:
+        replica_monitor.mark_failed(e)
+        logger.warning(f"Read replica unavailable, reading from primary: {str(e)}")
+        return None
 
-def get_db():
-    conn = psycopg2.connect(**DATABASE_CONFIG)
     try:
+        if check_due:
+            replica_monitor.measure(conn)
+    except Exception as e:
+        replica_monitor.mark_failed(e)
+        logger.warning(f"Read replica lag check failed, reading from primary: {str(e)}")
+    if not replica_monitor.usable:
+        replica_pool.putconn(conn)
+        return None
+    return conn
+
+
+def connect():
+    """Open a dedicated (unpooled) connection whose statements are timed"""
+    return psycopg2.connect(connection_factory=TimedConnection, **DATABASE_CONFIG)
+
+
+def apply_statement_timeout(conn):
+    """Give a checked-out connection its lane's statement_timeout; SET only when it changes."""
+    timeout_ms = lanes.statement_timeout_ms()
+    if getattr(conn, "statement_timeout_ms", None) == timeout_ms:
+        return
+    with conn.cursor() as cursor:
+        if timeout_ms is None:
+            cursor.execute("RESET statement_timeout")
+        else:
+            cursor.execute("SET statement_timeout = %s", (timeout_ms,))
+    # Committed so the rollback in putconn() does not undo it
+    conn.commit()
+    conn.statement_timeout_ms = timeout_ms
+
+
+def lend(pool: ConnectionPool, conn):
+    """Yield a checked-out connection to a request, cancellable while it is lent."""
+    request = querylog.current_request.get()
+    try:
+        apply_statement_timeout(conn)
+        if request is not None:
+            request.attach(conn)
         yield conn
     finally:
-        conn.close()
+        if request is not None:
+            request.detach(conn)
+        pool.putconn(conn)
+
+
+def get_db():
+    conn = db_pool.getconn()
+    yield from lend(db_pool, conn)
+
+
+@contextmanager
+def pooled_connection():
+    """get_db for handlers that must not hold a connection until they need it (uploads)."""
+    conn = db_pool.getconn()
+    yield from lend(db_pool, conn)
+
+
+def get_read_db():
+    """
+    Dependency for read-only routes that can tolerate data up to
+    DB_REPLICA_MAX_LAG_SECONDS old: a replica connection when one is
+    configured and caught up, a primary connection otherwise.
+    """
+    conn = replica_connection()
+    if conn is None:
+        metrics.observe_read_route("primary")
+        yield from get_db()
+        return
+    metrics.observe_read_route("replica")
+    yield from lend(replica_pool, conn)
@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from schemas import EmployeeCreate, EmployeeRead
 from database import get_db
 from auth import get_current_user
+from cache import get_employee_branch
 from datetime import date
 
 router = APIRouter()
@@ -84,9 +85,7 @@ def get_employees(search_request: dict, conn=Depends(get_db), current_user=Depen
                         status_code=403, detail="User is not associated with an employee record")
 
                 # Get the agent's branch_id
-                cursor.execute(
-                    "SELECT branch_id FROM employee WHERE employee_id = %s", (employee_id,))
-                agent_branch = cursor.fetchone()
+                agent_branch = get_employee_branch(cursor, employee_id)
                 if not agent_branch:
                     raise HTTPException(
                         status_code=400, detail="Agent's branch not found")
@@ -116,9 +115,7 @@ def get_employees(search_request: dict, conn=Depends(get_db), current_user=Depen
                     if user_type == 'branch_manager':
                         employee_id = current_user.get('employee_id')
                         if employee_id:
-                            cursor.execute(
-                                "SELECT branch_id FROM employee WHERE employee_id = %s", (employee_id,))
-                            manager_branch = cursor.fetchone()
+                            manager_branch = get_employee_branch(cursor, employee_id)
                             if manager_branch and manager_branch['branch_id'] != search_request['branch_id']:
                                 raise HTTPException(
                                     status_code=403, detail="You can only search employees in your own branch")
@@ -187,9 +184,7 @@ def get_branch_employees(conn=Depends(get_db), current_user=Depends(get_current_
 
         with conn.cursor(cursor_factory=RealDictCursor) as cursor:
             # Get branch_id of the current branch manager
-            cursor.execute(
-                "SELECT branch_id FROM employee WHERE employee_id = %s", (employee_id,))
-            manager_row = cursor.fetchone()
+            manager_row = get_employee_branch(cursor, employee_id)
             if not manager_row or not manager_row['branch_id']:
                 raise HTTPException(
                     status_code=400, detail="Branch manager does not have a branch assigned")
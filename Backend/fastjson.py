@@ -0,0 +1,55 @@
+from decimal import Decimal
+import orjson
+from fastapi.responses import Response
+
+
+def _model_default(value):
+    # Pydantic writes Decimal fields as strings ("10.50")
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def _jsonable_default(value):
+    # FastAPI's jsonable_encoder writes Decimals as int or float
+    if isinstance(value, Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def model_rows(rows, model) -> list:
+    """DB rows projected onto the fields of `model`, for model_response."""
+    fields = tuple(model.model_fields)
+    return [{field: row.get(field) for field in fields} for row in rows]
+
+
+def model_response(payload, status_code: int = 200) -> Response:
+    """JSON response for a payload already in model shape, encoded as pydantic would."""
+    return Response(
+        orjson.dumps(payload, default=_model_default),
+        status_code=status_code,
+        media_type="application/json",
+    )
+
+
+def model_rows_response(rows, model, status_code: int = 200) -> Response:
+    """
+    JSON response for DB rows in the shape `model` gives them, without
+    building and then re-validating one model per row. Only for rows read
+    straight from columns whose types already match the model's fields:
+    the output is byte-for-byte what the response_model path would send.
+    """
+    return model_response(model_rows(rows, model), status_code)
+
+
+def json_response(content, status_code: int = 200, headers: dict = None) -> Response:
+    """
+    JSON response for plain dicts and lists (reports), encoded the way
+    jsonable_encoder would: Decimals as numbers, dates as ISO strings.
+    """
+    return Response(
+        orjson.dumps(content, default=_jsonable_default, option=orjson.OPT_NON_STR_KEYS),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
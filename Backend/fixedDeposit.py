@@ -1,8 +1,11 @@
 from psycopg2.extras import RealDictCursor
 from datetime import datetime
 from auth import get_current_user
-from database import get_db
-from fastapi import APIRouter, Depends, HTTPException
+from cache import get_employee_branch, plan_cache
+from database import get_db, get_read_db
+from fastjson import model_rows_response
+import conditional
+from fastapi import APIRouter, Depends, HTTPException, Request
 from schemas import FixedDepositCreate, FixedDepositRead, AccountSearchRequest, FixedDepositPlanCreate, FixedDepositPlanRead
 
 router = APIRouter()
@@ -29,11 +32,7 @@ def create_fixed_deposit(fixed_deposit: FixedDepositCreate, conn=Depends(get_db)
             # Get branch_id from employee table if needed for branch manager
             user_branch_id = None
             if user_type == 'branch_manager':
-                cursor.execute(
-                    "SELECT branch_id FROM Employee WHERE employee_id = %s",
-                    (employee_id,)
-                )
-                branch_row = cursor.fetchone()
+                branch_row = get_employee_branch(cursor, employee_id)
                 if not branch_row or not branch_row['branch_id']:
                     raise HTTPException(
                         status_code=400, detail="Branch manager does not have a branch assigned"
@@ -102,7 +101,7 @@ def create_fixed_deposit(fixed_deposit: FixedDepositCreate, conn=Depends(get_db)
                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
                 RETURNING fixed_deposit_id, saving_account_id, f_plan_id, start_date, 
                          end_date, principal_amount, interest_payment_type, 
-                         last_payout_date, status
+                         last_payout_date, status, next_payout_at
             """, (
                 fixed_deposit.saving_account_id,
                 fixed_deposit.f_plan_id,
@@ -194,13 +193,13 @@ def search_fixed_deposits_by_account_number(
             # Get all fixed deposits for this account
             cursor.execute("""
                 SELECT fixed_deposit_id, saving_account_id, f_plan_id, start_date, end_date,
-                       principal_amount, interest_payment_type, last_payout_date, status
+                       principal_amount, interest_payment_type, last_payout_date, status, next_payout_at
                 FROM FixedDeposit
                 WHERE saving_account_id = %s
                 ORDER BY start_date DESC
             """, (saving_account_id,))
             fd_rows = cursor.fetchall()
-            return [FixedDepositRead(**fd) for fd in fd_rows]
+            return model_rows_response(fd_rows, FixedDepositRead)
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Database error: {str(e)}")
@@ -235,24 +234,30 @@ def create_fixed_deposit_plan(plan: FixedDepositPlanCreate, conn=Depends(get_db)
 
 
 @router.get("/fixed-deposit-plan", response_model=list[FixedDepositPlanRead])
-def read_fixed_deposit_plans(conn=Depends(get_db)):
+def read_fixed_deposit_plans(request: Request, conn=Depends(get_db)):
     """
     Get all fixed deposit plans.
     """
-    try:
+    def load_plans():
         with conn.cursor(cursor_factory=RealDictCursor) as cursor:
             cursor.execute("""
                 SELECT f_plan_id, months, interest_rate FROM FixedDeposit_Plans ORDER BY months
             """)
-            plans = cursor.fetchall()
-            return [FixedDepositPlanRead(**plan) for plan in plans]
+            return [dict(plan) for plan in cursor.fetchall()]
+
+    try:
+        plans = plan_cache.get_or_load("fixeddeposit_plans", load_plans)
+        validators = conditional.for_content(request, plans)
+        if validators.not_modified:
+            return validators.not_modified_response()
+        return validators.apply(model_rows_response(plans, FixedDepositPlanRead))
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Database error: {str(e)}")
 
 
 @router.get("/fixed-deposit/branch", response_model=list[FixedDepositRead])
-def get_branch_fixed_deposits(conn=Depends(get_db), current_user=Depends(get_current_user)):
+def get_branch_fixed_deposits(request: Request, conn=Depends(get_read_db), current_user=Depends(get_current_user)):
     """
     Get all fixed deposits in the same branch as the current branch manager.
     Only branch managers can access this endpoint.
@@ -272,19 +277,23 @@ def get_branch_fixed_deposits(conn=Depends(get_db), current_user=Depends(get_cur
 
         with conn.cursor(cursor_factory=RealDictCursor) as cursor:
             # Get branch_id of the current branch manager
-            cursor.execute(
-                "SELECT branch_id FROM employee WHERE employee_id = %s", (employee_id,))
-            manager_row = cursor.fetchone()
+            manager_row = get_employee_branch(cursor, employee_id)
             if not manager_row or not manager_row['branch_id']:
                 raise HTTPException(
                     status_code=400, detail="Branch manager does not have a branch assigned")
 
             branch_id = manager_row['branch_id']
 
+            validators = conditional.evaluate(
+                request, cursor, ("fixed_deposits",), branch_id, current_user)
+            if validators.not_modified:
+                return validators.not_modified_response()
+
             # Get all fixed deposits in the same branch
             cursor.execute("""
                 SELECT fd.fixed_deposit_id, fd.saving_account_id, fd.f_plan_id, fd.start_date, fd.end_date,
-                       fd.principal_amount, fd.interest_payment_type, fd.last_payout_date, fd.status
+                       fd.principal_amount, fd.interest_payment_type, fd.last_payout_date, fd.status,
+                       fd.next_payout_at
                 FROM FixedDeposit fd
                 INNER JOIN SavingsAccount sa ON fd.saving_account_id = sa.saving_account_id
                 WHERE sa.branch_id = %s
@@ -292,7 +301,7 @@ def get_branch_fixed_deposits(conn=Depends(get_db), current_user=Depends(get_cur
             """, (branch_id,))
 
             rows = cursor.fetchall()
-            return [FixedDepositRead(**row) for row in rows]
+            return validators.apply(model_rows_response(rows, FixedDepositRead))
 
     except HTTPException:
         raise
@@ -302,7 +311,7 @@ def get_branch_fixed_deposits(conn=Depends(get_db), current_user=Depends(get_cur
 
 
 @router.get("/fixed-deposit/branch/stats")
-def get_branch_fixed_deposit_stats(conn=Depends(get_db), current_user=Depends(get_current_user)):
+def get_branch_fixed_deposit_stats(conn=Depends(get_read_db), current_user=Depends(get_current_user)):
     """
     Get fixed deposit statistics for the branch manager's branch.
     Only branch managers can access this endpoint.
@@ -322,9 +331,7 @@ def get_branch_fixed_deposit_stats(conn=Depends(get_db), current_user=Depends(ge
 
         with conn.cursor(cursor_factory=RealDictCursor) as cursor:
             # Get branch_id of the current branch manager
-            cursor.execute(
-                "SELECT branch_id FROM employee WHERE employee_id = %s", (employee_id,))
-            manager_row = cursor.fetchone()
+            manager_row = get_employee_branch(cursor, employee_id)
             if not manager_row or not manager_row['branch_id']:
                 raise HTTPException(
                     status_code=400, detail="Branch manager does not have a branch assigned")
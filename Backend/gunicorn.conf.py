@@ -0,0 +1,18 @@
+# Gunicorn settings picked up automatically from the working directory
+import os
+import shutil
+
+
+def on_starting(server):
+    """Start every deployment with an empty Prometheus multiprocess directory"""
+    metrics_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Drop live gauges (in-flight requests, pool usage) of a dead worker"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
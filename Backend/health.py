@@ -0,0 +1,122 @@
+import os
+import time
+import logging
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from database import db_pool, replica_pool, replica_monitor, PoolTimeout, SCHEMA_VERSION
+import tasks
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# /ready fails when a trivial query is slower than this
+READY_MAX_DB_LATENCY_MS = float(os.getenv("READY_MAX_DB_LATENCY_MS", 250))
+# How long /ready itself may wait for a pooled connection
+READY_CHECK_TIMEOUT = float(os.getenv("READY_CHECK_TIMEOUT", 1))
+# The scheduler loop wakes at least once a minute outside of job runs
+SCHEDULER_STALE_SECONDS = 180
+
+
+def check_pool() -> dict:
+    stats = db_pool.stats()
+    return {"ok": stats["available"] > 0, **stats}
+
+
+def check_database() -> dict:
+    """Run one round trip and read the applied schema version."""
+    try:
+        conn = db_pool.getconn(timeout=READY_CHECK_TIMEOUT)
+    except PoolTimeout:
+        return {"ok": False, "error": "No database connection available"}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+
+    try:
+        started = time.perf_counter()
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT MAX(version) FROM schema_migrations")
+            version = cursor.fetchone()[0]
+        latency_ms = (time.perf_counter() - started) * 1000
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+    finally:
+        db_pool.putconn(conn)
+
+    latency = {
+        "ok": latency_ms <= READY_MAX_DB_LATENCY_MS,
+        "latency_ms": round(latency_ms, 2),
+        "threshold_ms": READY_MAX_DB_LATENCY_MS,
+    }
+    migrations = {
+        "ok": version is not None and version >= SCHEMA_VERSION,
+        "applied": version,
+        "required": SCHEMA_VERSION,
+    }
+    return {"ok": latency["ok"] and migrations["ok"],
+            "latency": latency, "migrations": migrations}
+
+
+def check_replica() -> dict:
+    """Informational only: read-only routes fall back to the primary when the replica is unusable."""
+    if replica_pool is None:
+        return {"ok": True, "configured": False}
+    return {"ok": True, "configured": True, **replica_monitor.stats(),
+            "pool": replica_pool.stats()}
+
+
+def check_scheduler() -> dict:
+    """The scheduler thread must be alive and looping unless it was stopped on purpose."""
+    if not tasks.scheduler_running:
+        return {"ok": True, "state": "stopped"}
+
+    thread = tasks.scheduler_thread
+    if thread is None or not thread.is_alive():
+        return {"ok": False, "state": "dead"}
+
+    if tasks.scheduler_current_job:
+        return {"ok": True, "state": "running_job", "job": tasks.scheduler_current_job}
+
+    heartbeat = tasks.scheduler_heartbeat
+    age = time.time() - heartbeat if heartbeat else None
+    if age is not None and age > SCHEDULER_STALE_SECONDS:
+        return {"ok": False, "state": "stalled", "last_heartbeat_seconds": round(age, 1)}
+    return {"ok": True, "state": "idle",
+            "last_heartbeat_seconds": round(age, 1) if age is not None else None}
+
+
+@router.get("/health")
+async def health():
+    """Liveness: the worker is up and serving requests. Does not touch the database."""
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+def ready():
+    """
+    Readiness: this worker has a free pooled connection, the database answers
+    quickly, the schema is current and the scheduler is alive.
+    Returns 503 otherwise so load balancers route to another worker.
+    """
+    pool = check_pool()
+    if pool["ok"]:
+        database = check_database()
+    else:
+        # Don't queue behind the requests that saturated the pool
+        database = {"ok": False, "error": "Skipped: connection pool saturated"}
+    checks = {
+        "pool": pool,
+        "database": database,
+        "scheduler": check_scheduler(),
+        "replica": check_replica(),
+    }
+
+    is_ready = all(check["ok"] for check in checks.values())
+    if not is_ready:
+        failed = [name for name, check in checks.items() if not check["ok"]]
+        logger.warning(f"Readiness check failed: {', '.join(failed)}")
+
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"status": "ready" if is_ready else "not_ready", "checks": checks},
+    )
@@ -0,0 +1,774 @@
+import os
+import time
+import heapq
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from decimal import Decimal
+from psycopg2.extras import RealDictCursor, execute_values
+from database import connect, replica_connection, replica_pool, apply_statement_timeout, PoolTimeout
+
+logger = logging.getLogger(__name__)
+
+# Each job is split into a read-only plan step (selection + calculation)
+# and an apply step that posts the planned amounts. The scheduled jobs, the
+# manual endpoints and dry runs all share the plan step, so a dry run shows
+# exactly what a real run would post.
+
+JOBS = ("savings_interest", "fd_interest", "fd_maturity")
+
+# Partitions processed concurrently, each on its own connection and transaction
+INTEREST_WORKERS = int(os.getenv("INTEREST_WORKERS", 4))
+
+# Partition key for savings accounts without a branch
+UNASSIGNED = ""
+
+# Postings written per statement by the set-based apply steps
+POSTING_BATCH_SIZE = 1000
+# Statements each apply step issues per batch (savings interest locks its accounts first)
+STATEMENTS_PER_BATCH = {
+    "savings_interest": 2,
+    "fd_interest": 1,
+    "fd_maturity": 1,
+}
+# Change-marker scopes each job's writes touch (init-scripts/11-change-markers.sql)
+MARKER_SCOPES = {
+    "savings_interest": ("transactions",),
+    "fd_interest": ("transactions", "fixed_deposits"),
+    "fd_maturity": ("transactions", "fixed_deposits"),
+}
+
+
+def round_currency(amount: Decimal) -> Decimal:
+    """Round decimal amount to 2 decimal places for currency precision."""
+    return amount.quantize(Decimal('0.01'))
+
+
+def parse_rate(value) -> Decimal:
+    """Annual rate as a fraction; plan rates are CHAR ("12", "12%") or DECIMAL."""
+    if isinstance(value, str):
+        value = value.replace('%', '').strip()
+    return Decimal(str(value)) / Decimal('100')
+
+
+def month_bounds(current_date: datetime):
+    month_start = datetime(current_date.year, current_date.month, 1)
+    if current_date.month == 12:
+        return month_start, datetime(current_date.year + 1, 1, 1)
+    return month_start, datetime(current_date.year, current_date.month + 1, 1)
+
+
+def partition_clause(params: dict, branch_id: str = None, bucket: tuple = None) -> str:
+    """
+    Restrict a plan query to one partition: a branch, optionally split into
+    hash buckets of saving_account_id. Every write of a posting touches only
+    its own savings account and FD, so partitions never contend for rows.
+    """
+    clause = ""
+    if branch_id == UNASSIGNED:
+        clause += " AND sa.branch_id IS NULL"
+    elif branch_id:
+        clause += " AND sa.branch_id = %(branch_id)s"
+        params["branch_id"] = branch_id
+    if bucket:
+        clause += " AND abs(hashtext(sa.saving_account_id) %% %(buckets)s) = %(bucket)s"
+        params["bucket"], params["buckets"] = bucket
+    return clause
+
+
+def plan_savings_interest(cursor, current_date: datetime, branch_id: str = None,
+                          bucket: tuple = None, automatic: bool = True) -> list:
+    """Monthly interest for every active account above its plan minimum not yet paid this month."""
+    month_start, next_month = month_bounds(current_date)
+    query = """
+        SELECT sa.saving_account_id, sa.branch_id, sa.balance,
+               sap.interest_rate, sap.plan_name,
+               (SELECT MIN(ah.holder_id) FROM AccountHolder ah
+                WHERE ah.saving_account_id = sa.saving_account_id) AS holder_id
+        FROM SavingsAccount sa
+        JOIN SavingsAccount_Plans sap ON sa.s_plan_id = sap.s_plan_id
+        WHERE sa.status = true AND sa.balance >= sap.min_balance
+        AND NOT EXISTS (
+            SELECT 1 FROM Transactions t
+            JOIN AccountHolder ah ON t.holder_id = ah.holder_id
+            WHERE ah.saving_account_id = sa.saving_account_id
+            AND t.type = 'Interest'
+            AND t.description LIKE 'Monthly savings account interest%%'
+            AND t.timestamp >= %(month_start)s AND t.timestamp < %(next_month)s
+        )
+    """
+    params = {"month_start": month_start, "next_month": next_month}
+    query += partition_clause(params, branch_id, bucket)
+    cursor.execute(query + " ORDER BY sa.saving_account_id", params)
+
+    postings = []
+    for account in cursor.fetchall():
+        monthly_interest_rate = parse_rate(account['interest_rate']) / Decimal('12')
+        interest_amount = round_currency(account['balance'] * monthly_interest_rate)
+        if interest_amount <= 0 or not account['holder_id']:
+            continue
+        postings.append({
+            "saving_account_id": account['saving_account_id'],
+            "branch_id": (account['branch_id'] or UNASSIGNED).strip(),
+            "holder_id": account['holder_id'],
+            "type": "Interest",
+            "amount": interest_amount,
+            "interest": interest_amount,
+            "principal": Decimal('0.00'),
+            "description": f"Monthly savings account interest - {current_date.month:02d}/{current_date.year} - Account: {account['saving_account_id']}",
+        })
+    return postings
+
+
+def plan_fixed_deposit_interest(cursor, current_date: datetime, branch_id: str = None,
+                                bucket: tuple = None, automatic: bool = True) -> list:
+    """
+    Interest for every complete 30-day period since each active FD's last
+    payout. Only deposits whose next_payout_at has passed are read.
+    """
+    query = """
+        SELECT fd.fixed_deposit_id, fd.saving_account_id, sa.branch_id, fd.principal_amount,
+               fd.start_date, fd.last_payout_date, fdp.interest_rate,
+               (SELECT MIN(ah.holder_id) FROM AccountHolder ah
+                WHERE ah.saving_account_id = fd.saving_account_id) AS holder_id
+        FROM FixedDeposit fd
+        JOIN FixedDeposit_Plans fdp ON fd.f_plan_id = fdp.f_plan_id
+        JOIN SavingsAccount sa ON fd.saving_account_id = sa.saving_account_id
+        WHERE fd.status = true
+        AND fd.next_payout_at <= %(current_date)s AND fd.end_date > %(current_date)s
+    """
+    params = {"current_date": current_date}
+    query += partition_clause(params, branch_id, bucket)
+    cursor.execute(query + " ORDER BY fd.fixed_deposit_id", params)
+
+    prefix = "Auto-calculated fixed deposit interest" if automatic else "Fixed deposit interest"
+    postings = []
+    for fd in cursor.fetchall():
+        last_payout = fd['last_payout_date'] or fd['start_date']
+        complete_periods = (current_date - last_payout).days // 30
+        if complete_periods < 1:
+            continue
+
+        monthly_interest_rate = parse_rate(fd['interest_rate']) / Decimal('12')
+        interest_amount = round_currency(
+            fd['principal_amount'] * monthly_interest_rate * complete_periods)
+        if interest_amount <= 0 or not fd['holder_id']:
+            continue
+        postings.append({
+            "saving_account_id": fd['saving_account_id'],
+            "branch_id": (fd['branch_id'] or UNASSIGNED).strip(),
+            "holder_id": fd['holder_id'],
+            "fixed_deposit_id": fd['fixed_deposit_id'],
+            "type": "Interest",
+            "amount": interest_amount,
+            "interest": interest_amount,
+            "principal": Decimal('0.00'),
+            "periods": complete_periods,
+            # The payout this plan starts from; the apply step only advances an FD still at it
+            "last_payout_date": fd['last_payout_date'],
+            "new_payout_date": last_payout + timedelta(days=complete_periods * 30),
+            "description": f"{prefix} for {complete_periods} month(s) - FD ID: {fd['fixed_deposit_id']}",
+        })
+    return postings
+
+
+def plan_maturities(cursor, current_date: datetime, branch_id: str = None,
+                    bucket: tuple = None, automatic: bool = True) -> list:
+    """Principal plus pro-rated interest since the last payout for every matured FD."""
+    query = """
+        SELECT fd.fixed_deposit_id, fd.saving_account_id, sa.branch_id, fd.principal_amount,
+               fd.start_date, fd.end_date, fd.last_payout_date, fdp.interest_rate,
+               (SELECT MIN(ah.holder_id) FROM AccountHolder ah
+                WHERE ah.saving_account_id = fd.saving_account_id) AS holder_id
+        FROM FixedDeposit fd
+        JOIN FixedDeposit_Plans fdp ON fd.f_plan_id = fdp.f_plan_id
+        JOIN SavingsAccount sa ON fd.saving_account_id = sa.saving_account_id
+        WHERE fd.status = true AND fd.end_date <= %(current_date)s
+    """
+    params = {"current_date": current_date}
+    query += partition_clause(params, branch_id, bucket)
+    cursor.execute(query + " ORDER BY fd.fixed_deposit_id", params)
+
+    prefix = "Auto-processed fixed deposit maturity" if automatic else "Fixed deposit maturity"
+    postings = []
+    for fd in cursor.fetchall():
+        if not fd['holder_id']:
+            continue
+        last_payout = fd['last_payout_date'] or fd['start_date']
+        days_remaining = (fd['end_date'] - last_payout).days
+
+        remaining_interest = Decimal('0.00')
+        if days_remaining > 0:
+            daily_interest_rate = parse_rate(fd['interest_rate']) / Decimal('365')
+            remaining_interest = round_currency(
+                fd['principal_amount'] * daily_interest_rate * days_remaining)
+
+        total_return = round_currency(fd['principal_amount'] + remaining_interest)
+        postings.append({
+            "saving_account_id": fd['saving_account_id'],
+            "branch_id": (fd['branch_id'] or UNASSIGNED).strip(),
+            "holder_id": fd['holder_id'],
+            "fixed_deposit_id": fd['fixed_deposit_id'],
+            "type": "Deposit",
+            "amount": total_return,
+            "interest": remaining_interest,
+            "principal": fd['principal_amount'],
+            "description": f"{prefix} - Principal: {fd['principal_amount']}, Interest: {remaining_interest} - FD ID: {fd['fixed_deposit_id']}",
+        })
+    return postings
+
+
+PLANNERS = {
+    "savings_interest": plan_savings_interest,
+    "fd_interest": plan_fixed_deposit_interest,
+    "fd_maturity": plan_maturities,
+}
+
+
+def apply_postings(cursor, job: str, postings: list, current_date: datetime) -> list:
+    """
+    Post planned amounts one by one. Runs inside the caller's transaction;
+    the caller commits. Returns the postings applied. Kept as the per-row
+    baseline of perf.bench_interest; the jobs use the set-based APPLIERS.
+    """
+    for posting in postings:
+        cursor.execute("""
+            UPDATE SavingsAccount
+            SET balance = balance + %s
+            WHERE saving_account_id = %s
+        """, (posting['amount'], posting['saving_account_id']))
+
+        cursor.execute("""
+            INSERT INTO Transactions (holder_id, type, amount, timestamp, description)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (posting['holder_id'], posting['type'], posting['amount'],
+              current_date, posting['description']))
+
+        if job == "fd_interest":
+            cursor.execute("""
+                UPDATE FixedDeposit
+                SET last_payout_date = %s
+                WHERE fixed_deposit_id = %s
+            """, (posting['new_payout_date'], posting['fixed_deposit_id']))
+        elif job == "fd_maturity":
+            cursor.execute("""
+                UPDATE FixedDeposit
+                SET status = false
+                WHERE fixed_deposit_id = %s
+            """, (posting['fixed_deposit_id'],))
+
+        logger.debug(f"{job}: posted {posting['amount']} to {posting['saving_account_id']}")
+    return postings
+
+
+def post_savings_interest(cursor, job: str, postings: list, current_date: datetime) -> list:
+    """
+    Post monthly savings interest set-based, one statement per batch. The
+    accounts are locked first, so the posting statement's re-check for this
+    month's interest sees any run that credited them in the meantime; such
+    accounts are skipped. Returns the postings actually applied.
+    """
+    posted = set()
+    for start in range(0, len(postings), POSTING_BATCH_SIZE):
+        batch = postings[start:start + POSTING_BATCH_SIZE]
+        cursor.execute("""
+            SELECT saving_account_id FROM SavingsAccount
+            WHERE saving_account_id = ANY(%s::char(10)[])
+            ORDER BY saving_account_id
+            FOR UPDATE
+        """, ([p['saving_account_id'] for p in batch],))
+        rows = execute_values(cursor, """
+            WITH batch (saving_account_id, holder_id, amount, description, posted_at) AS (
+                VALUES %s
+            ),
+            due AS (
+                SELECT b.* FROM batch b
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM Transactions t
+                    JOIN AccountHolder ah ON t.holder_id = ah.holder_id
+                    WHERE ah.saving_account_id = b.saving_account_id
+                    AND t.type = 'Interest'
+                    AND t.description LIKE 'Monthly savings account interest%%'
+                    AND t.timestamp >= date_trunc('month', b.posted_at)
+                    AND t.timestamp < date_trunc('month', b.posted_at) + INTERVAL '1 month'
+                )
+            ),
+            credited AS (
+                UPDATE SavingsAccount sa
+                SET balance = sa.balance + d.amount
+                FROM due d
+                WHERE sa.saving_account_id = d.saving_account_id
+            ),
+            posted AS (
+                INSERT INTO Transactions (holder_id, type, amount, timestamp, description)
+                SELECT d.holder_id, 'Interest'::transtype, d.amount, d.posted_at, d.description
+                FROM due d
+                ORDER BY d.saving_account_id
+            )
+            SELECT saving_account_id FROM due
+        """, [
+            (p['saving_account_id'], p['holder_id'], p['amount'], p['description'], current_date)
+            for p in batch
+        ], template="(%s::char(10), %s::char(10), %s::numeric(12,2), %s::varchar(255), "
+                    "%s::timestamp)",
+            page_size=len(batch), fetch=True)
+        posted.update(row['saving_account_id'] for row in rows)
+
+    skipped = len(postings) - len(posted)
+    if skipped:
+        logger.info(f"{job}: {skipped} accounts were already credited by another run")
+    return [p for p in postings if p['saving_account_id'] in posted]
+
+
+def post_fixed_deposit_interest(cursor, job: str, postings: list, current_date: datetime) -> list:
+    """
+    Post FD interest set-based, one statement per batch. An FD's payout date
+    only advances if it is still the one the plan started from, and only
+    those FDs are credited, so a concurrent run can never pay the same
+    periods twice. Returns the postings actually applied.
+    """
+    paid = set()
+    for start in range(0, len(postings), POSTING_BATCH_SIZE):
+        batch = postings[start:start + POSTING_BATCH_SIZE]
+        rows = execute_values(cursor, """
+            WITH batch (fixed_deposit_id, saving_account_id, holder_id, amount, description,
+                        posted_at, last_payout_date, new_payout_date) AS (
+                VALUES %s
+            ),
+            paid AS (
+                UPDATE FixedDeposit fd
+                SET last_payout_date = b.new_payout_date
+                FROM batch b
+                WHERE fd.fixed_deposit_id = b.fixed_deposit_id AND fd.status = true
+                AND fd.last_payout_date IS NOT DISTINCT FROM b.last_payout_date
+                RETURNING fd.fixed_deposit_id
+            ),
+            credited AS (
+                UPDATE SavingsAccount sa
+                SET balance = sa.balance + t.total
+                FROM (
+                    SELECT b.saving_account_id, SUM(b.amount) AS total
+                    FROM batch b
+                    JOIN paid p ON p.fixed_deposit_id = b.fixed_deposit_id
+                    GROUP BY b.saving_account_id
+                ) t
+                WHERE sa.saving_account_id = t.saving_account_id
+            ),
+            posted AS (
+                INSERT INTO Transactions (holder_id, type, amount, timestamp, description)
+                SELECT b.holder_id, 'Interest'::transtype, b.amount, b.posted_at, b.description
+                FROM batch b
+                JOIN paid p ON p.fixed_deposit_id = b.fixed_deposit_id
+                ORDER BY b.fixed_deposit_id
+            )
+            SELECT fixed_deposit_id FROM paid
+        """, [
+            (p['fixed_deposit_id'], p['saving_account_id'], p['holder_id'], p['amount'],
+             p['description'], current_date, p['last_payout_date'], p['new_payout_date'])
+            for p in batch
+        ], template="(%s::char(10), %s::char(10), %s::char(10), %s::numeric(12,2), "
+                    "%s::varchar(255), %s::timestamp, %s::timestamp, %s::timestamp)",
+            page_size=len(batch), fetch=True)
+        paid.update(row['fixed_deposit_id'] for row in rows)
+
+    skipped = len(postings) - len(paid)
+    if skipped:
+        logger.info(f"{job}: {skipped} deposits were already paid by another run")
+    return [p for p in postings if p['fixed_deposit_id'] in paid]
+
+
+def settle_maturities(cursor, job: str, postings: list, current_date: datetime) -> list:
+    """
+    Settle matured deposits set-based. For each batch one statement closes
+    the FDs, credits every savings account once with the sum of its
+    maturities and inserts the maturity transactions. Amounts come from
+    plan_maturities, so rounding is exactly that of the per-deposit path.
+    FDs already closed by a concurrent run are skipped; returns the
+    postings actually settled.
+    """
+    settled = set()
+    for start in range(0, len(postings), POSTING_BATCH_SIZE):
+        batch = postings[start:start + POSTING_BATCH_SIZE]
+        rows = execute_values(cursor, """
+            WITH batch (fixed_deposit_id, saving_account_id, holder_id, amount, description, posted_at) AS (
+                VALUES %s
+            ),
+            settled AS (
+                UPDATE FixedDeposit fd
+                SET status = false
+                FROM batch b
+                WHERE fd.fixed_deposit_id = b.fixed_deposit_id AND fd.status = true
+                RETURNING fd.fixed_deposit_id
+            ),
+            credited AS (
+                UPDATE SavingsAccount sa
+                SET balance = sa.balance + t.total
+                FROM (
+                    SELECT b.saving_account_id, SUM(b.amount) AS total
+                    FROM batch b
+                    JOIN settled s ON s.fixed_deposit_id = b.fixed_deposit_id
+                    GROUP BY b.saving_account_id
+                ) t
+                WHERE sa.saving_account_id = t.saving_account_id
+            ),
+            posted AS (
+                INSERT INTO Transactions (holder_id, type, amount, timestamp, description)
+                SELECT b.holder_id, 'Deposit'::transtype, b.amount, b.posted_at, b.description
+                FROM batch b
+                JOIN settled s ON s.fixed_deposit_id = b.fixed_deposit_id
+                ORDER BY b.fixed_deposit_id
+            )
+            SELECT fixed_deposit_id FROM settled
+        """, [
+            (p['fixed_deposit_id'], p['saving_account_id'], p['holder_id'],
+             p['amount'], p['description'], current_date)
+            for p in batch
+        ], template="(%s::char(10), %s::char(10), %s::char(10), %s::numeric(12,2), "
+                    "%s::varchar(255), %s::timestamp)",
+            page_size=len(batch), fetch=True)
+        settled.update(row['fixed_deposit_id'] for row in rows)
+
+    skipped = len(postings) - len(settled)
+    if skipped:
+        logger.info(f"{job}: {skipped} deposits were already settled by another run")
+    return [p for p in postings if p['fixed_deposit_id'] in settled]
+
+
+APPLIERS = {
+    "savings_interest": post_savings_interest,
+    "fd_interest": post_fixed_deposit_interest,
+    "fd_maturity": settle_maturities,
+}
+
+
+def write_statement_count(job: str, postings: list) -> int:
+    return -(-len(postings) // POSTING_BATCH_SIZE) * STATEMENTS_PER_BATCH[job]
+
+
+def defer_change_markers(cursor):
+    """
+    Stop the marker triggers from bumping for the rest of this transaction;
+    mark_changes() bumps once at the end instead, so the marker rows are not
+    locked while the job writes (see init-scripts/16-deferred-change-markers.sql).
+    """
+    cursor.execute("SELECT set_config('change_markers.deferred', 'on', true)")
+
+
+def mark_changes(cursor, job: str, postings: list):
+    """Bump the markers of every branch the applied postings touched; the last statement before commit."""
+    cursor.execute("SELECT set_config('change_markers.deferred', 'off', true)")
+    if not postings:
+        return
+    branches = sorted({p['branch_id'] or None for p in postings}, key=lambda b: b or "")
+    for scope in MARKER_SCOPES[job]:
+        cursor.execute("SELECT bump_change_markers(%s, %s::text[])", (scope, branches))
+
+
+def summarize(postings: list) -> dict:
+    """Counts and totals, overall and per branch."""
+    branches = {}
+    for posting in postings:
+        branch = branches.setdefault(posting['branch_id'], {
+            "branch_id": posting['branch_id'],
+            "postings": 0,
+            "interest": Decimal('0.00'),
+            "principal": Decimal('0.00'),
+            "amount": Decimal('0.00'),
+        })
+        branch["postings"] += 1
+        branch["interest"] += posting['interest']
+        branch["principal"] += posting['principal']
+        branch["amount"] += posting['amount']
+
+    by_branch = [
+        {**b, "interest": float(b["interest"]), "principal": float(b["principal"]),
+         "amount": float(b["amount"])}
+        for _, b in sorted(branches.items())
+    ]
+    return {
+        "postings": len(postings),
+        "total_interest": float(sum((p['interest'] for p in postings), Decimal('0.00'))),
+        "total_principal": float(sum((p['principal'] for p in postings), Decimal('0.00'))),
+        "total_amount": float(sum((p['amount'] for p in postings), Decimal('0.00'))),
+        "by_branch": by_branch,
+    }
+
+
+def measure_round_trip(cursor, samples: int = 3) -> float:
+    """Fastest of a few trivial round trips, in seconds."""
+    best = None
+    for _ in range(samples):
+        started = time.perf_counter()
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_job(conn, job: str, current_date: datetime = None, branch_id: str = None,
+            bucket: tuple = None, automatic: bool = True, dry_run: bool = False) -> dict:
+    """
+    Plan and post one job on `conn`. The caller commits a real run right
+    away: its last statement bumps the change markers, which stay locked until then.
+    A dry run plans inside a read-only REPEATABLE READ snapshot, estimates the
+    write phase from the statements it would issue and the measured
+    round-trip time, and rolls back; it never writes, so it can run against a replica.
+    """
+    if job not in PLANNERS:
+        raise ValueError(f"Unknown job: {job}")
+    current_date = current_date or datetime.now()
+
+    if dry_run:
+        # SET TRANSACTION must be the first statement of the transaction
+        conn.rollback()
+
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        if dry_run:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+
+        started = time.perf_counter()
+        postings = PLANNERS[job](cursor, current_date, branch_id, bucket, automatic)
+        selection_seconds = time.perf_counter() - started
+
+        write_statements = write_statement_count(job, postings)
+        if dry_run:
+            write_seconds = write_statements * measure_round_trip(cursor)
+        else:
+            started = time.perf_counter()
+            defer_change_markers(cursor)
+            postings = APPLIERS[job](cursor, job, postings, current_date)
+            mark_changes(cursor, job, postings)
+            write_seconds = time.perf_counter() - started
+
+    if dry_run:
+        conn.rollback()
+
+    report = {
+        "job": job,
+        "dry_run": dry_run,
+        "as_of": current_date.isoformat(),
+        "branch_id": branch_id,
+        **summarize(postings),
+        "write_statements": write_statements,
+        "selection_ms": round(selection_seconds * 1000, 1),
+        "write_ms": round(write_seconds * 1000, 1),
+        "runtime_ms": round((selection_seconds + write_seconds) * 1000, 1),
+    }
+    if dry_run:
+        # Nothing was written: the write phase is an estimate
+        report["estimated_write_ms"] = report.pop("write_ms")
+        report["estimated_runtime_ms"] = report.pop("runtime_ms")
+    return report
+
+
+def list_partitions(conn, workers: int) -> list:
+    """
+    One partition per branch, largest first. A branch holding more than a
+    fair share (1/workers) of the accounts is split into hash buckets so a
+    single large branch does not bound the wall time of the whole run.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT COALESCE(branch_id, %s), COUNT(*)
+            FROM SavingsAccount
+            GROUP BY branch_id
+            ORDER BY COUNT(*) DESC
+        """, (UNASSIGNED,))
+        counts = [(row[0].strip(), row[1]) for row in cursor.fetchall()]
+    conn.rollback()
+
+    fair_share = max(sum(n for _, n in counts) // max(workers, 1), 1)
+    partitions = []
+    for branch_id, accounts in counts:
+        buckets = -(-accounts // fair_share)
+        if buckets <= 1:
+            partitions.append({"branch_id": branch_id, "bucket": None, "accounts": accounts})
+            continue
+        for bucket in range(buckets):
+            partitions.append({"branch_id": branch_id, "bucket": (bucket, buckets),
+                               "accounts": accounts // buckets})
+    return partitions
+
+
+def partition_connection(dry_run: bool):
+    """
+    A connection for one partition and the function that gives it back.
+    Dry runs only read, so they go to the replica when one is configured and
+    caught up; real runs, and dry runs without a usable replica, get their
+    own connection to the primary.
+    """
+    if dry_run:
+        try:
+            conn = replica_connection()
+        except PoolTimeout:
+            logger.info("Replica pool exhausted, dry run reads from the primary")
+            conn = None
+        if conn is not None:
+            try:
+                # Pooled connections keep the statement_timeout of their last request
+                apply_statement_timeout(conn)
+            except Exception:
+                replica_pool.putconn(conn)
+                raise
+            return conn, lambda: replica_pool.putconn(conn)
+    conn = connect()
+    return conn, conn.close
+
+
+def run_partition(job: str, current_date: datetime, partition: dict,
+                  automatic: bool, dry_run: bool) -> dict:
+    """Plan and post one partition on its own connection and transaction."""
+    conn, release = partition_connection(dry_run)
+    try:
+        report = run_job(conn, job, current_date, partition["branch_id"], partition["bucket"],
+                         automatic=automatic, dry_run=dry_run)
+        if not dry_run:
+            conn.commit()
+        return report
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        release()
+
+
+def estimate_wall_ms(durations: list, workers: int) -> float:
+    """Wall time of running `durations` largest-first on `workers` workers."""
+    loads = [0.0] * max(workers, 1)
+    for duration in sorted(durations, reverse=True):
+        heapq.heappush(loads, heapq.heappop(loads) + duration)
+    return round(max(loads), 1)
+
+
+def merge_reports(job: str, reports: list, current_date: datetime, dry_run: bool) -> dict:
+    """Fold per-partition reports into one job report."""
+    by_branch = {}
+    for report in reports:
+        for row in report["by_branch"]:
+            branch = by_branch.setdefault(row["branch_id"], {
+                "branch_id": row["branch_id"], "postings": 0,
+                "interest": Decimal('0.00'), "principal": Decimal('0.00'), "amount": Decimal('0.00'),
+            })
+            branch["postings"] += row["postings"]
+            for key in ("interest", "principal", "amount"):
+                branch[key] += Decimal(str(row[key]))
+
+    def total(key):
+        return float(sum((b[key] for b in by_branch.values()), Decimal('0.00')))
+
+    return {
+        "job": job,
+        "dry_run": dry_run,
+        "as_of": current_date.isoformat(),
+        "branch_id": None,
+        "postings": sum(b["postings"] for b in by_branch.values()),
+        "total_interest": total("interest"),
+        "total_principal": total("principal"),
+        "total_amount": total("amount"),
+        "by_branch": [
+            {**b, "interest": float(b["interest"]), "principal": float(b["principal"]),
+             "amount": float(b["amount"])}
+            for _, b in sorted(by_branch.items())
+        ],
+        "write_statements": sum(r["write_statements"] for r in reports),
+        "selection_ms": round(sum(r["selection_ms"] for r in reports), 1),
+    }
+
+
+def lock_job(job: str):
+    """
+    Session-level advisory lock on one job, held on a dedicated connection
+    for the whole of a real run, so runs of the same job never overlap
+    (scheduled or queued from the endpoints; the scheduler lock only orders
+    scheduled runs). Waits for a run in progress. Close the connection to
+    release it.
+    """
+    conn = connect()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s))", (f"interest_job:{job}",))
+            if not cursor.fetchone()[0]:
+                logger.info(f"{job}: another run is in progress, waiting for it to finish")
+                cursor.execute("SELECT pg_advisory_lock(hashtext(%s))", (f"interest_job:{job}",))
+        conn.commit()
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+
+def run_partitioned(job: str, current_date: datetime = None, automatic: bool = True,
+                    dry_run: bool = False, workers: int = None, on_progress=None) -> dict:
+    """
+    Run one job across the whole bank, one partition per branch (or hash
+    bucket of a large branch) on a pool of worker threads. on_progress, if
+    given, is called with the completed fraction as partitions finish.
+    Each partition commits on its own; the jobs skip work that is already posted, so
+    re-running after a failed partition only completes the missing ones.
+    A real run holds the job's lock (see lock_job) throughout.
+    """
+    if job not in PLANNERS:
+        raise ValueError(f"Unknown job: {job}")
+    current_date = current_date or datetime.now()
+    workers = workers or INTEREST_WORKERS
+
+    lock = None if dry_run else lock_job(job)
+    try:
+        return _run_partitions(job, current_date, automatic, dry_run, workers, on_progress)
+    finally:
+        if lock is not None:
+            lock.close()
+
+
+def _run_partitions(job: str, current_date: datetime, automatic: bool, dry_run: bool,
+                    workers: int, on_progress) -> dict:
+    conn = connect()
+    try:
+        partitions = list_partitions(conn, workers)
+    finally:
+        conn.close()
+
+    started = time.perf_counter()
+    reports, failed = [], []
+    with ThreadPoolExecutor(max_workers=max(min(workers, len(partitions)), 1),
+                            thread_name_prefix=job) as pool:
+        # Each task runs in a copy of the caller's context so statement
+        # timing is still attributed to this job
+        futures = {
+            pool.submit(contextvars.copy_context().run, run_partition,
+                        job, current_date, partition, automatic, dry_run): partition
+            for partition in partitions
+        }
+        for future in as_completed(futures):
+            partition = futures[future]
+            try:
+                reports.append(future.result())
+            except Exception as e:
+                label = partition["branch_id"] or "unassigned"
+                if partition["bucket"]:
+                    label += f" bucket {partition['bucket'][0] + 1}/{partition['bucket'][1]}"
+                logger.error(f"{job}: partition {label} failed: {str(e)}")
+                failed.append({"branch_id": partition["branch_id"],
+                               "bucket": partition["bucket"], "error": str(e)})
+            if on_progress:
+                done = len(reports) + len(failed)
+                on_progress(done / len(partitions), f"{done} of {len(partitions)} partitions done")
+    wall_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    report = merge_reports(job, reports, current_date, dry_run)
+    report.update({
+        "workers": workers,
+        "partitions": len(partitions),
+        "failed_partitions": failed,
+    })
+    if dry_run:
+        report["estimated_runtime_ms"] = estimate_wall_ms(
+            [r["estimated_runtime_ms"] for r in reports], workers)
+        report["estimated_serial_runtime_ms"] = round(
+            sum(r["estimated_runtime_ms"] for r in reports), 1)
+    else:
+        report["runtime_ms"] = wall_ms
+        report["serial_runtime_ms"] = round(sum(r["runtime_ms"] for r in reports), 1)
+    return report
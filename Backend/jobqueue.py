@@ -0,0 +1,334 @@
+import os
+import json
+import time
+import socket
+import logging
+import threading
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
+from psycopg2.extras import RealDictCursor, Json
+from database import get_db, connect
+from auth import get_current_user
+from querylog import route_context
+import notifications
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+QUEUE_CHANNEL = "job_queue"
+
+# Worker threads per API process; SKIP LOCKED lets every process take part
+JOB_QUEUE_WORKERS = int(os.getenv("JOB_QUEUE_WORKERS", 1))
+# Fallback poll for when a NOTIFY was missed (listener reconnecting)
+JOB_QUEUE_POLL_SECONDS = float(os.getenv("JOB_QUEUE_POLL_SECONDS", 30))
+# A running job whose worker has not heartbeated for this long is requeued
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", 120))
+JOB_HEARTBEAT_SECONDS = 15
+# Attempts before a job whose worker keeps dying is marked failed
+JOB_MAX_ATTEMPTS = 3
+# Progress is written at most this often
+PROGRESS_MIN_INTERVAL_SECONDS = 1.0
+
+WORKER_PREFIX = f"{socket.gethostname()}:{os.getpid()}"
+
+_handlers = {}
+_wakeup = threading.Event()
+_workers = []
+_running = False
+
+
+def register(kind: str, handler):
+    """
+    Register the function that executes jobs of `kind`. It is called as
+    handler(job, progress) with the JobQueue row and a progress callback,
+    and returns a JSON-serializable result.
+    """
+    _handlers[kind] = handler
+
+
+def to_json(value):
+    return Json(value, dumps=lambda v: json.dumps(v, default=str))
+
+
+def submit(conn, kind: str, params: dict, submitted_by: str = None) -> dict:
+    """Queue a job and commit; a NOTIFY trigger wakes an idle worker."""
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job kind: {kind}")
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute("""
+            INSERT INTO JobQueue (kind, params, submitted_by)
+            VALUES (%s, %s, %s)
+            RETURNING job_id, kind, status, submitted_at
+        """, (kind, to_json(params), submitted_by))
+        job = cursor.fetchone()
+    conn.commit()
+    logger.info(f"Queued job {job['job_id']} ({kind}) for {submitted_by}")
+    return job
+
+
+def accepted(job: dict, message: str, **extra) -> JSONResponse:
+    """202 response pointing at the job's status endpoint, plus any `extra` fields."""
+    status_url = f"/jobs/{job['job_id']}"
+    return JSONResponse(
+        status_code=202,
+        headers={"Location": status_url},
+        content={
+            "message": message,
+            "job_id": job['job_id'],
+            "kind": job['kind'],
+            "status": job['status'],
+            "submitted_at": job['submitted_at'].isoformat(),
+            "status_url": status_url,
+            **extra,
+        },
+    )
+
+
+class Progress:
+    """Progress callback handed to job handlers: progress(fraction, message=None)."""
+
+    def __init__(self, conn, job_id: int):
+        self.conn = conn
+        self.job_id = job_id
+        self._last_write = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, fraction: float, message: str = None):
+        now = time.monotonic()
+        with self._lock:
+            # Throttled, but always record completion of the last step
+            if fraction < 1 and now - self._last_write < PROGRESS_MIN_INTERVAL_SECONDS:
+                return
+            self._last_write = now
+            try:
+                with self.conn.cursor() as cursor:
+                    cursor.execute("""
+                        UPDATE JobQueue
+                        SET progress = %s, progress_message = %s, heartbeat_at = NOW()
+                        WHERE job_id = %s
+                    """, (round(min(max(fraction, 0), 1) * 100, 2),
+                          message[:200] if message else None, self.job_id))
+            except Exception as e:
+                logger.warning(f"Could not record progress of job {self.job_id}: {str(e)}")
+
+
+def requeue_stale(conn):
+    """Give jobs of dead workers back to the queue, or fail them after too many attempts."""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            UPDATE JobQueue
+            SET status = CASE WHEN attempts >= %(max_attempts)s THEN 'failed' ELSE 'queued' END,
+                error = CASE WHEN attempts >= %(max_attempts)s
+                             THEN 'Worker stopped responding on every attempt' ELSE error END,
+                finished_at = CASE WHEN attempts >= %(max_attempts)s THEN NOW() ELSE NULL END,
+                worker = NULL
+            WHERE status = 'running'
+            AND heartbeat_at < NOW() - make_interval(secs => %(stale)s)
+            RETURNING job_id, status
+        """, {"max_attempts": JOB_MAX_ATTEMPTS, "stale": JOB_STALE_SECONDS})
+        for job_id, status in cursor.fetchall():
+            logger.warning(f"Job {job_id} lost its worker; now {status}")
+
+
+def claim(conn, worker: str):
+    """Take the oldest queued job, skipping jobs other workers are claiming."""
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute("""
+            UPDATE JobQueue
+            SET status = 'running', started_at = NOW(), heartbeat_at = NOW(),
+                attempts = attempts + 1, worker = %s, progress = 0, progress_message = NULL
+            WHERE job_id = (
+                SELECT job_id FROM JobQueue
+                WHERE status = 'queued'
+                ORDER BY job_id
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING job_id, kind, params, submitted_by, attempts
+        """, (worker,))
+        return cursor.fetchone()
+
+
+def finish(conn, job_id: int, status: str, result=None, error: str = None):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            UPDATE JobQueue
+            SET status = %s, result = %s, error = %s, finished_at = NOW(),
+                progress = CASE WHEN %s = 'succeeded' THEN 100 ELSE progress END
+            WHERE job_id = %s
+        """, (status, to_json(result) if result is not None else None, error, status, job_id))
+
+
+def _heartbeat(job_id: int, stop: threading.Event):
+    """Keep a running job's heartbeat fresh on a separate connection."""
+    conn = None
+    while not stop.wait(JOB_HEARTBEAT_SECONDS):
+        try:
+            if conn is None:
+                conn = connect()
+                conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "UPDATE JobQueue SET heartbeat_at = NOW() WHERE job_id = %s", (job_id,))
+        except Exception as e:
+            logger.warning(f"Heartbeat for job {job_id} failed: {str(e)}")
+            if conn is not None:
+                conn.close()
+                conn = None
+    if conn is not None:
+        conn.close()
+
+
+def execute(conn, job: dict):
+    job_id, kind = job['job_id'], job['kind']
+    handler = _handlers.get(kind)
+    if handler is None:
+        finish(conn, job_id, "failed", error=f"No handler registered for {kind}")
+        return
+
+    logger.info(f"Running job {job_id} ({kind}), attempt {job['attempts']}")
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(job_id, stop),
+                                 name=f"job-heartbeat-{job_id}", daemon=True)
+    heartbeat.start()
+    started = time.perf_counter()
+    try:
+        with route_context(f"job:{kind}"):
+            result = handler(job, Progress(conn, job_id))
+        finish(conn, job_id, "succeeded", result)
+        logger.info(f"Job {job_id} ({kind}) succeeded in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        error = getattr(e, "detail", None) or str(e)
+        finish(conn, job_id, "failed", error=str(error))
+        logger.error(f"Job {job_id} ({kind}) failed: {error}")
+    finally:
+        stop.set()
+
+
+def _work(worker: str):
+    conn = None
+    while _running:
+        try:
+            if conn is None or conn.closed:
+                conn = connect()
+                conn.autocommit = True
+
+            requeue_stale(conn)
+            # Clear before claiming so a NOTIFY arriving meanwhile is not lost
+            _wakeup.clear()
+            job = claim(conn, worker)
+            if job is None:
+                _wakeup.wait(JOB_QUEUE_POLL_SECONDS)
+                continue
+            execute(conn, job)
+        except Exception as e:
+            logger.error(f"Job worker {worker} error: {str(e)}")
+            if conn is not None:
+                conn.close()
+                conn = None
+            time.sleep(5)
+
+    if conn is not None:
+        conn.close()
+
+
+def start_workers():
+    """Start this process's queue workers if they are not running yet."""
+    global _running
+    if _running:
+        return
+    _running = True
+    for i in range(JOB_QUEUE_WORKERS):
+        thread = threading.Thread(target=_work, args=(f"{WORKER_PREFIX}:{i}",),
+                                  name=f"job-worker-{i}", daemon=True)
+        thread.start()
+        _workers.append(thread)
+    logger.info(f"Started {JOB_QUEUE_WORKERS} job queue worker(s)")
+
+
+def stop_workers():
+    """Stop taking new jobs; a job in progress finishes or is requeued once stale."""
+    global _running
+    _running = False
+    _wakeup.set()
+
+
+notifications.subscribe(QUEUE_CHANNEL, lambda payload: _wakeup.set(),
+                        on_reconnect=_wakeup.set)
+
+
+def check_job_access(job: dict, current_user):
+    user_type = current_user.get("type").lower()
+    if user_type == "admin":
+        return
+    if user_type == "branch_manager" and job['submitted_by'] == current_user.get("username"):
+        return
+    raise HTTPException(status_code=403, detail="You can only view jobs you submitted.")
+
+
+@router.get("/{job_id}")
+def get_job(job_id: int, conn=Depends(get_db), current_user=Depends(get_current_user)):
+    """Status, progress percentage and, once finished, the result or error of a queued job."""
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute("""
+                SELECT job_id, kind, params, status, progress, progress_message,
+                       result, error, attempts, submitted_by, submitted_at,
+                       started_at, finished_at, worker
+                FROM JobQueue WHERE job_id = %s
+            """, (job_id,))
+            job = cursor.fetchone()
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        check_job_access(job, current_user)
+        return job
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Database error: {str(e)}")
+
+
+@router.get("")
+def list_jobs(
+    status: Optional[str] = None,
+    kind: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    conn=Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """Recent jobs, newest first. Branch managers see the jobs they submitted."""
+    user_type = current_user.get("type").lower()
+    if user_type not in ["admin", "branch_manager"]:
+        raise HTTPException(
+            status_code=403, detail="Only admins and branch managers can view jobs.")
+
+    try:
+        query = """
+            SELECT job_id, kind, params, status, progress, progress_message, error,
+                   attempts, submitted_by, submitted_at, started_at, finished_at
+            FROM JobQueue WHERE true
+        """
+        params = []
+        if user_type == "branch_manager":
+            query += " AND submitted_by = %s"
+            params.append(current_user.get("username"))
+        if status:
+            query += " AND status = %s"
+            params.append(status)
+        if kind:
+            query += " AND kind = %s"
+            params.append(kind)
+        query += " ORDER BY submitted_at DESC LIMIT %s"
+        params.append(limit)
+
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Database error: {str(e)}")
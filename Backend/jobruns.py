@@ -0,0 +1,160 @@
+import os
+import time
+import socket
+import logging
+import statistics
+from contextlib import contextmanager
+from psycopg2.extras import RealDictCursor
+from database import connect
+
+logger = logging.getLogger(__name__)
+
+# Which process ran a job: several API workers/containers may run the scheduler
+NODE = f"{socket.gethostname()}:{os.getpid()}"
+
+# Recent successful runs compared against the runs before them
+RECENT_RUNS = 5
+BASELINE_RUNS = 20
+# A job is flagged as slowing down once its recent median duration exceeds
+# its baseline median by this factor
+JOB_SLOWDOWN_RATIO = float(os.getenv("JOB_SLOWDOWN_RATIO", 1.5))
+
+
+def start_run(job_name: str, trigger: str, triggered_by: str = None):
+    """Insert a 'running' row; returns its run_id, or None if it could not be recorded."""
+    try:
+        conn = connect()
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO JobRun (job_name, trigger, triggered_by, node)
+                VALUES (%s, %s, %s, %s)
+                RETURNING run_id
+            """, (job_name, trigger, triggered_by, NODE))
+            return cursor.fetchone()[0]
+    except Exception as e:
+        # History must never stop a job from running
+        logger.warning(f"Could not record start of {job_name} run: {str(e)}")
+        return None
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+
+def finish_run(run_id, status: str, duration_ms: float, report: dict = None, error: str = None):
+    if run_id is None:
+        return
+    report = report or {}
+    try:
+        conn = connect()
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE JobRun
+                SET status = %s, finished_at = NOW(), duration_ms = %s,
+                    rows_processed = %s, total_interest = %s, total_amount = %s,
+                    partitions = %s, failed_partitions = %s, error = %s
+                WHERE run_id = %s
+            """, (
+                status,
+                round(duration_ms, 1),
+                report.get("postings"),
+                report.get("total_interest"),
+                report.get("total_amount"),
+                report.get("partitions"),
+                len(report.get("failed_partitions") or []),
+                error,
+                run_id,
+            ))
+    except Exception as e:
+        logger.warning(f"Could not record end of job run {run_id}: {str(e)}")
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+
+@contextmanager
+def record_run(job_name: str, trigger: str, triggered_by: str = None):
+    """
+    Record one job run in JobRun. The body stores the job's report in
+    run["report"]; counts and totals are taken from it.
+    """
+    run = {"run_id": start_run(job_name, trigger, triggered_by), "report": None}
+    started = time.perf_counter()
+    try:
+        yield run
+    except Exception as e:
+        finish_run(run["run_id"], "failed", (time.perf_counter() - started) * 1000,
+                   run["report"], getattr(e, "detail", None) or str(e))
+        raise
+    else:
+        finish_run(run["run_id"], "succeeded", (time.perf_counter() - started) * 1000,
+                   run["report"])
+
+
+def median(values: list):
+    return round(statistics.median(values), 1) if values else None
+
+
+def job_trend(runs: list) -> dict:
+    """Duration trend of one job from its runs, newest first."""
+    succeeded = [r for r in runs if r['status'] == 'succeeded' and r['duration_ms'] is not None]
+    recent = succeeded[:RECENT_RUNS]
+    baseline = succeeded[RECENT_RUNS:RECENT_RUNS + BASELINE_RUNS]
+
+    def per_row(rows):
+        return [float(r['duration_ms']) / r['rows_processed'] for r in rows if r['rows_processed']]
+
+    recent_ms = median([float(r['duration_ms']) for r in recent])
+    baseline_ms = median([float(r['duration_ms']) for r in baseline])
+    change_pct = None
+    if recent_ms is not None and baseline_ms:
+        change_pct = round((recent_ms - baseline_ms) / baseline_ms * 100, 1)
+
+    recent_per_row = per_row(recent)
+    baseline_per_row = per_row(baseline)
+
+    return {
+        "runs": len(runs),
+        "succeeded": len(succeeded),
+        "failed": sum(1 for r in runs if r['status'] == 'failed'),
+        "running": sum(1 for r in runs if r['status'] == 'running'),
+        "last_started_at": runs[0]['started_at'] if runs else None,
+        "last_status": runs[0]['status'] if runs else None,
+        "recent_median_ms": recent_ms,
+        "baseline_median_ms": baseline_ms,
+        "change_pct": change_pct,
+        "recent_ms_per_row": round(statistics.median(recent_per_row), 4) if recent_per_row else None,
+        "baseline_ms_per_row": round(statistics.median(baseline_per_row), 4) if baseline_per_row else None,
+        # Judged on duration: per-row cost alone hides a job that got slow because the book grew
+        "slowing_down": bool(recent_ms and baseline_ms
+                             and recent_ms > baseline_ms * JOB_SLOWDOWN_RATIO),
+    }
+
+
+def recent_runs(cursor, days: int, job_name: str = None) -> list:
+    query = """
+        SELECT run_id, job_name, trigger, triggered_by, node, status,
+               started_at, finished_at, duration_ms, rows_processed,
+               total_interest, total_amount, partitions, failed_partitions, error
+        FROM JobRun
+        WHERE started_at >= NOW() - make_interval(days => %s)
+    """
+    params = [days]
+    if job_name:
+        query += " AND job_name = %s"
+        params.append(job_name)
+    cursor.execute(query + " ORDER BY started_at DESC", params)
+    return cursor.fetchall()
+
+
+def last_runs(conn) -> dict:
+    """Most recent run of each job."""
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute("""
+            SELECT DISTINCT ON (job_name)
+                   job_name, status, started_at, finished_at, duration_ms, rows_processed, node
+            FROM JobRun
+            ORDER BY job_name, started_at DESC
+        """)
+        return {row['job_name']: row for row in cursor.fetchall()}
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from psycopg2.extras import RealDictCursor
 from database import get_db
 from auth import get_current_user
+from cache import get_employee_branch
 from schemas import JointAccountCreate, JointAccountRead, AccountSearchRequest
 from datetime import datetime
 from decimal import Decimal
@@ -25,11 +26,7 @@ def create_joint_account(joint_account: JointAccountCreate, conn=Depends(get_db)
     try:
         with conn.cursor(cursor_factory=RealDictCursor) as cursor:
             # Get agent's branch_id
-            cursor.execute(
-                "SELECT branch_id FROM Employee WHERE employee_id = %s",
-                (employee_id,)
-            )
-            branch_row = cursor.fetchone()
+            branch_row = get_employee_branch(cursor, employee_id)
             if not branch_row or not branch_row['branch_id']:
                 raise HTTPException(
                     status_code=400, detail="Agent does not have a branch assigned"
@@ -160,11 +157,7 @@ def list_joint_accounts(conn=Depends(get_db), current_user=Depends(get_current_u
             if user_type == "branch_manager":
                 # Get branch_id from employee table
                 employee_id = current_user.get("employee_id")
-                cursor.execute(
-                    "SELECT branch_id FROM Employee WHERE employee_id = %s",
-                    (employee_id,)
-                )
-                branch_row = cursor.fetchone()
+                branch_row = get_employee_branch(cursor, employee_id)
                 if not branch_row or not branch_row['branch_id']:
                     raise HTTPException(
                         status_code=400, detail="Branch manager does not have a branch assigned"
@@ -0,0 +1,219 @@
+import os
+import re
+import time
+import asyncio
+import logging
+from contextvars import ContextVar
+import anyio.to_thread
+from fastapi.responses import JSONResponse
+import metrics
+import querylog
+
+logger = logging.getLogger(__name__)
+
+# Concurrent requests per lane and worker. A request holds at most one pooled
+# connection, so limits summing to DB_POOL_MAX keep a busy lane from taking
+# the connections and threads of the others. Uploads are not counted: they
+# spend their slot receiving the body and take a connection only for the COPY.
+LANE_LIMITS = {
+    "posting": int(os.getenv("LANE_POSTING_CONCURRENCY", 8)),
+    "lookups": int(os.getenv("LANE_LOOKUPS_CONCURRENCY", 6)),
+    "reports": int(os.getenv("LANE_REPORTS_CONCURRENCY", 4)),
+    "batch": int(os.getenv("LANE_BATCH_CONCURRENCY", 2)),
+    "uploads": int(os.getenv("LANE_UPLOADS_CONCURRENCY", 1)),
+}
+# Longest a request waits for a slot in its lane before getting a 503
+LANE_QUEUE_TIMEOUT = float(os.getenv("LANE_QUEUE_TIMEOUT", 10))
+
+# statement_timeout of the connections a lane's requests check out
+LANE_STATEMENT_TIMEOUT_MS = {
+    "posting": int(os.getenv("LANE_POSTING_STATEMENT_TIMEOUT_MS", 5000)),
+    "lookups": int(os.getenv("LANE_LOOKUPS_STATEMENT_TIMEOUT_MS", 10000)),
+    "reports": int(os.getenv("LANE_REPORTS_STATEMENT_TIMEOUT_MS", 30000)),
+    "batch": int(os.getenv("LANE_BATCH_STATEMENT_TIMEOUT_MS", 10000)),
+    "uploads": int(os.getenv("LANE_UPLOADS_STATEMENT_TIMEOUT_MS", 120000)),
+}
+# A request still running this long after admission has its queries cancelled.
+# Uploads are admitted before their body arrives, so theirs covers the transfer too.
+LANE_DEADLINE_SECONDS = {
+    "posting": float(os.getenv("LANE_POSTING_DEADLINE_SECONDS", 15)),
+    "lookups": float(os.getenv("LANE_LOOKUPS_DEADLINE_SECONDS", 20)),
+    "reports": float(os.getenv("LANE_REPORTS_DEADLINE_SECONDS", 60)),
+    "batch": float(os.getenv("LANE_BATCH_DEADLINE_SECONDS", 20)),
+    "uploads": float(os.getenv("LANE_UPLOADS_DEADLINE_SECONDS", 600)),
+}
+
+# Probes and scrapes bypass the lanes so they answer even when lanes are full.
+# Event streams stay open for hours and hold no connection, so they must not
+# take a lane slot or be cancelled by its deadline.
+UNLANED_ROUTES = {"/health", "/ready", "/metrics", "/events/stream", "unmatched"}
+REPORT_ROUTES = re.compile(
+    r"^/views/report/|^/tasks/[\w-]+-report$|^/tasks/interest-projection$|"
+    r"^/tasks/job-runs$|/stats$|^/onboarding/customers/\{batch_id\}/report$")
+BATCH_ROUTES = re.compile(r"^/tasks/|^/views/refresh-views$|^/jobs|^/onboarding/")
+# File uploads: a large body and one long COPY
+UPLOAD_ROUTES = re.compile(r"^/onboarding/customers$")
+
+# Lane of the request being handled, for per-lane behaviour further down
+current_lane: ContextVar[str] = ContextVar("current_lane", default=None)
+
+
+def statement_timeout_ms():
+    """statement_timeout for a connection checked out now; None outside a lane."""
+    request = querylog.current_request.get()
+    if request is None or request.lane is None:
+        return None
+    return LANE_STATEMENT_TIMEOUT_MS[request.lane]
+
+
+def classify(method: str, route: str):
+    """Lane of a request from its method and route template; None for unlaned routes."""
+    if route in UNLANED_ROUTES or method == "OPTIONS":
+        return None
+    if REPORT_ROUTES.search(route):
+        return "reports"
+    if method in ("GET", "HEAD"):
+        return "lookups"
+    if method == "POST" and UPLOAD_ROUTES.search(route):
+        return "uploads"
+    if BATCH_ROUTES.search(route):
+        return "batch"
+    # Searches are POSTs but only read; logins and stream tickets are not money movement
+    if route.endswith("/search") or route.startswith("/auth/") or route == "/events/ticket":
+        return "lookups"
+    return "posting"
+
+
+class Lane:
+    """Bounded concurrency for one class of requests; waiters queue on the event loop, not on threads."""
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.in_use = 0
+        self.waiting = 0
+        self._semaphore = None
+
+    async def acquire(self, timeout: float) -> bool:
+        # Created lazily so it binds to the worker's event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        self.waiting += 1
+        metrics.set_lane_stats(self.name, self.stats())
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiting -= 1
+        self.in_use += 1
+        metrics.set_lane_stats(self.name, self.stats())
+        return True
+
+    def release(self):
+        self.in_use -= 1
+        self._semaphore.release()
+        metrics.set_lane_stats(self.name, self.stats())
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "in_use": self.in_use, "waiting": self.waiting}
+
+
+LANES = {name: Lane(name, limit) for name, limit in LANE_LIMITS.items()}
+
+
+def configure_threadpool():
+    """
+    Sync handlers and dependencies run on AnyIO's default thread limiter.
+    Make sure it has a thread for every lane slot plus room for unlaned
+    routes, so lanes, not the shared threadpool, decide who waits.
+    """
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    needed = sum(LANE_LIMITS.values()) + 4
+    if limiter.total_tokens < needed:
+        limiter.total_tokens = needed
+    logger.info(f"Execution lanes: {LANE_LIMITS}, threadpool size {limiter.total_tokens}")
+
+
+async def cancel_request(request: querylog.RequestScope, reason: str):
+    if request.cancelled:
+        return
+    logger.warning(f"Cancelling {request.lane} request: {reason}")
+    metrics.observe_cancellation(request.lane, reason)
+    # conn.cancel() blocks on a round trip to the server; keep it off the loop
+    await asyncio.get_running_loop().run_in_executor(None, request.cancel, reason)
+
+
+async def watch_client(receive, messages: asyncio.Queue, responded: asyncio.Event,
+                       request: querylog.RequestScope):
+    """Relay client messages to the app and cancel the request if the client leaves early."""
+    while True:
+        message = await receive()
+        messages.put_nowait(message)
+        if message["type"] == "http.disconnect":
+            # Servers also report a disconnect once the response is complete
+            if not responded.is_set():
+                await cancel_request(request, "client disconnected")
+            return
+
+
+async def enforce_deadline(seconds: float, request: querylog.RequestScope):
+    await asyncio.sleep(seconds)
+    await cancel_request(request, "deadline passed")
+
+
+class LaneMiddleware:
+    """ASGI middleware admitting each request into its lane before any handler code runs."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = querylog.current_route.get()
+        if route == "background":
+            route = metrics.resolve_route(scope["app"], scope)
+        lane = LANES.get(classify(scope["method"], route))
+        if lane is None:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        acquired = await lane.acquire(LANE_QUEUE_TIMEOUT)
+        metrics.observe_lane_wait(lane.name, time.perf_counter() - started, rejected=not acquired)
+        if not acquired:
+            logger.warning(f"Lane {lane.name} full, rejected {scope['method']} {route}")
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Service busy, please retry shortly"},
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+
+        request = querylog.RequestScope(lane.name)
+        messages = asyncio.Queue()
+        responded = asyncio.Event()
+
+        async def send_wrapper(message):
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                responded.set()
+
+        watchers = [
+            asyncio.create_task(watch_client(receive, messages, responded, request)),
+            asyncio.create_task(enforce_deadline(LANE_DEADLINE_SECONDS[lane.name], request)),
+        ]
+        lane_token = current_lane.set(lane.name)
+        request_token = querylog.current_request.set(request)
+        try:
+            await self.app(scope, messages.get, send_wrapper)
+        finally:
+            for watcher in watchers:
+                watcher.cancel()
+            querylog.current_request.reset(request_token)
+            current_lane.reset(lane_token)
+            lane.release()
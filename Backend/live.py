@@ -0,0 +1,320 @@
+import os
+import json
+import time
+import hashlib
+import secrets
+import asyncio
+import logging
+import threading
+from typing import Optional
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from psycopg2.extras import RealDictCursor
+from psycopg2.extensions import QueryCanceledError
+from jose import jwt
+import metrics
+import notifications
+from auth import user_from_token, get_current_user, get_user_by_username, oauth2_scheme
+from cache import get_employee_branch, normalize_key
+from database import db_pool, get_db
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# NOTIFY channel fed by the triggers in init-scripts/13-live-events.sql
+LIVE_CHANNEL = "live_events"
+# Events buffered per stream; a client that falls further behind is told to resync
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", 256))
+# Comment lines keep proxies and load balancers from closing idle streams
+LIVE_KEEPALIVE_SECONDS = float(os.getenv("LIVE_KEEPALIVE_SECONDS", 15))
+# Open streams per worker process
+LIVE_MAX_STREAMS = int(os.getenv("LIVE_MAX_STREAMS", 500))
+# How long EventSource waits before reconnecting after a dropped stream
+LIVE_RETRY_MS = 3000
+# How long a stream ticket can be redeemed after it was issued
+LIVE_TICKET_SECONDS = int(os.getenv("LIVE_TICKET_SECONDS", 30))
+
+# Streams of this worker; written from the event loop, read from the listener thread
+_subscribers = set()
+_lock = threading.Lock()
+
+
+def frame(event_type: str, data) -> bytes:
+    return f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n".encode()
+
+
+class Subscriber:
+    """One open stream: who is listening and the events waiting to be sent to them."""
+
+    def __init__(self, loop, user: dict, branch_id: Optional[str]):
+        self.loop = loop
+        self.queue = asyncio.Queue(LIVE_QUEUE_SIZE)
+        # Both spellings of the manager type are in use
+        self.type = user.get("type", "").lower().replace(" ", "_")
+        self.username = user.get("username")
+        self.employee_id = normalize_key(user.get("employee_id"))
+        self.branch_id = normalize_key(branch_id)
+        self.lagged = False
+
+    def wants(self, event: dict) -> bool:
+        """Admins see everything, managers their branch, agents the accounts they manage."""
+        event_type = event.get("type")
+        if event_type == "resync" or self.type == "admin":
+            return True
+        if event_type in ("job", "job_run"):
+            return self.username is not None and event.get("submitted_by") == self.username
+        if self.type == "branch_manager":
+            return self.branch_id is not None and event.get("branch_id") == self.branch_id
+        if self.type == "agent":
+            if event_type == "bulk":
+                return self.branch_id is not None and event.get("branch_id") == self.branch_id
+            return self.employee_id is not None and event.get("agent_id") == self.employee_id
+        return False
+
+    def offer(self, chunk: bytes):
+        # Runs on the event loop
+        if self.lagged:
+            return
+        try:
+            self.queue.put_nowait(chunk)
+        except asyncio.QueueFull:
+            self.lagged = True
+
+
+def _deliver(targets, chunk: bytes):
+    for subscriber in targets:
+        subscriber.offer(chunk)
+
+
+def publish(event):
+    """
+    Fan one notification out to the streams that want it. Called in the
+    listener thread; the event is encoded once and handed to each event
+    loop in a single callback.
+    """
+    if not isinstance(event, dict) or "type" not in event:
+        logger.warning(f"Ignoring malformed live event: {event!r}")
+        return
+    metrics.observe_live_event(event["type"])
+
+    with _lock:
+        subscribers = list(_subscribers)
+    by_loop = {}
+    for subscriber in subscribers:
+        if subscriber.wants(event):
+            by_loop.setdefault(subscriber.loop, []).append(subscriber)
+    if not by_loop:
+        return
+
+    chunk = frame(event["type"], event)
+    for loop, targets in by_loop.items():
+        try:
+            loop.call_soon_threadsafe(_deliver, targets, chunk)
+        except RuntimeError:  # loop closed during shutdown
+            pass
+
+
+def resync_all():
+    """Notifications sent while the listener was down are lost; tell every stream to refetch."""
+    with _lock:
+        count = len(_subscribers)
+    if count:
+        metrics.observe_live_resync("listener reconnected", count)
+    publish({"type": "resync", "reason": "listener reconnected"})
+
+
+def stream_count() -> int:
+    with _lock:
+        return len(_subscribers)
+
+
+def register(subscriber: Subscriber):
+    with _lock:
+        _subscribers.add(subscriber)
+        count = len(_subscribers)
+    metrics.set_live_streams(count)
+
+
+def unregister(subscriber: Subscriber):
+    with _lock:
+        _subscribers.discard(subscriber)
+        count = len(_subscribers)
+    metrics.set_live_streams(count)
+
+
+def ticket_hash(ticket: str) -> str:
+    return hashlib.sha256(ticket.encode()).hexdigest()
+
+
+def token_expiry(token: str) -> Optional[float]:
+    return jwt.get_unverified_claims(token).get("exp")
+
+
+def redeem_ticket(conn, ticket: str):
+    """User row and token expiry of a stream ticket, which is used up; raises 401 if invalid."""
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute("""
+            DELETE FROM StreamTicket
+            WHERE ticket_hash = %s
+            RETURNING username, token_expires_at, expires_at > NOW() AS valid
+        """, (ticket_hash(ticket),))
+        row = cursor.fetchone()
+    conn.commit()
+    user = get_user_by_username(conn, row["username"]) if row and row["valid"] else None
+    if user is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired stream ticket")
+    expires_at = row["token_expires_at"]
+    return user, expires_at.timestamp() if expires_at else None
+
+
+def resolve_caller(token: Optional[str], ticket: Optional[str]):
+    """
+    User row, branch and stream expiry of the caller, from a bearer token
+    or a stream ticket. Uses a connection only for the lookup, so an open
+    stream never holds one.
+    """
+    conn = db_pool.getconn()
+    try:
+        if token:
+            user, expires_at = user_from_token(conn, token), token_expiry(token)
+        else:
+            user, expires_at = redeem_ticket(conn, ticket)
+        branch = None
+        if user.get("employee_id"):
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                branch = get_employee_branch(cursor, user["employee_id"])
+        return user, branch["branch_id"] if branch else None, expires_at
+    finally:
+        db_pool.putconn(conn)
+
+
+def bearer_token(request: Request) -> Optional[str]:
+    authorization = request.headers.get("authorization", "")
+    scheme, _, credentials = authorization.partition(" ")
+    if scheme.lower() == "bearer" and credentials:
+        return credentials.strip()
+    return None
+
+
+async def event_stream(subscriber: Subscriber, expires_at: Optional[float]):
+    # Registered here rather than in the handler: a generator that never
+    # starts (client gone before the response) never runs its finally
+    register(subscriber)
+    try:
+        yield f"retry: {LIVE_RETRY_MS}\n".encode() + frame("ready", {
+            "type": subscriber.type,
+            "branch_id": subscriber.branch_id,
+            "employee_id": subscriber.employee_id,
+        })
+        while True:
+            timeout = LIVE_KEEPALIVE_SECONDS
+            if expires_at is not None:
+                timeout = min(timeout, max(expires_at - time.time(), 0))
+            try:
+                chunk = await asyncio.wait_for(subscriber.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                if expires_at is not None and time.time() >= expires_at:
+                    yield frame("expired", {"detail": "Access token expired, reconnect with a new one"})
+                    return
+                yield b": keepalive\n\n"
+                continue
+
+            if subscriber.lagged:
+                # Too far behind: drop the backlog instead of replaying it
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                subscriber.lagged = False
+                metrics.observe_live_resync("client lagging")
+                yield frame("resync", {"type": "resync", "reason": "client lagging"})
+                continue
+            yield chunk
+    finally:
+        unregister(subscriber)
+
+
+@router.post("/ticket")
+def issue_stream_ticket(
+    token: str = Depends(oauth2_scheme),
+    conn=Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """
+    A single-use ticket for opening GET /stream from clients that cannot
+    send an Authorization header, such as EventSource. Redeem it within
+    `expires_in` seconds; the stream then lasts as long as the access token
+    used here. Keeps the access token itself out of URLs and their logs.
+    """
+    ticket = secrets.token_urlsafe(32)
+    exp = token_expiry(token)
+    try:
+        with conn.cursor() as cursor:
+            # Unredeemed tickets are cleared by whoever issues the next one
+            cursor.execute("DELETE FROM StreamTicket WHERE expires_at < NOW()")
+            cursor.execute("""
+                INSERT INTO StreamTicket (ticket_hash, username, token_expires_at, expires_at)
+                VALUES (%s, %s, %s, NOW() + make_interval(secs => %s))
+            """, (ticket_hash(ticket), current_user["username"],
+                  datetime.fromtimestamp(exp, timezone.utc) if exp else None,
+                  LIVE_TICKET_SECONDS))
+        conn.commit()
+        return {"ticket": ticket, "expires_in": LIVE_TICKET_SECONDS}
+    except HTTPException:
+        raise
+    except QueryCanceledError:
+        raise
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(
+            status_code=500, detail=f"Database error: {str(e)}")
+
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    ticket: Optional[str] = Query(
+        None, description="Ticket from POST /events/ticket, for clients like EventSource "
+                          "that cannot send an Authorization header"),
+):
+    """
+    Server-sent events for the caller's scope: `transaction` for each
+    posting, `balance` for each balance change, `bulk` when a batch (such
+    as an interest run) changed many rows of a branch at once, and `job` /
+    `job_run` when a job the caller submitted finishes. Admins receive
+    every event, branch managers those of their branch, agents those of the
+    accounts they manage.
+
+    Events are not replayed: on `ready` (sent first, also after every
+    reconnect) and on `resync`, clients should refetch what they display.
+    The stream ends with `expired` when the access token does; reconnect
+    with a new one. Authenticate with a bearer header, or with a ticket;
+    access tokens are not accepted in the URL.
+    """
+    if stream_count() >= LIVE_MAX_STREAMS:
+        logger.warning(f"Live stream limit ({LIVE_MAX_STREAMS}) reached, rejecting new stream")
+        raise HTTPException(
+            status_code=503, detail="Too many open event streams, please retry shortly",
+            headers={"Retry-After": "5"})
+
+    token = bearer_token(request)
+    if token is None and not ticket:
+        raise HTTPException(
+            status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    user, branch_id, expires_at = await run_in_threadpool(resolve_caller, token, ticket)
+
+    subscriber = Subscriber(asyncio.get_running_loop(), user, branch_id)
+
+    return StreamingResponse(
+        event_stream(subscriber, expires_at),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Stops nginx from buffering the stream
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+notifications.subscribe(LIVE_CHANNEL, publish, on_reconnect=resync_all)
@@ -11,10 +11,33 @@ from fixedDeposit import router as fixed_deposit_router
 from jointAccounts import router as joint_accounts_router
 from tasks import router as tasks_router
 from views import router as views_router
+from metrics import router as metrics_router, PrometheusMiddleware
+from lanes import LaneMiddleware
+from admission import AdmissionMiddleware
+from compression import CompressionMiddleware
+from health import router as health_router
+from jobqueue import router as jobqueue_router
+from sync import router as sync_router
+from live import router as live_router
+from onboarding import router as onboarding_router
+from database import PoolTimeout
+from psycopg2.extensions import QueryCanceledError
+import querylog
+import metrics
+from fastapi import Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 
 app = FastAPI(title="Micro Banking System", version="1.0.0")
+# Added before PrometheusMiddleware so request latency includes lane queueing;
+# admission runs first so shed requests never queue in a lane
+app.add_middleware(LaneMiddleware)
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(PrometheusMiddleware)
+# Compresses every response body the app and the middlewares above produce
+app.add_middleware(CompressionMiddleware)
+# Outermost, so 429/503 responses from admission and lanes carry CORS headers
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -26,12 +49,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "Location", "ETag"],
 )
 
 
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    """All pooled connections are busy: ask the client to retry instead of failing"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Service busy, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(QueryCanceledError)
+async def query_cancelled_handler(request: Request, exc: QueryCanceledError):
+    """A statement hit its lane's statement_timeout or the request's deadline"""
+    scope = querylog.current_request.get()
+    if scope is not None and scope.cancelled is None:
+        metrics.observe_cancellation(scope.lane, "statement timeout")
+    return JSONResponse(
+        status_code=504,
+        content={"detail": "The request took too long and was cancelled. "
+                           "Narrow the date range or filters, or try again later."},
+    )
+
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize automatic tasks when the application starts"""
+    from lanes import configure_threadpool
+    configure_threadpool()
+
     try:
         from tasks import start_automatic_tasks
         start_automatic_tasks()
@@ -39,6 +89,30 @@ async def startup_event():
     except Exception as e:
         print(f"❌ Failed to start automatic tasks: {str(e)}")
 
+    try:
+        import cache  # registers the cache invalidation subscriber
+        from notifications import start_listener
+        start_listener()
+        print("✅ Cache invalidation listener started successfully")
+    except Exception as e:
+        print(f"❌ Failed to start cache invalidation listener: {str(e)}")
+
+    try:
+        from jobqueue import start_workers
+        start_workers()
+        print("✅ Job queue workers started successfully")
+    except Exception as e:
+        print(f"❌ Failed to start job queue workers: {str(e)}")
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    """Stop the per-worker notification listener and job queue workers"""
+    from notifications import stop_listener
+    from jobqueue import stop_workers
+    stop_workers()
+    stop_listener()
+
 
 # Include auth routes
 app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
@@ -57,6 +131,12 @@ app.include_router(tasks_router,
                    prefix='/tasks', tags=["Automated Tasks"])
 # Management Reports (router already has prefix/tags)
 app.include_router(views_router, prefix="/views", tags=["Management Reports"])
+app.include_router(metrics_router, tags=["Monitoring"])
+app.include_router(health_router, tags=["Monitoring"])
+app.include_router(jobqueue_router, prefix="/jobs", tags=["Jobs"])
+app.include_router(sync_router, prefix="/sync", tags=["Sync"])
+app.include_router(live_router, prefix="/events", tags=["Live Events"])
+app.include_router(onboarding_router, prefix="/onboarding", tags=["Customer Onboarding"])
 
 
 @app.get("/")
@@ -0,0 +1,258 @@
+import os
+import time
+from contextlib import contextmanager
+from fastapi import APIRouter, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from starlette.routing import Match
+import querylog
+
+router = APIRouter()
+
+# Under gunicorn every worker writes its samples to PROMETHEUS_MULTIPROC_DIR
+# and /metrics merges them, so counters and histograms cover the whole
+# container rather than whichever worker happened to answer the scrape.
+MULTIPROCESS_MODE = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+JOB_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0,
+               120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+# ==================== HTTP ====================
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests handled",
+    ["method", "route", "status"])
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency",
+    ["method", "route"], buckets=LATENCY_BUCKETS)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests currently being handled",
+    ["method", "route"], multiprocess_mode="livesum")
+HTTP_EXCEPTIONS = Counter(
+    "http_request_exceptions_total", "Requests that raised an unhandled exception",
+    ["method", "route", "exception"])
+
+# ==================== Database pool ====================
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections", "Pooled database connections by pool and state",
+    ["pool", "state"], multiprocess_mode="livesum")
+DB_POOL_WAITING = Gauge(
+    "db_pool_waiting_requests", "Requests waiting for a pooled connection",
+    ["pool"], multiprocess_mode="livesum")
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection",
+    ["pool"], buckets=LATENCY_BUCKETS)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total", "Connection checkouts that timed out", ["pool"])
+
+# ==================== Read replica ====================
+DB_READ_ROUTES = Counter(
+    "db_read_routes_total", "Read-only route connections by the database serving them",
+    ["target"])
+DB_REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds", "Last measured replication lag of the read replica",
+    multiprocess_mode="max")
+
+# ==================== SQL statements ====================
+DB_STATEMENT_DURATION = Histogram(
+    "db_statement_duration_seconds", "SQL statement latency by calling route",
+    ["route", "statement"], buckets=LATENCY_BUCKETS)
+DB_SLOW_STATEMENTS = Counter(
+    "db_slow_statements_total", "Statements slower than SLOW_QUERY_MS",
+    ["route", "statement"])
+
+# ==================== Execution lanes ====================
+LANE_REQUESTS = Gauge(
+    "lane_requests", "Requests in an execution lane by state",
+    ["lane", "state"], multiprocess_mode="livesum")
+LANE_LIMIT = Gauge(
+    "lane_limit", "Concurrent requests allowed per lane and worker",
+    ["lane"], multiprocess_mode="livesum")
+LANE_QUEUE_WAIT = Histogram(
+    "lane_queue_wait_seconds", "Time requests waited for a slot in their lane",
+    ["lane"], buckets=LATENCY_BUCKETS)
+LANE_REJECTIONS = Counter(
+    "lane_rejections_total", "Requests turned away because their lane stayed full",
+    ["lane"])
+LANE_CANCELLATIONS = Counter(
+    "lane_cancellations_total", "Requests whose queries were cancelled, by reason",
+    ["lane", "reason"])
+
+# ==================== Admission control ====================
+ADMISSION_DECISIONS = Counter(
+    "admission_decisions_total", "Admission decisions by lane and outcome",
+    ["lane", "outcome"])
+
+# ==================== Response caching ====================
+CONDITIONAL_GETS = Counter(
+    "conditional_get_total", "Validated GETs by route and whether the body was sent",
+    ["route", "result"])
+RESPONSE_COMPRESSION_BYTES = Counter(
+    "response_compression_bytes_total", "Response bytes before and after compression",
+    ["encoding", "stage"])
+
+# ==================== Live events ====================
+LIVE_STREAMS = Gauge(
+    "live_streams", "Open server-sent event streams",
+    multiprocess_mode="livesum")
+LIVE_EVENTS = Counter(
+    "live_events_total", "Live events received from the database by type",
+    ["type"])
+LIVE_RESYNCS = Counter(
+    "live_stream_resyncs_total", "Streams told to refetch because events were lost",
+    ["reason"])
+
+# ==================== Scheduler ====================
+JOB_DURATION = Histogram(
+    "scheduler_job_duration_seconds", "Duration of scheduled job runs",
+    ["job"], buckets=JOB_BUCKETS)
+JOB_RUNS = Counter(
+    "scheduler_job_runs_total", "Scheduled job runs by outcome",
+    ["job", "outcome"])
+JOB_LAST_SUCCESS = Gauge(
+    "scheduler_job_last_success_timestamp_seconds", "Unix time of the last successful run",
+    ["job"], multiprocess_mode="max")
+
+
+def observe_pool_checkout(pool: str, waited: float, timed_out: bool = False):
+    DB_POOL_CHECKOUT_WAIT.labels(pool).observe(waited)
+    if timed_out:
+        DB_POOL_TIMEOUTS.labels(pool).inc()
+
+
+def set_pool_stats(pool: str, stats: dict):
+    DB_POOL_CONNECTIONS.labels(pool, "in_use").set(stats["in_use"])
+    DB_POOL_CONNECTIONS.labels(pool, "available").set(stats["available"])
+    DB_POOL_WAITING.labels(pool).set(stats["waiting"])
+
+
+def observe_read_route(target: str):
+    DB_READ_ROUTES.labels(target).inc()
+
+
+def set_replica_lag(seconds: float):
+    DB_REPLICA_LAG.set(seconds)
+
+
+def set_lane_stats(lane: str, stats: dict):
+    LANE_REQUESTS.labels(lane, "in_use").set(stats["in_use"])
+    LANE_REQUESTS.labels(lane, "waiting").set(stats["waiting"])
+    LANE_LIMIT.labels(lane).set(stats["limit"])
+
+
+def observe_lane_wait(lane: str, waited: float, rejected: bool = False):
+    LANE_QUEUE_WAIT.labels(lane).observe(waited)
+    if rejected:
+        LANE_REJECTIONS.labels(lane).inc()
+
+
+def observe_cancellation(lane: str, reason: str):
+    LANE_CANCELLATIONS.labels(lane, reason).inc()
+
+
+def observe_admission(lane: str, outcome: str):
+    ADMISSION_DECISIONS.labels(lane, outcome).inc()
+
+
+def observe_conditional_get(not_modified: bool):
+    CONDITIONAL_GETS.labels(querylog.current_route.get(),
+                            "not_modified" if not_modified else "sent").inc()
+
+
+def observe_compression(encoding: str, original: int, compressed: int):
+    RESPONSE_COMPRESSION_BYTES.labels(encoding, "original").inc(original)
+    RESPONSE_COMPRESSION_BYTES.labels(encoding, "compressed").inc(compressed)
+
+
+def set_live_streams(count: int):
+    LIVE_STREAMS.set(count)
+
+
+def observe_live_event(event_type: str):
+    LIVE_EVENTS.labels(event_type).inc()
+
+
+def observe_live_resync(reason: str, streams: int = 1):
+    LIVE_RESYNCS.labels(reason).inc(streams)
+
+
+@contextmanager
+def track_job(job: str):
+    """Time one scheduled job run and record its outcome."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        JOB_RUNS.labels(job, "error").inc()
+        raise
+    else:
+        JOB_RUNS.labels(job, "success").inc()
+        JOB_LAST_SUCCESS.labels(job).set(time.time())
+    finally:
+        JOB_DURATION.labels(job).observe(time.perf_counter() - started)
+
+
+def resolve_route(app, scope) -> str:
+    """
+    Map a request to its route template (e.g. /customers/customers/agent/{employee_id})
+    so label cardinality stays bounded by the number of routes.
+    """
+    for route in app.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", scope["path"])
+    return "unmatched"
+
+
+class PrometheusMiddleware:
+    """ASGI middleware recording per-route counts, latency and in-flight requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = resolve_route(scope["app"], scope)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = HTTP_IN_PROGRESS.labels(method, route)
+        in_progress.inc()
+        # Lets querylog tag every SQL statement with the route that issued it
+        route_token = querylog.current_route.set(route)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            HTTP_EXCEPTIONS.labels(method, route, type(e).__name__).inc()
+            raise
+        finally:
+            HTTP_LATENCY.labels(method, route).observe(
+                time.perf_counter() - started)
+            HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+            in_progress.dec()
+            querylog.current_route.reset(route_token)
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus scrape endpoint"""
+    if MULTIPROCESS_MODE:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,126 @@
+import json
+import logging
+import select
+import threading
+import time
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from database import DATABASE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# One LISTEN connection per worker process, shared by every subscriber
+_subscribers = {}
+_reconnect_callbacks = []
+_lock = threading.Lock()
+_listening = threading.Event()
+_listener_running = False
+_listener_thread = None
+
+POLL_INTERVAL_SECONDS = 1.0
+RECONNECT_DELAY_SECONDS = 2.0
+
+
+def subscribe(channel: str, callback, on_reconnect=None):
+    """
+    Register a callback for a NOTIFY channel.
+    The callback receives the decoded JSON payload (or the raw string when it is not JSON).
+    on_reconnect is called every time the listener (re)connects, because any
+    notifications sent while it was disconnected are lost.
+    """
+    with _lock:
+        _subscribers.setdefault(channel, []).append(callback)
+        if on_reconnect is not None:
+            _reconnect_callbacks.append(on_reconnect)
+
+
+def is_listening() -> bool:
+    """True while the listener connection is up and receiving notifications."""
+    return _listening.is_set()
+
+
+def _dispatch(channel: str, payload: str):
+    try:
+        data = json.loads(payload) if payload else None
+    except ValueError:
+        data = payload
+
+    with _lock:
+        callbacks = list(_subscribers.get(channel, []))
+
+    for callback in callbacks:
+        try:
+            callback(data)
+        except Exception as e:
+            logger.error(
+                f"Error handling notification on {channel}: {str(e)}")
+
+
+def _run_reconnect_callbacks():
+    with _lock:
+        callbacks = list(_reconnect_callbacks)
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"Error in notification reconnect hook: {str(e)}")
+
+
+def _listen_forever():
+    while _listener_running:
+        conn = None
+        try:
+            conn = psycopg2.connect(**DATABASE_CONFIG)
+            conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            listened = set()
+
+            while _listener_running:
+                # Pick up channels subscribed after the listener started
+                with _lock:
+                    pending = set(_subscribers) - listened
+                if pending:
+                    with conn.cursor() as cursor:
+                        for channel in pending:
+                            cursor.execute(f'LISTEN "{channel}"')
+                    listened |= pending
+                    if not _listening.is_set():
+                        _listening.set()
+                        _run_reconnect_callbacks()
+                        logger.info(
+                            f"Notification listener connected: {', '.join(sorted(listened))}")
+
+                if select.select([conn], [], [], POLL_INTERVAL_SECONDS) == ([], [], []):
+                    continue
+
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    _dispatch(notify.channel, notify.payload)
+
+        except Exception as e:
+            logger.warning(f"Notification listener disconnected: {str(e)}")
+        finally:
+            _listening.clear()
+            if conn is not None:
+                conn.close()
+
+        if _listener_running:
+            time.sleep(RECONNECT_DELAY_SECONDS)
+
+
+def start_listener():
+    """Start the per-worker LISTEN thread if it is not running yet."""
+    global _listener_running, _listener_thread
+    if _listener_running:
+        return
+    _listener_running = True
+    _listener_thread = threading.Thread(
+        target=_listen_forever, name="pg-notify-listener", daemon=True)
+    _listener_thread.start()
+
+
+def stop_listener():
+    """Stop the LISTEN thread; caches stop serving until it is restarted."""
+    global _listener_running
+    _listener_running = False
+    _listening.clear()
@@ -0,0 +1,476 @@
+import io
+import os
+import csv
+import logging
+import tempfile
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
+from psycopg2.extras import RealDictCursor
+from psycopg2.extensions import QueryCanceledError
+from database import get_db, pooled_connection, connect
+from auth import get_current_user, get_current_user_detached
+from cache import get_employee_branch, normalize_key
+import jobqueue
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+IMPORT_JOB = "customer_import"
+
+# Largest CSV accepted in one upload (200k customers are roughly 30 MB)
+ONBOARDING_MAX_BYTES = int(os.getenv("ONBOARDING_MAX_BYTES", 64 * 1024 * 1024))
+# Staged rows of finished batches are kept this long for their reports
+ONBOARDING_RETENTION_DAYS = int(os.getenv("ONBOARDING_RETENTION_DAYS", 7))
+# Uploads are buffered in memory up to this size, on disk beyond it
+SPOOL_MEMORY_BYTES = 8 * 1024 * 1024
+
+# CSV header names; employee_id may be left out when a default agent is given
+REQUIRED_COLUMNS = ("name", "nic", "phone_number", "address", "date_of_birth")
+OPTIONAL_COLUMNS = ("email", "employee_id")
+
+# Customer IDs are CHAR(10): 'CUST' and at most six digits
+MAX_CUSTOMER_NUMBER = 999999
+
+# One pass over the batch: trims fields, numbers the rows in file order and
+# records the first problem of each row
+VALIDATE_FIELDS = """
+    UPDATE CustomerImportRow r
+    SET row_no = n.row_no,
+        name = btrim(r.name),
+        nic = btrim(r.nic),
+        phone_number = btrim(r.phone_number),
+        address = btrim(r.address),
+        date_of_birth = btrim(r.date_of_birth),
+        email = NULLIF(btrim(r.email), ''),
+        employee_id = COALESCE(NULLIF(btrim(r.employee_id), ''), %(default_employee_id)s),
+        error = CASE
+            WHEN COALESCE(btrim(r.name), '') = '' THEN 'name is required'
+            WHEN length(btrim(r.name)) > 50 THEN 'name is longer than 50 characters'
+            WHEN COALESCE(btrim(r.nic), '') = '' THEN 'nic is required'
+            WHEN length(btrim(r.nic)) > 12 THEN 'nic is longer than 12 characters'
+            WHEN COALESCE(btrim(r.phone_number), '') = '' THEN 'phone_number is required'
+            WHEN length(btrim(r.phone_number)) > 10 THEN 'phone_number is longer than 10 characters'
+            WHEN COALESCE(btrim(r.address), '') = '' THEN 'address is required'
+            WHEN length(btrim(r.address)) > 255 THEN 'address is longer than 255 characters'
+            WHEN NOT is_iso_date(COALESCE(btrim(r.date_of_birth), ''))
+                THEN 'date_of_birth must be a date written as YYYY-MM-DD'
+            WHEN btrim(r.date_of_birth)::date > CURRENT_DATE THEN 'date_of_birth is in the future'
+            WHEN length(btrim(r.email)) > 255 THEN 'email is longer than 255 characters'
+            WHEN COALESCE(NULLIF(btrim(r.employee_id), ''), %(default_employee_id)s) IS NULL
+                THEN 'employee_id is required'
+        END
+    FROM (
+        SELECT row_id, row_number() OVER (ORDER BY row_id) AS row_no
+        FROM CustomerImportRow WHERE batch_id = %(batch_id)s
+    ) n
+    WHERE r.batch_id = %(batch_id)s AND r.row_id = n.row_id
+"""
+
+VALIDATE_AGENTS = """
+    UPDATE CustomerImportRow r
+    SET error = 'employee_id ' || r.employee_id || ' is not an active agent'
+        || CASE WHEN %(branch_id)s::text IS NULL THEN '' ELSE ' of branch ' || %(branch_id)s END
+    WHERE r.batch_id = %(batch_id)s AND r.error IS NULL
+    AND NOT EXISTS (
+        SELECT 1 FROM Employee e
+        WHERE e.employee_id = r.employee_id AND e.type = 'Agent' AND e.status
+        AND (%(branch_id)s::text IS NULL OR e.branch_id = %(branch_id)s)
+    )
+"""
+
+# Later rows repeating a NIC of the same file are rejected; the first is kept
+VALIDATE_FILE_DUPLICATES = """
+    UPDATE CustomerImportRow r
+    SET error = 'nic repeats row ' || d.first_row_no
+    FROM (
+        SELECT row_id,
+               first_value(row_no) OVER (PARTITION BY nic ORDER BY row_id) AS first_row_no,
+               row_number() OVER (PARTITION BY nic ORDER BY row_id) AS occurrence
+        FROM CustomerImportRow
+        WHERE batch_id = %(batch_id)s AND error IS NULL
+    ) d
+    WHERE r.batch_id = %(batch_id)s AND r.row_id = d.row_id AND d.occurrence > 1
+"""
+
+VALIDATE_EXISTING_NICS = """
+    UPDATE CustomerImportRow r
+    SET error = 'nic already registered to ' || rtrim(c.customer_id)
+    FROM Customer c
+    WHERE r.batch_id = %(batch_id)s AND r.error IS NULL AND c.nic = r.nic
+"""
+
+LAST_CUSTOMER_NUMBER = """
+    SELECT COALESCE(MAX(CAST(TRIM(SUBSTRING(customer_id FROM 5)) AS INT)), 0) AS last
+    FROM Customer
+    WHERE customer_id LIKE 'CUST%'
+"""
+
+ALLOCATE_IDS = """
+    UPDATE CustomerImportRow r
+    SET customer_id = 'CUST' || LPAD((%(last)s + n.seq)::text, 3, '0')
+    FROM (
+        SELECT row_id, row_number() OVER (ORDER BY row_id) AS seq
+        FROM CustomerImportRow
+        WHERE batch_id = %(batch_id)s AND error IS NULL
+    ) n
+    WHERE r.batch_id = %(batch_id)s AND r.row_id = n.row_id
+"""
+
+MERGE_CUSTOMERS = """
+    INSERT INTO Customer (customer_id, name, nic, phone_number, address, date_of_birth,
+                          email, status, employee_id)
+    SELECT customer_id, name, nic, phone_number, address, date_of_birth::date,
+           email, TRUE, employee_id
+    FROM CustomerImportRow
+    WHERE batch_id = %(batch_id)s AND customer_id IS NOT NULL
+    ORDER BY row_id
+"""
+
+PURGE_OLD_BATCHES = """
+    DELETE FROM CustomerImportRow
+    WHERE batch_id IN (
+        SELECT batch_id FROM CustomerImport
+        WHERE finished_at < NOW() - make_interval(days => %s)
+    )
+"""
+
+BATCH_COLUMNS = """
+    batch_id, submitted_by, status, rows_staged, rows_merged, rows_rejected,
+    first_customer_id, last_customer_id, error, created_at, finished_at
+"""
+
+
+def report_url(batch_id: int) -> str:
+    return f"/onboarding/customers/{batch_id}/report"
+
+
+def read_header(upload) -> list:
+    """Column names of the CSV header, checked against the Customer fields."""
+    line = upload.readline().decode("utf-8-sig", errors="replace")
+    upload.seek(0)
+    columns = [name.strip().lower() for name in next(csv.reader([line]), [])]
+
+    unknown = [name for name in columns if name not in REQUIRED_COLUMNS + OPTIONAL_COLUMNS]
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if not columns or unknown or missing or len(set(columns)) != len(columns):
+        raise HTTPException(
+            status_code=400,
+            detail=f"The first line must name the columns: {', '.join(REQUIRED_COLUMNS)} "
+                   f"and optionally {', '.join(OPTIONAL_COLUMNS)}, each once"
+                   + (f"; unknown: {', '.join(unknown)}" if unknown else "")
+                   + (f"; missing: {', '.join(missing)}" if missing else ""))
+    return columns
+
+
+def stage_upload(upload, current_user, default_employee_id: Optional[str],
+                 all_or_nothing: bool):
+    """
+    COPY an uploaded CSV into a new batch and queue the job that merges it.
+    Takes a connection only now, once the whole body has been spooled.
+    """
+    columns = read_header(upload)
+    if "employee_id" not in columns and default_employee_id is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Add an employee_id column or pass default_employee_id")
+
+    with pooled_connection() as conn:
+        try:
+            return stage_batch(conn, upload, columns, current_user,
+                               default_employee_id, all_or_nothing)
+        except HTTPException:
+            raise
+        except QueryCanceledError:
+            raise
+        except Exception as e:
+            conn.rollback()
+            raise HTTPException(
+                status_code=500, detail=f"Database error: {str(e)}")
+
+
+def stage_batch(conn, upload, columns: list, current_user,
+                default_employee_id: Optional[str], all_or_nothing: bool):
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        branch_id = None
+        if current_user.get('type').lower() != 'admin':
+            branch = get_employee_branch(cursor, current_user.get('employee_id'))
+            if branch is None:
+                raise HTTPException(status_code=403, detail="Your branch could not be determined")
+            branch_id = normalize_key(branch['branch_id'])
+
+        cursor.execute("""
+            INSERT INTO CustomerImport (submitted_by, branch_id, default_employee_id, all_or_nothing)
+            VALUES (%s, %s, %s, %s)
+            RETURNING batch_id
+        """, (current_user.get('username'), branch_id, default_employee_id, all_or_nothing))
+        batch_id = cursor.fetchone()['batch_id']
+
+        # Default of CustomerImportRow.batch_id, so the file needs no such column
+        cursor.execute("SELECT set_config('onboarding.batch_id', %s, true)", (str(batch_id),))
+        try:
+            cursor.copy_expert(
+                f"COPY CustomerImportRow ({', '.join(columns)}) "
+                f"FROM STDIN WITH (FORMAT csv, HEADER true, ENCODING 'UTF8')", upload)
+        except QueryCanceledError:
+            raise
+        except Exception as e:
+            # Malformed CSV; PostgreSQL's message names the offending line
+            conn.rollback()
+            raise HTTPException(status_code=400, detail=f"Could not read the CSV: {str(e).strip()}")
+        cursor.execute(
+            "SELECT COUNT(*) AS staged FROM CustomerImportRow WHERE batch_id = %s", (batch_id,))
+        rows = cursor.fetchone()['staged']
+
+        if rows == 0:
+            conn.rollback()
+            raise HTTPException(status_code=400, detail="The CSV has no customer rows")
+
+        cursor.execute(
+            "UPDATE CustomerImport SET rows_staged = %s WHERE batch_id = %s", (rows, batch_id))
+        # submit() commits the staged batch together with its job
+        job = jobqueue.submit(conn, IMPORT_JOB, {"batch_id": batch_id}, current_user.get('username'))
+
+    logger.info(f"Staged {rows} customers as import batch {batch_id}")
+    return jobqueue.accepted(
+        job, f"{rows} customers staged for import",
+        batch_id=batch_id, rows_staged=rows, report_url=report_url(batch_id))
+
+
+def batch_summary(batch: dict) -> dict:
+    summary = {key: batch[key] for key in (
+        "batch_id", "status", "rows_staged", "rows_merged", "rows_rejected",
+        "first_customer_id", "last_customer_id")}
+    summary["first_customer_id"] = normalize_key(summary["first_customer_id"])
+    summary["last_customer_id"] = normalize_key(summary["last_customer_id"])
+    summary["report_url"] = report_url(batch["batch_id"])
+    return summary
+
+
+def merge_batch(cursor, batch: dict, progress) -> dict:
+    """Validate a staged batch and insert its accepted rows; the caller commits."""
+    params = {
+        "batch_id": batch['batch_id'],
+        "branch_id": normalize_key(batch['branch_id']),
+        "default_employee_id": normalize_key(batch['default_employee_id']),
+    }
+    progress(0.05, "Checking fields")
+    cursor.execute(VALIDATE_FIELDS, params)
+    progress(0.25, "Checking agents")
+    cursor.execute(VALIDATE_AGENTS, params)
+    progress(0.35, "Checking for repeated NICs")
+    cursor.execute(VALIDATE_FILE_DUPLICATES, params)
+
+    # Blocks other customer inserts (not reads) until commit, so neither a
+    # NIC nor an ID can be taken between the checks and the insert
+    progress(0.45, "Waiting for the customer table")
+    cursor.execute("LOCK TABLE Customer IN SHARE ROW EXCLUSIVE MODE")
+    cursor.execute(VALIDATE_EXISTING_NICS, params)
+
+    cursor.execute(
+        "SELECT COUNT(*) FILTER (WHERE error IS NULL) AS accepted, "
+        "COUNT(*) FILTER (WHERE error IS NOT NULL) AS rejected "
+        "FROM CustomerImportRow WHERE batch_id = %(batch_id)s", params)
+    counts = cursor.fetchone()
+    accepted, rejected = counts['accepted'], counts['rejected']
+    if accepted + rejected != batch['rows_staged']:
+        # Unlogged rows do not survive a server crash
+        raise HTTPException(
+            status_code=409, detail="The staged rows were lost; upload the file again")
+
+    if rejected and batch['all_or_nothing']:
+        status, first_id, last_id, merged = 'rejected', None, None, 0
+    else:
+        cursor.execute(LAST_CUSTOMER_NUMBER)
+        last = cursor.fetchone()['last']
+        if last + accepted > MAX_CUSTOMER_NUMBER:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Not enough customer IDs left for {accepted} customers (last is CUST{last})")
+
+        progress(0.55, f"Creating {accepted} customers")
+        cursor.execute(ALLOCATE_IDS, {**params, "last": last})
+        cursor.execute(MERGE_CUSTOMERS, params)
+        merged = cursor.rowcount
+        status = 'merged'
+        first_id = f"CUST{last + 1:03d}" if merged else None
+        last_id = f"CUST{last + merged:03d}" if merged else None
+
+    cursor.execute(f"""
+        UPDATE CustomerImport
+        SET status = %s, rows_merged = %s, rows_rejected = %s,
+            first_customer_id = %s, last_customer_id = %s, finished_at = NOW()
+        WHERE batch_id = %s
+        RETURNING {BATCH_COLUMNS}
+    """, (status, merged, rejected, first_id, last_id, batch['batch_id']))
+    return cursor.fetchone()
+
+
+def import_batch(job: dict, progress) -> dict:
+    """Job queue handler: merge one staged batch in a single transaction."""
+    batch_id = job['params']['batch_id']
+    conn = connect()
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(f"""
+                SELECT {BATCH_COLUMNS}, branch_id, default_employee_id, all_or_nothing
+                FROM CustomerImport WHERE batch_id = %s FOR UPDATE
+            """, (batch_id,))
+            batch = cursor.fetchone()
+            if batch is None:
+                raise HTTPException(status_code=404, detail=f"Import batch {batch_id} not found")
+            # A retried job whose first attempt already committed
+            if batch['status'] != 'staged':
+                conn.rollback()
+                return batch_summary(batch)
+
+            try:
+                batch = merge_batch(cursor, batch, progress)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                error = getattr(e, "detail", None) or str(e)
+                cursor.execute("""
+                    UPDATE CustomerImport SET status = 'failed', error = %s, finished_at = NOW()
+                    WHERE batch_id = %s
+                """, (str(error), batch_id))
+                conn.commit()
+                raise
+
+        logger.info(f"Import batch {batch_id}: {batch['status']}, "
+                    f"{batch['rows_merged']} merged, {batch['rows_rejected']} rejected")
+
+        with conn.cursor() as cursor:
+            cursor.execute(PURGE_OLD_BATCHES, (ONBOARDING_RETENTION_DAYS,))
+        conn.commit()
+        return batch_summary(batch)
+    finally:
+        conn.close()
+
+
+jobqueue.register(IMPORT_JOB, import_batch)
+
+
+def check_batch_access(batch: dict, current_user):
+    if current_user.get('type').lower() == 'admin':
+        return
+    if batch['submitted_by'] == current_user.get('username'):
+        return
+    raise HTTPException(status_code=403, detail="You can only view imports you submitted.")
+
+
+@router.post("/customers", status_code=202)
+async def upload_customers(
+    request: Request,
+    default_employee_id: Optional[str] = Query(
+        None, max_length=10, description="Agent of rows that leave employee_id empty"),
+    all_or_nothing: bool = Query(
+        False, description="Create no customers at all when any row is rejected"),
+    current_user=Depends(get_current_user_detached)
+):
+    """
+    Bulk customer onboarding. The request body is a UTF-8 CSV file whose
+    first line names the columns: name, nic, phone_number, address,
+    date_of_birth (YYYY-MM-DD) and optionally email and employee_id (the
+    agent). Admins can assign any agent, branch managers the agents of
+    their branch.
+
+    The file is staged as it is, then validated and merged by a queued job:
+    returns a job ID at once; poll GET /jobs/{job_id}. Rows with problems
+    (missing or oversized fields, invalid dates, unknown or inactive agents,
+    NICs repeated in the file or already registered) are rejected and the
+    others are created in one transaction. Download the rejected rows from
+    report_url.
+    """
+    if current_user.get('type').lower() not in ['admin', 'branch_manager', 'branch manager']:
+        raise HTTPException(
+            status_code=403, detail="Only admins and branch managers can import customers")
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES) as upload:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > ONBOARDING_MAX_BYTES:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"The CSV is larger than {ONBOARDING_MAX_BYTES // (1024 * 1024)} MB; split it")
+            upload.write(chunk)
+        upload.seek(0)
+
+        return await run_in_threadpool(
+            stage_upload, upload, current_user,
+            normalize_key(default_employee_id) or None, all_or_nothing)
+
+
+@router.get("/customers/{batch_id}")
+def get_import(batch_id: int, conn=Depends(get_db), current_user=Depends(get_current_user)):
+    """Status and row counts of an import batch."""
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(
+                f"SELECT {BATCH_COLUMNS} FROM CustomerImport WHERE batch_id = %s", (batch_id,))
+            batch = cursor.fetchone()
+        if not batch:
+            raise HTTPException(status_code=404, detail="Import batch not found")
+        check_batch_access(batch, current_user)
+        return {**batch_summary(batch), "error": batch['error'],
+                "created_at": batch['created_at'], "finished_at": batch['finished_at']}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Database error: {str(e)}")
+
+
+# Staged rows are in an UNLOGGED table, which replicas do not have: primary only
+@router.get("/customers/{batch_id}/report")
+def download_import_report(
+    batch_id: int,
+    errors_only: bool = Query(True, description="Only the rejected rows; false adds the created customer IDs"),
+    conn=Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """
+    CSV of an import batch: the file's row number (1 is the first row after
+    the header), name, nic and agent of each rejected row with the reason,
+    or of every row with its new customer_id.
+    """
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(
+                f"SELECT {BATCH_COLUMNS} FROM CustomerImport WHERE batch_id = %s", (batch_id,))
+            batch = cursor.fetchone()
+            if not batch:
+                raise HTTPException(status_code=404, detail="Import batch not found")
+            check_batch_access(batch, current_user)
+            if batch['status'] == 'staged':
+                raise HTTPException(
+                    status_code=409, detail="The import has not been processed yet")
+
+            query = cursor.mogrify(f"""
+                COPY (
+                    SELECT row_no, name, nic, employee_id, rtrim(customer_id) AS customer_id, error
+                    FROM CustomerImportRow
+                    WHERE batch_id = %s {"AND error IS NOT NULL" if errors_only else ""}
+                    ORDER BY row_id
+                ) TO STDOUT WITH (FORMAT csv, HEADER true)
+            """, (batch_id,)).decode()
+            report = io.BytesIO()
+            cursor.copy_expert(query, report)
+
+        name = "errors" if errors_only else "rows"
+        return Response(
+            content=report.getvalue(),
+            media_type="text/csv",
+            headers={"Content-Disposition":
+                     f'attachment; filename="customer-import-{batch_id}-{name}.csv"'},
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Database error: {str(e)}")
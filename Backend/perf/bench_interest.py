@@ -0,0 +1,455 @@
+"""
+Micro-benchmarks for the interest and maturity engines.
+
+Every engine runs against a fresh copy of a generated dataset, in its own
+process, and reports accounts/sec, SQL round trips per account and peak
+memory. Engines of the same family (e.g. the partitioned scheduled run and
+the single-connection run) must leave the database in the same state; the
+run fails when their result digests differ.
+
+Run from the Backend directory with a role allowed to create databases:
+
+    python -m perf.bench_interest --scales 10k,100k,1m --output bench.json
+    python -m perf.bench_interest --scales 10k --family savings_interest
+
+Datasets are built once per scale as template databases
+(bench_interest_<scale>) from init-scripts/ and perf.datagen, and reused
+until --rebuild is given. Each engine run gets its own CREATE DATABASE ...
+TEMPLATE clone, so runs never see each other's writes.
+"""
+import argparse
+import importlib
+import inspect
+import json
+import logging
+import math
+import re
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime
+from pathlib import Path
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from database import DATABASE_CONFIG
+from perf import datagen
+
+logger = logging.getLogger(__name__)
+
+INIT_SCRIPTS = Path(__file__).resolve().parents[2] / "init-scripts"
+TEMPLATE_PREFIX = "bench_interest_"
+RUN_DATABASE = "bench_interest_run"
+# Opening quote of a dollar-quoted body: $$ or $tag$
+DOLLAR_QUOTE = re.compile(r"\$(?:[A-Za-z_][A-Za-z0-9_]*)?\$")
+
+# family -> {version: "module:function"}. Versions within a family must
+# produce identical results; add new implementations here to compare them.
+ENGINES = {
+    "savings_interest": {
+        "auto": "tasks:auto_calculate_savings_account_interest",
+        "serial": "perf.bench_interest:serial_savings_interest",
+    },
+    "fd_interest": {
+        "auto": "tasks:auto_calculate_fixed_deposit_interest",
+        "serial": "perf.bench_interest:serial_fd_interest",
+    },
+    "fd_maturity": {
+        "auto": "tasks:auto_process_matured_deposits",
+        "serial": "perf.bench_interest:serial_fd_maturity",
+        "per_row": "perf.bench_interest:per_row_fd_maturity",
+    },
+}
+
+
+def run_serial(conn, job: str) -> dict:
+    """Whole job on one connection and transaction, as before partitioning."""
+    import interest
+    report = interest.run_job(conn, job)
+    conn.commit()
+    return report
+
+
+def serial_savings_interest(conn):
+    return run_serial(conn, "savings_interest")
+
+
+def serial_fd_interest(conn):
+    return run_serial(conn, "fd_interest")
+
+
+def serial_fd_maturity(conn):
+    return run_serial(conn, "fd_maturity")
+
+
+def per_row_fd_maturity(conn):
+    """Maturities posted one deposit at a time, the baseline for the set-based settlement."""
+    import interest
+    current_date = datetime.now()
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        postings = interest.plan_maturities(cursor, current_date)
+        interest.apply_postings(cursor, "fd_maturity", postings, current_date)
+    conn.commit()
+    return interest.summarize(postings)
+
+
+# Rows each family has to look at, counted before the run
+CANDIDATE_QUERIES = {
+    "savings_interest": """
+        SELECT COUNT(*) AS n FROM SavingsAccount sa
+        JOIN SavingsAccount_Plans sap ON sa.s_plan_id = sap.s_plan_id
+        WHERE sa.status = true AND sa.balance >= sap.min_balance
+    """,
+    "fd_interest": """
+        SELECT COUNT(*) AS n FROM FixedDeposit
+        WHERE status = true AND next_payout_at <= NOW() AND end_date > NOW()
+    """,
+    "fd_maturity": "SELECT COUNT(*) AS n FROM FixedDeposit WHERE status = true AND end_date <= NOW()",
+}
+
+# What an engine run leaves behind; descriptions, IDs and timestamps are
+# ignored because they legitimately differ between versions
+DIGEST_QUERIES = {
+    "balances": """
+        SELECT md5(string_agg(saving_account_id || ':' || balance, ','
+                              ORDER BY saving_account_id)) AS digest
+        FROM SavingsAccount
+    """,
+    "fixed_deposits": """
+        SELECT md5(string_agg(fixed_deposit_id || ':' || status || ':' ||
+                              COALESCE(last_payout_date::text, ''), ','
+                              ORDER BY fixed_deposit_id)) AS digest
+        FROM FixedDeposit
+    """,
+    "postings": """
+        SELECT md5(string_agg(ah.saving_account_id || ':' || t.type || ':' || t.amount, ','
+                              ORDER BY ah.saving_account_id, t.type, t.amount)) AS digest
+        FROM Transactions t
+        JOIN AccountHolder ah ON ah.holder_id = t.holder_id
+        WHERE t.timestamp >= %(started)s
+    """,
+}
+
+ADMIN_USER = {"username": "bench", "type": "Admin", "employee_id": None}
+
+
+def parse_scale(value: str) -> int:
+    value = value.strip().lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(value[-1:], 1)
+    return int(float(value.rstrip("km")) * multiplier)
+
+
+def scale_label(accounts: int) -> str:
+    if accounts % 1_000_000 == 0:
+        return f"{accounts // 1_000_000}m"
+    if accounts % 1_000 == 0:
+        return f"{accounts // 1_000}k"
+    return str(accounts)
+
+
+def admin_connect():
+    conn = psycopg2.connect(**{**DATABASE_CONFIG, "database": "postgres"})
+    conn.autocommit = True
+    return conn
+
+
+def database_comment(cursor, name):
+    cursor.execute("""
+        SELECT shobj_description(oid, 'pg_database') AS comment
+        FROM pg_database WHERE datname = %s
+    """, (name,))
+    row = cursor.fetchone()
+    return None if row is None else (row["comment"] or "")
+
+
+def script_statements(script: Path) -> list:
+    """
+    Statements of a script, split on the semicolons outside quotes, $$
+    bodies and comments, in the order psql would run them.
+    """
+    text = script.read_text()
+    statements, current, i = [], [], 0
+    while i < len(text):
+        if text.startswith("--", i):
+            i = text.find("\n", i)
+            i = len(text) if i < 0 else i
+            continue
+        match = DOLLAR_QUOTE.match(text, i)
+        if match or text[i] == "'":
+            # Copy the quoted text through to its closing quote unchanged
+            quote = match.group(0) if match else "'"
+            end = text.find(quote, i + len(quote))
+            end = len(text) if end < 0 else end + len(quote)
+            current.append(text[i:end])
+            i = end
+            continue
+        if text[i] == ";":
+            statements.append("".join(current).strip())
+            current = []
+        else:
+            current.append(text[i])
+        i += 1
+    statements.append("".join(current).strip())
+    return [statement for statement in statements if statement]
+
+
+def run_script(cursor, script: Path):
+    """Run an init script; CONCURRENTLY builds can't share the implicit transaction of one query."""
+    if "CONCURRENTLY" in script.read_text():
+        for statement in script_statements(script):
+            cursor.execute(statement)
+    else:
+        cursor.execute(script.read_text())
+
+
+def build_template(accounts: int, seed: int, as_of: date, rebuild: bool) -> str:
+    """Create (or reuse) the template database holding one generated dataset."""
+    name = f"{TEMPLATE_PREFIX}{scale_label(accounts)}"
+    # A template is only reused if it finished building with the same inputs
+    marker = f"perf.bench_interest accounts={accounts} seed={seed} as_of={as_of}"
+
+    admin = admin_connect()
+    try:
+        with admin.cursor(cursor_factory=RealDictCursor) as cursor:
+            if not rebuild and database_comment(cursor, name) == marker:
+                logger.info(f"Reusing template {name}")
+                return name
+            cursor.execute(f'DROP DATABASE IF EXISTS "{name}"')
+            cursor.execute(f'CREATE DATABASE "{name}"')
+    finally:
+        admin.close()
+
+    logger.info(f"Building template {name} ({accounts:,} accounts)")
+    conn = psycopg2.connect(**{**DATABASE_CONFIG, "database": name})
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            for script in sorted(INIT_SCRIPTS.glob("*.sql")):
+                run_script(cursor, script)
+        conn.autocommit = False
+
+        # Roughly 1.19 accounts per customer (second and joint accounts)
+        customers = math.ceil(accounts / 1.19)
+        config = datagen.Config(
+            seed=seed, as_of=datetime.combine(as_of, datetime.min.time()),
+            branches=max(3, accounts // 10_000), agents_per_branch=10,
+            customers=customers, transactions=accounts * 10, chunk_size=10_000)
+        datagen.generate(conn, config)
+    finally:
+        conn.close()
+
+    admin = admin_connect()
+    try:
+        with admin.cursor() as cursor:
+            cursor.execute(f'COMMENT ON DATABASE "{name}" IS %s', (marker,))
+    finally:
+        admin.close()
+    return name
+
+
+def clone(template: str):
+    admin = admin_connect()
+    try:
+        with admin.cursor() as cursor:
+            cursor.execute(f'DROP DATABASE IF EXISTS "{RUN_DATABASE}"')
+            cursor.execute(f'CREATE DATABASE "{RUN_DATABASE}" TEMPLATE "{template}"')
+    finally:
+        admin.close()
+
+
+def drop_clone():
+    admin = admin_connect()
+    try:
+        with admin.cursor() as cursor:
+            cursor.execute(f'DROP DATABASE IF EXISTS "{RUN_DATABASE}"')
+    finally:
+        admin.close()
+
+
+def load_engine(path: str):
+    module_name, function_name = path.split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def run_engine(family: str, version: str, database: str, trace_memory: bool) -> dict:
+    """Run one engine in this process against `database` and measure it."""
+    # connect() and the engines read DATABASE_CONFIG at call time
+    DATABASE_CONFIG["database"] = database
+    from database import connect
+    from querylog import capture_statements, route_context
+
+    engine = load_engine(ENGINES[family][version])
+    conn = connect()
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(CANDIDATE_QUERIES[family])
+            candidates = cursor.fetchone()["n"]
+            cursor.execute("SELECT NOW() AS started")
+            started_at = cursor.fetchone()["started"]
+        conn.commit()
+
+        # Route-style engines take a connection and a user, scheduled ones nothing
+        params = inspect.signature(engine).parameters
+        kwargs = {}
+        if "conn" in params:
+            kwargs["conn"] = conn
+        if "current_user" in params:
+            kwargs["current_user"] = ADMIN_USER
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if trace_memory:
+            tracemalloc.start()
+        error = None
+        started = time.perf_counter()
+        with capture_statements() as stats, route_context(f"bench:{family}:{version}"):
+            try:
+                result = engine(**kwargs)
+            except Exception as e:
+                error = f"{type(e).__name__}: {getattr(e, 'detail', None) or e}"
+                result = None
+        elapsed = time.perf_counter() - started
+        heap_peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        conn.rollback()
+        digests = {}
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            for name, query in DIGEST_QUERIES.items():
+                cursor.execute(query, {"started": started_at})
+                digests[name] = cursor.fetchone()["digest"]
+    finally:
+        conn.close()
+
+    return {
+        "family": family,
+        "version": version,
+        "error": error,
+        "result": result if isinstance(result, (dict, type(None))) else str(result),
+        "candidates": candidates,
+        "seconds": round(elapsed, 3),
+        "accounts_per_sec": round(candidates / elapsed, 1) if elapsed > 0 else None,
+        "round_trips": stats.count,
+        "round_trips_per_account": round(stats.count / candidates, 2) if candidates else None,
+        "sql_seconds": round(stats.total_seconds, 3),
+        # ru_maxrss is in KiB on Linux
+        "rss_peak_mb": round(rss_after / 1024, 1),
+        "rss_growth_mb": round((rss_after - rss_before) / 1024, 1),
+        "heap_peak_mb": round(heap_peak / 2**20, 1) if heap_peak is not None else None,
+        "digest": digests,
+    }
+
+
+def run_isolated(family, version, trace_memory, verbose) -> dict:
+    """Run one engine in a child process so memory peaks and module state don't leak."""
+    command = [sys.executable, "-m", "perf.bench_interest", "--run-engine",
+               f"{family}:{version}", "--database", RUN_DATABASE]
+    if trace_memory:
+        command.append("--trace-memory")
+    completed = subprocess.run(
+        command, cwd=Path(__file__).resolve().parents[1], capture_output=True, text=True)
+    if verbose and completed.stderr:
+        sys.stderr.write(completed.stderr)
+    if completed.returncode != 0:
+        tail = completed.stderr.strip().splitlines()[-5:]
+        return {"family": family, "version": version,
+                "error": "engine process failed: " + " | ".join(tail), "digest": None}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def check_consistency(runs: list) -> list:
+    """Families whose versions disagree on the resulting database state."""
+    mismatches = []
+    by_family = {}
+    for run in runs:
+        by_family.setdefault((run["scale"], run["family"]), []).append(run)
+    for (scale, family), family_runs in by_family.items():
+        reference = family_runs[0]
+        for other in family_runs[1:]:
+            if other.get("error") or reference.get("error"):
+                continue
+            differing = [name for name in DIGEST_QUERIES
+                         if other["digest"][name] != reference["digest"][name]]
+            if differing:
+                mismatches.append(
+                    f"{scale} {family}: {reference['version']} and {other['version']} "
+                    f"differ in {', '.join(differing)}")
+    return mismatches
+
+
+def print_table(runs: list):
+    print(f"{'scale':<7}{'engine':<28}{'rows':>9}{'seconds':>10}{'rows/s':>11}"
+          f"{'trips/row':>11}{'rss MB':>9}  status")
+    for run in runs:
+        if run.get("candidates") is None:
+            print(f"{run['scale']:<7}{run['family'] + ':' + run['version']:<28}"
+                  f"{'':>59}  {run['error']}")
+            continue
+        status = run["error"] or "ok"
+        print(f"{run['scale']:<7}{run['family'] + ':' + run['version']:<28}"
+              f"{run['candidates']:>9}{run['seconds']:>10}{run['accounts_per_sec'] or 0:>11}"
+              f"{run['round_trips_per_account'] or 0:>11}{run['rss_peak_mb']:>9}  {status}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark interest and maturity engines")
+    parser.add_argument("--scales", default="10k,100k,1m",
+                        help="Comma separated account counts, e.g. 10k,100k,1m")
+    parser.add_argument("--family", action="append", choices=sorted(ENGINES),
+                        help="Only run these engine families (repeatable)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--as-of", type=date.fromisoformat,
+                        default=date.today().replace(day=1),
+                        help="Dataset reference date; the default leaves this month's "
+                             "savings interest unpaid")
+    parser.add_argument("--rebuild", action="store_true", help="Regenerate template databases")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Also report the Python heap peak (tracemalloc slows engines down)")
+    parser.add_argument("--output", type=Path, help="Write JSON results here")
+    parser.add_argument("--verbose", action="store_true", help="Show engine logs")
+    parser.add_argument("--run-engine", help=argparse.SUPPRESS)
+    parser.add_argument("--database", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_engine:
+        family, version = args.run_engine.split(":")
+        print(json.dumps(run_engine(family, version, args.database, args.trace_memory),
+                         default=str))
+        return 0
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    families = args.family or sorted(ENGINES)
+    runs = []
+    try:
+        for accounts in (parse_scale(s) for s in args.scales.split(",")):
+            template = build_template(accounts, args.seed, args.as_of, args.rebuild)
+            for family in families:
+                for version in ENGINES[family]:
+                    logger.info(f"{scale_label(accounts)}: running {family}:{version}")
+                    clone(template)
+                    run = run_isolated(family, version, args.trace_memory, args.verbose)
+                    run["scale"] = scale_label(accounts)
+                    runs.append(run)
+    finally:
+        drop_clone()
+
+    print_table(runs)
+    mismatches = check_consistency(runs)
+    if args.output:
+        args.output.write_text(json.dumps(
+            {"meta": {"seed": args.seed, "as_of": str(args.as_of),
+                      "started_at": datetime.now().isoformat(timespec="seconds")},
+             "runs": runs, "mismatches": mismatches}, indent=2, default=str))
+
+    if mismatches:
+        print("\nRESULT MISMATCHES:")
+        for line in mismatches:
+            print(f"  {line}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
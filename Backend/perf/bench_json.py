@@ -0,0 +1,165 @@
+"""
+CPU cost of the list endpoints' JSON responses, old path against fast path.
+
+The old path returns one pydantic model per row and lets FastAPI validate
+and serialize them again through response_model; the fast path
+(fastjson.model_rows_response) writes the rows with orjson. Both are
+mounted on a throwaway app with the real response models, fed the same
+synthetic rows (shaped as RealDictCursor returns them), and must produce
+byte-identical bodies. Requests are driven straight through the ASGI
+interface so the timings are the server's CPU, not an HTTP client's.
+
+Run from the Backend directory, no database needed:
+
+    python -m perf.bench_json --rows 10000
+    python -m perf.bench_json --rows 1000,10000 --repeat 10
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import string
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import List
+from fastapi import FastAPI
+from fastjson import model_rows_response
+from schemas import CustomerRead, SavingsAccountWithCustomerRead, TransactionsSearchResult
+
+
+def _id(rng, prefix: str, width: int = 6) -> str:
+    return prefix + "".join(rng.choices(string.digits, k=width))
+
+
+def _amount(rng, high: int) -> Decimal:
+    return Decimal(rng.randint(1, high * 100)) / 100
+
+
+def customer_rows(rng, count: int) -> list:
+    return [{
+        "customer_id": _id(rng, "CUS"),
+        "name": f"Customer {i}",
+        "nic": "".join(rng.choices(string.digits, k=12)),
+        "phone_number": "07" + "".join(rng.choices(string.digits, k=8)),
+        "address": f"{i} Main Street, Colombo",
+        "date_of_birth": date(1960, 1, 1) + timedelta(days=rng.randint(0, 15000)),
+        "email": f"customer{i}@example.com" if i % 3 else None,
+        "status": True,
+        "employee_id": _id(rng, "EMP"),
+    } for i in range(count)]
+
+
+def account_rows(rng, count: int) -> list:
+    return [{
+        "saving_account_id": _id(rng, "SA"),
+        "open_date": datetime(2020, 1, 1) + timedelta(seconds=rng.randint(0, 10 ** 8)),
+        "balance": _amount(rng, 500_000),
+        "employee_id": _id(rng, "EMP"),
+        "s_plan_id": rng.choice(["CH001", "TE001", "AD001", "SE001"]),
+        "status": True,
+        "branch_id": _id(rng, "BR", 3),
+        "customer_id": _id(rng, "CUS"),
+        "customer_name": f"Customer {i}",
+        "customer_nic": "".join(rng.choices(string.digits, k=12)),
+    } for i in range(count)]
+
+
+def transaction_rows(rng, count: int) -> list:
+    return [{
+        "transaction_id": i + 1,
+        "holder_id": _id(rng, "H"),
+        "type": rng.choice(["Deposit", "Withdrawal", "Interest"]),
+        "amount": _amount(rng, 50_000),
+        "timestamp": datetime(2024, 1, 1) + timedelta(microseconds=rng.randint(0, 10 ** 13)),
+        "ref_number": rng.randint(1, 10 ** 9),
+        "description": None if i % 4 else "ATM withdrawal",
+        "saving_account_id": _id(rng, "SA"),
+    } for i in range(count)]
+
+
+SHAPES = {
+    "customers": (CustomerRead, customer_rows),
+    "accounts_with_customer": (SavingsAccountWithCustomerRead, account_rows),
+    "transactions": (TransactionsSearchResult, transaction_rows),
+}
+
+
+def add_routes(app: FastAPI, name: str, model, rows: list):
+    @app.get(f"/old/{name}", response_model=List[model])
+    def old_path():
+        return [model(**row) for row in rows]
+
+    @app.get(f"/new/{name}", response_model=List[model])
+    def new_path():
+        return model_rows_response(rows, model)
+
+
+def build_app(datasets: dict) -> FastAPI:
+    app = FastAPI()
+    for name, (model, _) in SHAPES.items():
+        add_routes(app, name, model, datasets[name])
+    return app
+
+
+async def asgi_get(app: FastAPI, path: str):
+    """Status and body of a GET handled in process."""
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+             "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+             "root_path": "", "query_string": b"", "headers": [],
+             "client": ("127.0.0.1", 0), "server": ("testserver", 80), "app": app}
+    response = {"body": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["body"].append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return response["status"], b"".join(response["body"])
+
+
+def timed(app: FastAPI, path: str, repeat: int):
+    """Median CPU seconds of one response, and its body."""
+    asyncio.run(asgi_get(app, path))
+    samples = []
+    for _ in range(repeat):
+        started = time.process_time()
+        status, body = asyncio.run(asgi_get(app, path))
+        samples.append(time.process_time() - started)
+        if status != 200:
+            raise RuntimeError(f"GET {path} returned {status}")
+    return statistics.median(samples), body
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare list endpoint serialization paths")
+    parser.add_argument("--rows", default="10000", help="Comma-separated row counts")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed requests per endpoint")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    failed = False
+    print(f"{'shape':<24}{'rows':>8}{'old ms':>10}{'new ms':>10}{'speedup':>9}{'KB':>9}")
+    for count in (int(n) for n in args.rows.split(",")):
+        rng = random.Random(args.seed)
+        datasets = {name: make_rows(rng, count) for name, (_, make_rows) in SHAPES.items()}
+        app = build_app(datasets)
+        for name in SHAPES:
+            old_cpu, old_body = timed(app, f"/old/{name}", args.repeat)
+            new_cpu, new_body = timed(app, f"/new/{name}", args.repeat)
+            if old_body != new_body:
+                failed = True
+                print(f"{name}: response bodies differ")
+            print(f"{name:<24}{count:>8}{old_cpu * 1000:>10.1f}{new_cpu * 1000:>10.1f}"
+                  f"{old_cpu / new_cpu if new_cpu else float('inf'):>9.1f}"
+                  f"{len(new_body) / 1024:>9.0f}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
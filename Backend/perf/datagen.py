@@ -0,0 +1,598 @@
+"""
+Synthetic data generator for production-scale performance testing.
+
+Fills Branch, Employee, Authentication, Customer, SavingsAccount,
+AccountHolder (including joint accounts), FixedDeposit and Transactions
+with realistic, reproducible data. Run from the Backend directory against
+a database created by init-scripts/:
+
+    python -m perf.datagen --preset small
+    python -m perf.datagen --branches 100 --customers 990000 --transactions 50000000
+
+Rows are streamed with COPY, one transaction per chunk of customers, so
+memory stays flat at any scale. The same --seed and --as-of always produce
+the same rows on the same starting database.
+
+Generated employees log in as perf.manager<N> / perf.agent<N> with
+password "password123".
+"""
+import argparse
+import calendar
+import io
+import logging
+import math
+import random
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from auth import get_password_hash
+from database import DATABASE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+PRESETS = {
+    "small": dict(branches=10, agents_per_branch=5, customers=10_000,
+                  transactions=500_000),
+    "medium": dict(branches=50, agents_per_branch=10, customers=100_000,
+                   transactions=5_000_000),
+    # Customer IDs are CHAR(10) ("CUST" + 6 digits), which caps a database
+    # at 999,999 customers including the seed data
+    "large": dict(branches=100, agents_per_branch=20, customers=990_000,
+                  transactions=50_000_000),
+}
+
+PASSWORD = "password123"
+MAX_CUSTOMER_NUMBER = 999_999
+
+# Disjoint blocks for the 10-digit random IDs so generated rows never
+# collide with the seed data (1000000001.., 3000000001..)
+ACCOUNT_ID_BLOCK = 4_000_000_000
+HOLDER_ID_BLOCK = 5_000_000_000
+FD_ID_BLOCK = 6_000_000_000
+ID_BLOCK_SIZE = 1_000_000_000
+
+FIRST_NAMES = [
+    "Ishan", "Nimali", "Kasun", "Tharindu", "Dilini", "Sahan", "Ruwani",
+    "Malith", "Amaya", "Shehan", "Harsha", "Buddhika", "Sudarshani", "Lakmal",
+    "Sandali", "Chamara", "Nadeesha", "Pradeep", "Kavindi", "Ruwan", "Sachini",
+    "Dulaj", "Hiruni", "Janith", "Tharushi", "Pasindu", "Oshadi", "Nuwan",
+    "Ishara", "Kalana", "Madushani", "Chathura", "Yasodha", "Gayan", "Anjali",
+]
+LAST_NAMES = [
+    "Perera", "Silva", "Fernando", "Bandara", "Jayasuriya", "Wickramasinghe",
+    "Madushan", "Karunarathne", "Gunasekara", "Dissanayake", "Fonseka",
+    "Weerasinghe", "Rathnayake", "Jayawardena", "Herath", "Senanayake",
+    "Wijesinghe", "Amarasinghe", "Ekanayake", "Rajapaksha", "Kumara",
+]
+STREETS = [
+    "Lake Rd", "Temple Rd", "Rose Ave", "Hill St", "Sea View", "Main St",
+    "Station Rd", "Church Lane", "Park Ave", "Flower Rd", "Galle Rd", "Kandy Rd",
+]
+CITIES = [
+    "Colombo", "Kandy", "Galle", "Negombo", "Matara", "Kurunegala", "Jaffna",
+    "Anuradhapura", "Ratnapura", "Badulla", "Trincomalee", "Batticaloa",
+    "Gampaha", "Kalutara", "Hambantota", "Nuwara Eliya", "Polonnaruwa",
+    "Chilaw", "Kegalle", "Matale",
+]
+
+# Share of customers per age band and the savings plan that band gets
+AGE_BANDS = [
+    ("Children", 5, 12, 0.08),
+    ("Teen", 13, 17, 0.07),
+    ("Adult", 18, 59, 0.65),
+    ("Senior", 60, 85, 0.20),
+]
+SECOND_ACCOUNT_RATE = 0.15   # customers with a second personal account
+JOINT_ACCOUNT_RATE = 0.05    # adult customers that also share a joint account
+FIXED_DEPOSIT_RATE = 0.10    # adult/senior/joint accounts holding an FD
+MONTHLY_PAYOUT_RATE = 0.80   # FDs paying interest monthly instead of at maturity
+INACTIVE_RATE = 0.02
+INTEREST_MONTHS = 12         # months of savings interest history per account
+HISTORY_YEARS = 5            # accounts were opened within this many years
+
+
+@dataclass
+class Config:
+    seed: int
+    as_of: datetime
+    branches: int
+    agents_per_branch: int
+    customers: int
+    transactions: int
+    chunk_size: int
+
+
+def money(cents: int) -> str:
+    return f"{cents // 100}.{cents % 100:02d}"
+
+
+def add_months(moment: datetime, months: int) -> datetime:
+    """Same day-of-month `months` later, clamped to the end of shorter months."""
+    month_index = moment.month - 1 + months
+    year = moment.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(moment.day, calendar.monthrange(year, month)[1])
+    return moment.replace(year=year, month=month, day=day)
+
+
+def random_moment(rng: random.Random, start: datetime, end: datetime) -> datetime:
+    span = max(int((end - start).total_seconds()), 1)
+    return start + timedelta(seconds=rng.randrange(span))
+
+
+def lognormal_cents(rng: random.Random, median: float, sigma: float, step: int = 100) -> int:
+    """Amount in cents with a long right tail, rounded to `step` cents."""
+    value = median * math.exp(rng.gauss(0, sigma))
+    return max(step, int(value * 100) // step * step)
+
+
+class CopyBuffer:
+    """Accumulates rows in COPY text format for one table."""
+
+    def __init__(self, table: str, columns: list):
+        self.table = table
+        self.columns = columns
+        self.buffer = io.StringIO()
+        self.rows = 0
+
+    def add(self, *values):
+        self.buffer.write("\t".join(
+            "\\N" if v is None else str(v) for v in values))
+        self.buffer.write("\n")
+        self.rows += 1
+
+    def flush(self, cursor) -> int:
+        rows = self.rows
+        if rows:
+            self.buffer.seek(0)
+            cursor.copy_expert(
+                f"COPY {self.table} ({', '.join(self.columns)}) FROM STDIN",
+                self.buffer)
+        self.buffer = io.StringIO()
+        self.rows = 0
+        return rows
+
+
+class IdAllocator:
+    """Hands out consecutive IDs starting after what is already in the database."""
+
+    def __init__(self, cursor):
+        def max_number(sql):
+            cursor.execute(sql)
+            return cursor.fetchone()["n"] or 0
+
+        self.branch = max_number("""
+            SELECT MAX(CASE WHEN branch_id ~ '^BT[0-9]+ *$'
+                       THEN CAST(TRIM(SUBSTRING(branch_id FROM 3)) AS INT) END) AS n
+            FROM Branch
+        """)
+        # Trigger-generated employee IDs are EMP + 3 digits; ours are EMP + 7
+        self.employee = max(999_999, max_number("""
+            SELECT MAX(CASE WHEN employee_id ~ '^EMP[0-9]{7}$'
+                       THEN CAST(SUBSTRING(employee_id FROM 4) AS INT) END) AS n
+            FROM Employee
+        """))
+        self.customer = max_number("""
+            SELECT MAX(CASE WHEN customer_id ~ '^CUST[0-9]+ *$'
+                       THEN CAST(TRIM(SUBSTRING(customer_id FROM 5)) AS INT) END) AS n
+            FROM Customer
+        """)
+
+        def max_in_block(table, column, block):
+            return max(block, max_number(f"""
+                SELECT MAX(CASE WHEN {column} ~ '^[0-9]{{10}}$'
+                           THEN CAST({column} AS BIGINT) END) AS n
+                FROM {table}
+                WHERE {column} >= '{block}' AND {column} < '{block + ID_BLOCK_SIZE}'
+            """))
+
+        self.account = max_in_block(
+            "SavingsAccount", "saving_account_id", ACCOUNT_ID_BLOCK)
+        self.holder = max_in_block(
+            "AccountHolder", "holder_id", HOLDER_ID_BLOCK)
+        self.fixed_deposit = max_in_block(
+            "FixedDeposit", "fixed_deposit_id", FD_ID_BLOCK)
+        # Stay above the old random trigger range (10000..99999)
+        self.transaction = max(99_999, max_number(
+            "SELECT MAX(transaction_id) AS n FROM Transactions"))
+        self.ref_number = max(99_999, max_number(
+            "SELECT MAX(ref_number) AS n FROM Transactions"))
+
+    def next_branch(self):
+        self.branch += 1
+        return f"BT{self.branch:03d}"
+
+    def next_employee(self):
+        self.employee += 1
+        return f"EMP{self.employee}"
+
+    def next_customer(self):
+        self.customer += 1
+        return f"CUST{self.customer:03d}"
+
+    def next_account(self):
+        self.account += 1
+        return f"{self.account:010d}"
+
+    def next_holder(self):
+        self.holder += 1
+        return f"{self.holder:010d}"
+
+    def next_fixed_deposit(self):
+        self.fixed_deposit += 1
+        return f"{self.fixed_deposit:010d}"
+
+    def next_transaction(self):
+        self.transaction += 1
+        self.ref_number += 1
+        return self.transaction, self.ref_number
+
+
+def load_plans(cursor):
+    cursor.execute(
+        "SELECT s_plan_id, plan_name, interest_rate, min_balance FROM SavingsAccount_Plans")
+    savings = {}
+    for row in cursor.fetchall():
+        savings.setdefault(row["plan_name"], {
+            "s_plan_id": row["s_plan_id"],
+            "rate": float(row["interest_rate"].replace("%", "").strip()),
+            "min_cents": int(row["min_balance"] * 100),
+        })
+    missing = ({band[0] for band in AGE_BANDS} | {"Joint"}) - set(savings)
+    if missing:
+        raise SystemExit(f"Missing savings plans: {', '.join(sorted(missing))}")
+
+    cursor.execute(
+        "SELECT f_plan_id, months, interest_rate FROM FixedDeposit_Plans ORDER BY months")
+    fixed = [dict(row) for row in cursor.fetchall()]
+    if not fixed:
+        raise SystemExit("No fixed deposit plans found")
+    return savings, fixed
+
+
+def generate_staff(cursor, rng: random.Random, ids: IdAllocator, config: Config):
+    """Branches, one manager per branch and its agents. Returns agent rows."""
+    branches = CopyBuffer("Branch", ["branch_id", "branch_name", "location",
+                                     "branch_phone_number", "status"])
+    employees = CopyBuffer("Employee", ["employee_id", "name", "nic", "phone_number",
+                                        "address", "date_started", "type", "status",
+                                        "branch_id"])
+    logins = CopyBuffer("Authentication", ["username", "password", "type", "employee_id"])
+    password_hash = get_password_hash(PASSWORD)
+
+    agents = []
+    for b in range(config.branches):
+        branch_id = ids.next_branch()
+        city = CITIES[b % len(CITIES)]
+        suffix = f" {b // len(CITIES) + 1}" if b >= len(CITIES) else ""
+        branches.add(branch_id, f"{city} Branch{suffix}"[:30], city,
+                     f"0{rng.randrange(10**8, 10**9)}", True)
+        # Branch sizes vary a lot in practice: a few busy city branches
+        weight = rng.lognormvariate(0, 0.6)
+
+        staff = [("Branch Manager", "manager")] + \
+            [("Agent", "agent")] * config.agents_per_branch
+        for emp_type, login in staff:
+            employee_id = ids.next_employee()
+            started = config.as_of - timedelta(days=rng.randrange(180, 365 * 10))
+            employees.add(
+                employee_id, random_name(rng), random_nic(rng, rng.randrange(1965, 2000)),
+                random_phone(rng), random_address(rng, city), started.date(),
+                emp_type, True, branch_id)
+            logins.add(f"perf.{login}{employee_id[3:]}", password_hash,
+                       emp_type, employee_id)
+            if emp_type == "Agent":
+                agents.append({"employee_id": employee_id, "branch_id": branch_id,
+                               "city": city, "started": started, "weight": weight})
+
+    for buffer in (branches, employees, logins):
+        buffer.flush(cursor)
+    return agents
+
+
+def random_name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def random_phone(rng):
+    return f"07{rng.randrange(10**8):08d}"
+
+
+def random_address(rng, city):
+    return f"{rng.randrange(1, 400)} {rng.choice(STREETS)}, {city}"
+
+
+def random_nic(rng, birth_year, serial=None):
+    """New-format NIC: birth year, day of year (+500 for women) and a serial."""
+    day = rng.randrange(1, 366) + (500 if rng.random() < 0.5 else 0)
+    serial = rng.randrange(100000) if serial is None else serial % 100000
+    return f"{birth_year}{day:03d}{serial:05d}"
+
+
+class ChunkWriter:
+    """Generates one chunk of customers with their accounts, FDs and history."""
+
+    def __init__(self, rng, ids, config, agents, agent_weights, savings_plans, fd_plans,
+                 transactions_per_account):
+        self.rng = rng
+        self.ids = ids
+        self.config = config
+        self.agents = agents
+        self.agent_weights = agent_weights
+        self.savings_plans = savings_plans
+        self.fd_plans = fd_plans
+        self.transactions_per_account = transactions_per_account
+
+        self.customers = CopyBuffer("Customer", [
+            "customer_id", "name", "nic", "phone_number", "address",
+            "date_of_birth", "email", "status", "employee_id"])
+        self.accounts = CopyBuffer("SavingsAccount", [
+            "saving_account_id", "open_date", "balance", "employee_id",
+            "s_plan_id", "status", "branch_id"])
+        self.holders = CopyBuffer("AccountHolder", [
+            "holder_id", "customer_id", "saving_account_id"])
+        self.fixed_deposits = CopyBuffer("FixedDeposit", [
+            "fixed_deposit_id", "saving_account_id", "f_plan_id", "start_date",
+            "end_date", "principal_amount", "interest_payment_type",
+            "last_payout_date", "status"])
+        self.transactions = CopyBuffer("Transactions", [
+            "transaction_id", "holder_id", "type", "amount", "timestamp",
+            "ref_number", "description"])
+
+    def flush(self, cursor) -> dict:
+        # Parents before children so foreign keys hold at every step
+        return {buffer.table: buffer.flush(cursor) for buffer in (
+            self.customers, self.accounts, self.holders,
+            self.fixed_deposits, self.transactions)}
+
+    def add_customer(self, index: int, adults: list):
+        rng = self.rng
+        as_of = self.config.as_of
+        band = rng.choices(AGE_BANDS, weights=[b[3] for b in AGE_BANDS])[0]
+        plan_name, min_age, max_age, _ = band
+        age = rng.randint(min_age, max_age)
+        birth = (as_of - timedelta(days=age * 365 + rng.randrange(365))).date()
+
+        agent = rng.choices(self.agents, cum_weights=self.agent_weights)[0]
+        customer_id = self.ids.next_customer()
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        self.customers.add(
+            customer_id, f"{first} {last}", random_nic(rng, birth.year, index),
+            random_phone(rng), random_address(rng, agent["city"]), birth,
+            f"{first}.{last}{index}@example.com".lower(),
+            rng.random() >= INACTIVE_RATE, agent["employee_id"])
+
+        customer = {"customer_id": customer_id, "birth": birth, "agent": agent}
+        accounts = 2 if rng.random() < SECOND_ACCOUNT_RATE else 1
+        for _ in range(accounts):
+            self.add_account([customer], plan_name)
+
+        if plan_name in ("Adult", "Senior"):
+            if adults and rng.random() < JOINT_ACCOUNT_RATE:
+                self.add_account([customer, rng.choice(adults)], "Joint")
+            adults.append(customer)
+
+    def add_account(self, owners: list, plan_name: str):
+        rng = self.rng
+        as_of = self.config.as_of
+        plan = self.savings_plans[plan_name]
+        agent = owners[0]["agent"]
+
+        earliest = max(agent["started"], as_of - timedelta(days=365 * HISTORY_YEARS),
+                       *(datetime.combine(o["birth"], datetime.min.time()) for o in owners))
+        open_date = random_moment(rng, earliest, as_of - timedelta(days=1))
+        account_id = self.ids.next_account()
+        holder_ids = []
+        for owner in owners:
+            holder_id = self.ids.next_holder()
+            holder_ids.append(holder_id)
+            self.holders.add(holder_id, owner["customer_id"], account_id)
+
+        balance = plan["min_cents"] + lognormal_cents(rng, 20_000, 1.0)
+        balance = self.add_history(account_id, holder_ids, plan, open_date, balance)
+        active = rng.random() >= INACTIVE_RATE
+        self.accounts.add(account_id, open_date, money(balance), agent["employee_id"],
+                          plan["s_plan_id"], active, agent["branch_id"])
+
+        if active and plan_name in ("Adult", "Senior", "Joint") \
+                and rng.random() < FIXED_DEPOSIT_RATE:
+            self.add_fixed_deposit(account_id, open_date)
+
+    def add_history(self, account_id, holder_ids, plan, open_date, balance) -> int:
+        """Write the account's transactions in time order; returns the final balance."""
+        rng = self.rng
+        as_of = self.config.as_of
+
+        # Busy accounts are much busier than the median one
+        activity = rng.lognormvariate(0, 0.75) / math.exp(0.75 ** 2 / 2)
+        expected = self.transactions_per_account * activity
+        count = int(expected) + (1 if rng.random() < expected % 1 else 0)
+        events = [(random_moment(rng, open_date, as_of), None) for _ in range(count)]
+
+        # Monthly interest is credited by the scheduler at 00:01 on the 1st
+        credit = datetime(as_of.year, as_of.month, 1, 0, 1)
+        if credit > as_of:
+            credit = add_months(credit, -1)
+        for _ in range(INTEREST_MONTHS):
+            if credit <= open_date:
+                break
+            events.append((credit, True))
+            credit = add_months(credit, -1)
+        events.sort(key=lambda event: event[0])
+
+        for moment, is_interest in events:
+            holder_id = holder_ids[0] if len(holder_ids) == 1 else rng.choice(holder_ids)
+            if is_interest:
+                if balance < plan["min_cents"]:
+                    continue
+                amount = round(balance * plan["rate"] / 1200)
+                if amount <= 0:
+                    continue
+                kind = "Interest"
+                description = (f"Monthly savings account interest - "
+                               f"{moment.month:02d}/{moment.year} - "
+                               f"Account: {account_id}")
+                balance += amount
+            else:
+                amount = lognormal_cents(rng, 5_000, 1.1, step=1000)
+                if rng.random() < 0.45 and balance - amount >= plan["min_cents"]:
+                    kind, description = "Withdrawal", "Cash withdrawal"
+                    balance -= amount
+                else:
+                    kind, description = "Deposit", "Cash deposit"
+                    balance += amount
+            transaction_id, ref_number = self.ids.next_transaction()
+            self.transactions.add(transaction_id, holder_id, kind, money(amount),
+                                  moment, ref_number, description)
+        return balance
+
+    def add_fixed_deposit(self, account_id, open_date):
+        rng = self.rng
+        as_of = self.config.as_of
+        # Shorter terms are the most popular
+        plan = rng.choices(self.fd_plans,
+                           weights=[1 / (i + 1) for i in range(len(self.fd_plans))])[0]
+        start = random_moment(rng, open_date, as_of)
+        end = add_months(start, int(plan["months"]))
+        monthly = rng.random() < MONTHLY_PAYOUT_RATE
+        active = end > as_of
+        if not active:
+            last_payout = end
+        elif monthly:
+            elapsed = (as_of.year - start.year) * 12 + as_of.month - start.month
+            if add_months(start, elapsed) > as_of:
+                elapsed -= 1
+            last_payout = add_months(start, max(elapsed, 0))
+        else:
+            last_payout = start
+        self.fixed_deposits.add(
+            self.ids.next_fixed_deposit(), account_id, plan["f_plan_id"], start, end,
+            money(lognormal_cents(rng, 150_000, 0.8, step=100_000)), monthly,
+            last_payout, active)
+
+
+def generate(conn, config: Config):
+    started = time.perf_counter()
+    totals = {}
+
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        ids = IdAllocator(cursor)
+        if ids.customer + config.customers > MAX_CUSTOMER_NUMBER:
+            raise SystemExit(
+                f"Customer IDs would overflow CHAR(10): {ids.customer} exist, "
+                f"at most {MAX_CUSTOMER_NUMBER - ids.customer} more fit")
+        savings_plans, fd_plans = load_plans(cursor)
+
+        agents = generate_staff(cursor, random.Random(f"{config.seed}:staff"), ids, config)
+        conn.commit()
+        logger.info(f"Created {config.branches} branches and "
+                    f"{len(agents)} agents")
+
+        cumulative, running = [], 0.0
+        for agent in agents:
+            running += agent["weight"]
+            cumulative.append(running)
+
+        # Interest credits are part of the transaction budget
+        accounts_per_customer = 1 + SECOND_ACCOUNT_RATE + JOINT_ACCOUNT_RATE * 0.85
+        transactions_per_account = max(
+            0.0, config.transactions / (config.customers * accounts_per_customer)
+            - INTEREST_MONTHS * 0.8)
+
+        # The customer ID trigger always recomputes MAX(customer_id) + 1,
+        # which is O(n) per row; IDs are assigned here instead
+        cursor.execute("ALTER TABLE Customer DISABLE TRIGGER customer_id_trigger")
+        conn.commit()
+        try:
+            for chunk_start in range(0, config.customers, config.chunk_size):
+                chunk = chunk_start // config.chunk_size
+                writer = ChunkWriter(
+                    random.Random(f"{config.seed}:chunk:{chunk}"), ids, config,
+                    agents, cumulative, savings_plans, fd_plans,
+                    transactions_per_account)
+                adults = []
+                for index in range(chunk_start,
+                                   min(chunk_start + config.chunk_size, config.customers)):
+                    writer.add_customer(index, adults)
+                for table, rows in writer.flush(cursor).items():
+                    totals[table] = totals.get(table, 0) + rows
+                conn.commit()
+
+                done = min(chunk_start + config.chunk_size, config.customers)
+                elapsed = time.perf_counter() - started
+                logger.info(
+                    f"{done}/{config.customers} customers, "
+                    f"{totals['Transactions']} transactions "
+                    f"({totals['Transactions'] / elapsed:,.0f} rows/s)")
+        finally:
+            conn.rollback()
+            cursor.execute("ALTER TABLE Customer ENABLE TRIGGER customer_id_trigger")
+            conn.commit()
+
+        # Keep the ID triggers consistent with the new rows
+        cursor.execute("SELECT setval('branch_seq', %s)", (ids.branch,))
+        cursor.execute("SELECT setval('transaction_id_seq', %s)", (ids.transaction,))
+        cursor.execute("SELECT setval('transaction_ref_seq', %s)", (ids.ref_number,))
+        cursor.execute("REFRESH MATERIALIZED VIEW vw_monthly_interest_summary_mv")
+        conn.commit()
+
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    conn.autocommit = False
+
+    totals["Branch"] = config.branches
+    totals["Employee"] = config.branches * (config.agents_per_branch + 1)
+    return totals, time.perf_counter() - started
+
+
+def parse_args(argv=None) -> Config:
+    parser = argparse.ArgumentParser(
+        description="Fill the database with realistic synthetic data")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--as-of", type=date.fromisoformat, default=date.today(),
+                        help="Reference date for all generated history (YYYY-MM-DD)")
+    parser.add_argument("--branches", type=int)
+    parser.add_argument("--agents-per-branch", type=int)
+    parser.add_argument("--customers", type=int)
+    parser.add_argument("--transactions", type=int,
+                        help="Approximate total number of transactions")
+    parser.add_argument("--chunk-size", type=int, default=10_000,
+                        help="Customers generated and committed per COPY batch")
+    args = parser.parse_args(argv)
+
+    sizes = dict(PRESETS[args.preset])
+    for key in sizes:
+        if getattr(args, key) is not None:
+            sizes[key] = getattr(args, key)
+    if min(sizes.values()) < 1 or args.chunk_size < 1:
+        parser.error("sizes must be positive")
+
+    return Config(seed=args.seed,
+                  as_of=datetime.combine(args.as_of, datetime.min.time()),
+                  chunk_size=args.chunk_size, **sizes)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    config = parse_args(argv)
+    logger.info(f"Generating {config.customers} customers / ~{config.transactions} "
+                f"transactions (seed {config.seed}, as of {config.as_of.date()})")
+
+    conn = psycopg2.connect(**DATABASE_CONFIG)
+    try:
+        totals, elapsed = generate(conn, config)
+    finally:
+        conn.close()
+
+    for table, rows in totals.items():
+        logger.info(f"  {table:<15} {rows:>12,}")
+    logger.info(f"Done in {elapsed:.1f}s. Reproduce with "
+                f"--seed {config.seed} --as-of {config.as_of.date()}")
+
+
+if __name__ == "__main__":
+    main()
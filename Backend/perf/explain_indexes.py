@@ -0,0 +1,256 @@
+"""
+Before/after query plans for the indexes of init-scripts/09-query-indexes.sql.
+
+Each hot query shape (the statements the routes and the interest planners
+run) is EXPLAIN ANALYZEd on a copy of a generated dataset twice: with the
+schema as it was before the migration, then after applying the migration
+file itself. Reports execution time, buffers touched and the scans chosen.
+
+Run from the Backend directory with a role allowed to create databases:
+
+    python -m perf.explain_indexes --scale 100k
+    python -m perf.explain_indexes --scale 1m --repeat 5 --output explain.json
+
+Datasets are the template databases of perf.bench_interest, built on first
+use and shared with it.
+"""
+import argparse
+import json
+import logging
+import re
+import statistics
+from datetime import date, datetime
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from database import DATABASE_CONFIG
+from perf import bench_interest
+
+logger = logging.getLogger(__name__)
+
+MIGRATION = bench_interest.INIT_SCRIPTS / "09-query-indexes.sql"
+
+# Indexes the migration drops, as they were created before it
+REPLACED_INDEXES = {
+    "idx_transaction_holder_id": "CREATE INDEX idx_transaction_holder_id ON Transactions(holder_id)",
+}
+
+# Route queries, with the values they are run for taken from the dataset
+QUERIES = {
+    "fd_active_check": """
+        SELECT fixed_deposit_id FROM FixedDeposit
+        WHERE saving_account_id = %(account)s AND status = true
+    """,
+    "fd_by_account": """
+        SELECT fixed_deposit_id, saving_account_id, f_plan_id, start_date, end_date,
+               principal_amount, interest_payment_type, last_payout_date, status
+        FROM FixedDeposit
+        WHERE saving_account_id = %(account)s
+        ORDER BY start_date DESC
+    """,
+    "fd_by_branch": """
+        SELECT fd.fixed_deposit_id, fd.saving_account_id, fd.start_date, fd.end_date
+        FROM FixedDeposit fd
+        INNER JOIN SavingsAccount sa ON fd.saving_account_id = sa.saving_account_id
+        WHERE sa.branch_id = %(branch)s
+        ORDER BY fd.start_date DESC
+    """,
+    "account_holders": """
+        SELECT holder_id FROM holder_balance_min WHERE saving_account_id = %(account)s
+    """,
+    "branch_active_accounts": """
+        SELECT saving_account_id, balance FROM SavingsAccount
+        WHERE branch_id = %(branch)s AND status = true
+    """,
+    "transaction_history": """
+        SELECT t.transaction_id, t.holder_id, t.type, t.amount, t.timestamp
+        FROM Transactions t
+        WHERE t.holder_id = ANY(%(holders)s)
+        ORDER BY t.timestamp DESC
+    """,
+    "transactions_last_week": """
+        SELECT type, COUNT(*), SUM(amount) FROM Transactions
+        WHERE timestamp >= %(as_of)s::timestamp - INTERVAL '7 days'
+        GROUP BY type
+    """,
+}
+
+# Interest planners, run for one branch partition as the scheduled jobs do
+PLANNERS = ("savings_interest", "fd_interest", "fd_maturity")
+
+
+class RecordingCursor:
+    """Stands in for a cursor: keeps the planner's SQL instead of running it."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.statements = []
+
+    def execute(self, query, params=None):
+        self.statements.append(self.cursor.mogrify(query, params).decode())
+
+    def fetchall(self):
+        return []
+
+
+def planner_statement(cursor, job: str, current_date: datetime, branch_id: str) -> str:
+    import interest
+    recorder = RecordingCursor(cursor)
+    interest.PLANNERS[job](recorder, current_date, branch_id=branch_id)
+    return recorder.statements[0]
+
+
+def migration_indexes() -> list:
+    return re.findall(r"CREATE INDEX CONCURRENTLY IF NOT EXISTS (\w+)", MIGRATION.read_text())
+
+
+def sample_params(cursor) -> dict:
+    """Deterministic inputs: the busiest branch and an account there holding a deposit."""
+    cursor.execute("""
+        SELECT branch_id FROM SavingsAccount
+        WHERE branch_id IS NOT NULL
+        GROUP BY branch_id ORDER BY COUNT(*) DESC, branch_id LIMIT 1
+    """)
+    branch = cursor.fetchone()["branch_id"]
+    cursor.execute("""
+        SELECT fd.saving_account_id FROM FixedDeposit fd
+        JOIN SavingsAccount sa ON sa.saving_account_id = fd.saving_account_id
+        WHERE sa.branch_id = %s
+        ORDER BY fd.saving_account_id LIMIT 1
+    """, (branch,))
+    account = cursor.fetchone()["saving_account_id"]
+    cursor.execute("SELECT holder_id FROM AccountHolder WHERE saving_account_id = %s", (account,))
+    holders = [row["holder_id"] for row in cursor.fetchall()]
+    cursor.execute("SELECT MAX(timestamp) AS as_of FROM Transactions")
+    as_of = cursor.fetchone()["as_of"]
+    return {"branch": branch, "account": account, "holders": holders, "as_of": as_of}
+
+
+def plan_nodes(plan: dict) -> list:
+    """Scan nodes of a plan tree, e.g. 'Index Only Scan idx_holder_account'."""
+    nodes = []
+    if "Scan" in plan["Node Type"]:
+        target = plan.get("Index Name") or plan.get("Relation Name") or ""
+        nodes.append(f"{plan['Node Type']} {target}".strip())
+    for child in plan.get("Plans", []):
+        nodes.extend(plan_nodes(child))
+    return nodes
+
+
+def explain(cursor, statement: str, params: dict, repeat: int) -> dict:
+    """Median of `repeat` EXPLAIN ANALYZE runs after one run to warm the cache."""
+    runs = []
+    for _ in range(repeat + 1):
+        cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, params)
+        runs.append(cursor.fetchone()[0][0])
+    runs = runs[1:]
+    plan = runs[-1]["Plan"]
+    return {
+        "execution_ms": round(statistics.median(r["Execution Time"] for r in runs), 3),
+        "planning_ms": round(statistics.median(r["Planning Time"] for r in runs), 3),
+        "buffers": plan.get("Shared Hit Blocks", 0) + plan.get("Shared Read Blocks", 0),
+        "rows": plan.get("Actual Rows"),
+        "scans": plan_nodes(plan),
+    }
+
+
+def explain_all(conn, params: dict, repeat: int) -> dict:
+    results = {}
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        statements = {name: (query, params) for name, query in QUERIES.items()}
+        current_date = params["as_of"]
+        for job in PLANNERS:
+            statements[f"plan_{job}"] = (
+                planner_statement(cursor, job, current_date, params["branch"]), None)
+
+    with conn.cursor() as cursor:
+        for name, (statement, statement_params) in statements.items():
+            results[name] = explain(cursor, statement, statement_params, repeat)
+    return results
+
+
+def restore_previous_schema(conn):
+    """Drop the migration's indexes and recreate the ones it replaces."""
+    with conn.cursor() as cursor:
+        for index in migration_indexes():
+            cursor.execute(f"DROP INDEX IF EXISTS {index}")
+        for statement in REPLACED_INDEXES.values():
+            cursor.execute(statement)
+        cursor.execute("ANALYZE")
+
+
+def apply_migration(conn):
+    with conn.cursor() as cursor:
+        bench_interest.run_script(cursor, MIGRATION)
+
+
+def compare(before: dict, after: dict) -> list:
+    rows = []
+    for name in before:
+        b, a = before[name], after[name]
+        rows.append({
+            "query": name,
+            "before_ms": b["execution_ms"],
+            "after_ms": a["execution_ms"],
+            "speedup": round(b["execution_ms"] / a["execution_ms"], 1) if a["execution_ms"] else None,
+            "before_buffers": b["buffers"],
+            "after_buffers": a["buffers"],
+            "rows": a["rows"],
+            "before_scans": b["scans"],
+            "after_scans": a["scans"],
+        })
+    return rows
+
+
+def print_table(rows: list):
+    print(f"{'query':<26}{'before ms':>11}{'after ms':>10}{'speedup':>9}"
+          f"{'buffers':>17}  scans after")
+    for row in rows:
+        buffers = f"{row['before_buffers']}->{row['after_buffers']}"
+        print(f"{row['query']:<26}{row['before_ms']:>11}{row['after_ms']:>10}"
+              f"{row['speedup'] or '-':>9}{buffers:>17}  {', '.join(row['after_scans'])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EXPLAIN hot queries before and after the index migration")
+    parser.add_argument("--scale", default="100k", help="Account count of the dataset, e.g. 100k")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--as-of", type=date.fromisoformat, default=date.today().replace(day=1))
+    parser.add_argument("--rebuild", action="store_true", help="Regenerate the template database")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per query")
+    parser.add_argument("--output", help="Write JSON results here")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    accounts = bench_interest.parse_scale(args.scale)
+    template = bench_interest.build_template(accounts, args.seed, args.as_of, args.rebuild)
+    bench_interest.clone(template)
+    try:
+        conn = psycopg2.connect(**{**DATABASE_CONFIG, "database": bench_interest.RUN_DATABASE})
+        conn.autocommit = True
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                params = sample_params(cursor)
+            logger.info("Explaining with the migration's indexes removed")
+            restore_previous_schema(conn)
+            before = explain_all(conn, params, args.repeat)
+            logger.info(f"Applying {MIGRATION.name}")
+            apply_migration(conn)
+            after = explain_all(conn, params, args.repeat)
+        finally:
+            conn.close()
+    finally:
+        bench_interest.drop_clone()
+
+    rows = compare(before, after)
+    print_table(rows)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"meta": {"scale": args.scale, "seed": args.seed, "as_of": str(args.as_of),
+                                "params": params,
+                                "started_at": datetime.now().isoformat(timespec="seconds")},
+                       "queries": rows}, f, indent=2, default=str)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,368 @@
+"""
+Load test for the API hot paths.
+
+Virtual users log in as agents and loop over a weighted mix of requests:
+login, authenticated reads, create_transaction, transaction search,
+customer search and the five /views/report/* endpoints. Results are
+written as JSON (throughput and p50/p95/p99 per endpoint) and compared
+against a stored baseline; the exit code is 1 when an endpoint regressed.
+
+Run from the Backend directory against a database filled by perf.datagen:
+
+    python -m perf.loadtest --spawn --users 50 --duration 120
+    python -m perf.loadtest --base-url http://localhost:8000 --update-baseline
+
+Test accounts, customers and holders are sampled from the database, so
+DB_* must point at the same database the API uses. create_transaction
+posts small deposits, so run it against a disposable database.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+import httpx
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from database import DATABASE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+PERF_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = PERF_DIR / "baseline.json"
+
+# (name, weight): roughly what the branch frontends send
+WORKLOAD = [
+    ("login", 2),
+    ("users_me", 10),
+    ("customers_by_agent", 8),
+    ("create_transaction", 15),
+    ("transaction_search", 15),
+    ("customer_search", 10),
+    ("report_agent_transactions", 4),
+    ("report_account_transactions", 4),
+    ("report_active_fixed_deposits", 4),
+    ("report_monthly_interest", 4),
+    ("report_customer_activity", 4),
+]
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def load_fixtures(user_pattern: str, max_users: int, per_agent: int = 50) -> list:
+    """Agents that may log in, each with a sample of their own customers and accounts."""
+    conn = psycopg2.connect(**DATABASE_CONFIG)
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute("""
+                SELECT a.username, a.employee_id
+                FROM Authentication a
+                JOIN Employee e ON e.employee_id = a.employee_id
+                WHERE a.type = 'Agent' AND e.status = TRUE AND a.username LIKE %s
+                  AND EXISTS (SELECT 1 FROM Customer c WHERE c.employee_id = a.employee_id)
+                ORDER BY a.employee_id
+                LIMIT %s
+            """, (user_pattern, max_users))
+            agents = {row["employee_id"]: {**row, "accounts": []}
+                      for row in cursor.fetchall()}
+            if not agents:
+                raise SystemExit(
+                    f"No active agents with customers match '{user_pattern}'. "
+                    f"Run python -m perf.datagen first.")
+
+            cursor.execute("""
+                SELECT employee_id, customer_id, name, holder_id, saving_account_id
+                FROM (
+                    SELECT c.employee_id, c.customer_id, c.name, ah.holder_id,
+                           ah.saving_account_id,
+                           ROW_NUMBER() OVER (PARTITION BY c.employee_id
+                                              ORDER BY ah.holder_id) AS n
+                    FROM Customer c
+                    JOIN AccountHolder ah ON ah.customer_id = c.customer_id
+                    JOIN SavingsAccount sa ON sa.saving_account_id = ah.saving_account_id
+                    WHERE c.employee_id = ANY(%s) AND sa.status = TRUE
+                ) sample
+                WHERE n <= %s
+            """, (list(agents), per_agent))
+            for row in cursor.fetchall():
+                agents[row["employee_id"]]["accounts"].append(dict(row))
+    finally:
+        conn.close()
+
+    return [agent for agent in agents.values() if agent["accounts"]]
+
+
+class VirtualUser:
+    def __init__(self, client, agent, password, rng, results):
+        self.client = client
+        self.agent = agent
+        self.password = password
+        self.rng = rng
+        self.results = results
+        self.headers = {}
+
+    async def request(self, name, method, url, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, 0
+        elapsed = time.perf_counter() - started
+        self.results.setdefault(name, []).append((elapsed, status))
+        return response
+
+    async def login(self):
+        response = await self.request(
+            "login", "POST", "/auth/token",
+            data={"username": self.agent["username"], "password": self.password})
+        if response is not None and response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def run(self, name):
+        account = self.rng.choice(self.agent["accounts"])
+        if name == "login":
+            await self.login()
+        elif name == "users_me":
+            await self.request(name, "GET", "/auth/users/me")
+        elif name == "customers_by_agent":
+            await self.request(
+                name, "GET", f"/customers/customers/agent/{self.agent['employee_id']}")
+        elif name == "create_transaction":
+            await self.request(name, "POST", "/transactions/transaction", json={
+                "holder_id": account["holder_id"].strip(),
+                "type": "Deposit",
+                "amount": f"{self.rng.randint(1, 50) * 100}.00",
+                "description": "Load test deposit",
+            })
+        elif name == "transaction_search":
+            await self.request(name, "POST", "/transactions/transaction/search",
+                               json={"saving_account_id": account["saving_account_id"].strip()})
+        elif name == "customer_search":
+            await self.request(name, "POST", "/customers/customer/search",
+                               json={"name": account["name"].split()[0]})
+        elif name == "report_agent_transactions":
+            await self.request(name, "GET", "/views/report/agent-transactions")
+        elif name == "report_account_transactions":
+            await self.request(name, "GET", "/views/report/account-transactions")
+        elif name == "report_active_fixed_deposits":
+            await self.request(name, "GET", "/views/report/active-fixed-deposits")
+        elif name == "report_monthly_interest":
+            await self.request(name, "GET", "/views/report/monthly-interest-distribution")
+        elif name == "report_customer_activity":
+            await self.request(name, "GET", "/views/report/customer-activity")
+
+
+async def run_load(base_url, agents, users, duration, warmup, password, seed, timeout):
+    names = [name for name, _ in WORKLOAD]
+    weights = [weight for _, weight in WORKLOAD]
+    results = {}
+    warmup_results = {}
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def virtual_user(index):
+            rng = random.Random(f"{seed}:{index}")
+            user = VirtualUser(client, agents[index % len(agents)], password, rng,
+                               warmup_results)
+            await user.login()
+            # Spread the users out so they don't all start in lockstep
+            await asyncio.sleep(rng.random())
+            while time.perf_counter() < warmup_ends:
+                await user.run(rng.choices(names, weights)[0])
+            user.results = results
+            while time.perf_counter() < ends:
+                await user.run(rng.choices(names, weights)[0])
+
+        warmup_ends = time.perf_counter() + warmup
+        ends = warmup_ends + duration
+        await asyncio.gather(*(virtual_user(i) for i in range(users)))
+
+    elapsed = max(time.perf_counter() - warmup_ends, 1e-9)
+    return results, elapsed
+
+
+def summarize(results: dict, elapsed: float) -> dict:
+    endpoints = {}
+    everything = []
+    for name, samples in sorted(results.items()):
+        latencies = sorted(sample[0] for sample in samples)
+        errors = sum(1 for _, status in samples if not 200 <= status < 300)
+        everything.extend(latencies)
+        endpoints[name] = {
+            "requests": len(samples),
+            "errors": errors,
+            "error_rate": round(errors / len(samples), 4),
+            "throughput_rps": round(len(samples) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2),
+        }
+    everything.sort()
+    total_errors = sum(e["errors"] for e in endpoints.values())
+    total = {
+        "requests": len(everything),
+        "errors": total_errors,
+        "error_rate": round(total_errors / len(everything), 4) if everything else 0,
+        "throughput_rps": round(len(everything) / elapsed, 2),
+        "p50_ms": round(percentile(everything, 50) * 1000, 2),
+        "p95_ms": round(percentile(everything, 95) * 1000, 2),
+        "p99_ms": round(percentile(everything, 99) * 1000, 2),
+    }
+    return {"endpoints": endpoints, "total": total}
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Endpoints whose latency, throughput or error rate got worse than the tolerance allows."""
+    regressions = []
+    for name, base in baseline.get("endpoints", {}).items():
+        now = current["endpoints"].get(name)
+        if now is None:
+            regressions.append(f"{name}: no requests recorded")
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if now[metric] > base[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {metric} {now[metric]} > {base[metric]} (+{tolerance:.0%})")
+        if now["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {now['throughput_rps']} < {base['throughput_rps']} rps")
+        if now["error_rate"] > base["error_rate"] + 0.01:
+            regressions.append(
+                f"{name}: error rate {now['error_rate']:.2%} > {base['error_rate']:.2%}")
+    return regressions
+
+
+def print_table(summary: dict):
+    print(f"{'endpoint':<30}{'req':>8}{'err':>6}{'rps':>9}"
+          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    rows = list(summary["endpoints"].items()) + [("TOTAL", summary["total"])]
+    for name, s in rows:
+        print(f"{name:<30}{s['requests']:>8}{s['errors']:>6}{s['throughput_rps']:>9}"
+              f"{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}")
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PERF_DIR,
+            stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def spawn_server(port: int, workers: int):
+    """Start the API with uvicorn and wait until /ready answers."""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=PERF_DIR.parent)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("API server exited during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/ready", timeout=2).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise SystemExit("API server did not become ready within 60s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the API hot paths")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--spawn", action="store_true",
+                        help="Start the API locally with uvicorn for the run")
+    parser.add_argument("--port", type=int, default=8765, help="Port used with --spawn")
+    parser.add_argument("--workers", type=int, default=4, help="Workers used with --spawn")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=10, help="Unmeasured seconds first")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--user-pattern", default="perf.agent%",
+                        help="SQL LIKE pattern selecting agent logins")
+    parser.add_argument("--password", default=os.getenv("LOADTEST_PASSWORD", "password123"))
+    parser.add_argument("--output", type=Path, help="Write JSON results here")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.20,
+                        help="Allowed relative regression before failing (0.20 = 20%%)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Store this run as the new baseline")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    agents = load_fixtures(args.user_pattern, args.users)
+    logger.info(f"{args.users} virtual users over {len(agents)} agents, "
+                f"{args.warmup:.0f}s warm-up + {args.duration:.0f}s measured")
+
+    server = None
+    base_url = args.base_url
+    if args.spawn:
+        server = spawn_server(args.port, args.workers)
+        base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        results, elapsed = asyncio.run(run_load(
+            base_url, agents, args.users, args.duration, args.warmup,
+            args.password, args.seed, args.timeout))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    summary = summarize(results, elapsed)
+    report = {
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "base_url": base_url,
+            "users": args.users,
+            "duration_s": round(elapsed, 1),
+            "seed": args.seed,
+        },
+        **summary,
+    }
+    print_table(summary)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        logger.info(f"Results written to {args.output}")
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2))
+        logger.info(f"Baseline updated: {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        logger.info(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+
+    regressions = compare(summary, json.loads(args.baseline.read_text()), args.tolerance)
+    if regressions:
+        print("\nREGRESSIONS:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\nNo regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
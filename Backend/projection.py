@@ -0,0 +1,390 @@
+import time
+from datetime import datetime
+from decimal import Decimal
+import numpy as np
+
+# Money is handled as integer cents throughout. Interest is the exact
+# rational amount rounded half-even to the cent, which is what
+# Decimal.quantize() in the interest jobs produces; the rare exact ties are
+# recomputed with the jobs' own Decimal formula so every amount matches
+# what the jobs would post.
+
+SECONDS_PER_DAY = 86_400
+FD_PERIOD_SECONDS = 30 * SECONDS_PER_DAY  # FD interest is paid per 30-day period
+EPOCH = datetime(1970, 1, 1)
+
+# Past this size int64 intermediates could overflow; fall back to Python ints
+INT64_SAFE = 2 ** 62
+
+
+def round_currency(amount: Decimal) -> Decimal:
+    return amount.quantize(Decimal('0.01'))
+
+
+def parse_rate(value) -> Decimal:
+    """Plan rates are CHAR ("12", "12%") for savings and DECIMAL for FDs."""
+    if isinstance(value, str):
+        value = value.replace('%', '').strip()
+    return Decimal(str(value))
+
+
+def to_epoch(moment: datetime) -> int:
+    """Seconds since 1970 for a naive timestamp, like EXTRACT(EPOCH FROM timestamp)."""
+    return int((moment - EPOCH).total_seconds())
+
+
+def month_starts(now: datetime, months: int) -> list:
+    """First day of the current month and of each following month, months + 1 entries."""
+    starts = []
+    year, month = now.year, now.month
+    for _ in range(months + 1):
+        starts.append(datetime(year, month, 1))
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return starts
+
+
+def interest_cents(cents, rate_num, rate_den, multiplier, divisor, reference):
+    """
+    round_half_even(cents * rate / 100 * multiplier / divisor), vectorized.
+    `rate` is rate_num / rate_den (both arrays); `reference(i)` recomputes row
+    i with Decimal arithmetic and is only called for exact half-cent ties.
+    """
+    cents = np.asarray(cents, dtype=np.int64)
+    multiplier = np.asarray(multiplier, dtype=np.int64)
+    if len(cents) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    worst = (int(cents.max(initial=0)) * int(rate_num.max(initial=1))
+             * int(multiplier.max(initial=1)))
+    dtype = np.int64 if worst < INT64_SAFE else object
+    numerator = (cents.astype(dtype) * rate_num.astype(dtype)
+                 * np.broadcast_to(multiplier, cents.shape).astype(dtype))
+    denominator = rate_den.astype(dtype) * (100 * divisor)
+
+    quotient, remainder = np.divmod(numerator, denominator)
+    twice = remainder * 2
+    quotient = quotient + (twice > denominator)
+    for i in np.nonzero(twice == denominator)[0]:
+        quotient[i] = reference(i)
+    return quotient.astype(np.int64)
+
+
+def decimal_to_cents(amount: Decimal) -> int:
+    return int(amount * 100)
+
+
+def rate_ratio(plans: dict, plan_ids: list):
+    """Numerator and denominator of each row's plan rate, computed once per plan."""
+    codes = {plan: i for i, plan in enumerate(plans)}
+    ratios = [plans[plan]["rate"].as_integer_ratio() for plan in plans]
+    index = np.array([codes[p] for p in plan_ids], dtype=np.int64)
+    return (np.array([n for n, _ in ratios], dtype=np.int64)[index],
+            np.array([d for _, d in ratios], dtype=np.int64)[index])
+
+
+def load_savings(cursor, branch_id, month_start, next_month_start):
+    cursor.execute("SELECT s_plan_id, plan_name, interest_rate, min_balance FROM SavingsAccount_Plans")
+    plans = {row[0]: {"name": row[1], "rate": parse_rate(row[2]),
+                      "min_cents": decimal_to_cents(row[3] or Decimal(0))}
+             for row in cursor.fetchall()}
+
+    query = """
+        SELECT sa.saving_account_id, sa.branch_id, sa.s_plan_id,
+               (sa.balance * 100)::bigint
+        FROM SavingsAccount sa
+        WHERE sa.status = true
+    """
+    params = []
+    if branch_id:
+        query += " AND sa.branch_id = %s"
+        params.append(branch_id)
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+
+    # Accounts already credited this month (same test as the interest jobs)
+    query = """
+        SELECT DISTINCT ah.saving_account_id
+        FROM Transactions t
+        JOIN AccountHolder ah ON t.holder_id = ah.holder_id
+        WHERE t.type = 'Interest'
+          AND t.description LIKE 'Monthly savings account interest%%'
+          AND t.timestamp >= %s AND t.timestamp < %s
+    """
+    params = [month_start, next_month_start]
+    if branch_id:
+        query += """ AND ah.saving_account_id IN (
+            SELECT saving_account_id FROM SavingsAccount WHERE branch_id = %s)"""
+        params.append(branch_id)
+    cursor.execute(query, params)
+    paid = {row[0] for row in cursor.fetchall()}
+
+    return plans, rows, paid
+
+
+def load_fixed_deposits(cursor, branch_id):
+    cursor.execute("SELECT f_plan_id, months, interest_rate FROM FixedDeposit_Plans")
+    plans = {row[0]: {"months": row[1], "rate": parse_rate(row[2])}
+             for row in cursor.fetchall()}
+
+    query = """
+        SELECT fd.saving_account_id, sa.branch_id, fd.f_plan_id,
+               (fd.principal_amount * 100)::bigint,
+               FLOOR(EXTRACT(EPOCH FROM COALESCE(fd.last_payout_date, fd.start_date)))::bigint,
+               FLOOR(EXTRACT(EPOCH FROM fd.end_date))::bigint
+        FROM FixedDeposit fd
+        JOIN SavingsAccount sa ON fd.saving_account_id = sa.saving_account_id
+        WHERE fd.status = true
+    """
+    params = []
+    if branch_id:
+        query += " AND sa.branch_id = %s"
+        params.append(branch_id)
+    cursor.execute(query, params)
+    return plans, cursor.fetchall()
+
+
+class Ledger:
+    """Per (branch, product, plan) x month sums in integer cents."""
+
+    def __init__(self, months: int):
+        self.months = months
+        self.keys = {}
+        self.interest = np.zeros((0, months), dtype=np.int64)
+        self.principal = np.zeros((0, months), dtype=np.int64)
+        self.count = np.zeros((0, months), dtype=np.int64)
+
+    def group_index(self, branches: list, product: str, plans: list) -> np.ndarray:
+        """Ledger row of every input row, registering new groups as needed."""
+        labels, inverse = np.unique(
+            np.array([f"{b}\t{p}" for b, p in zip(branches, plans)]), return_inverse=True)
+        ids = np.empty(len(labels), dtype=np.int64)
+        for i, label in enumerate(labels):
+            branch, plan = label.split("\t")
+            ids[i] = self.keys.setdefault((branch, product, plan), len(self.keys))
+        grow = len(self.keys) - len(self.interest)
+        if grow:
+            padding = np.zeros((grow, self.months), dtype=np.int64)
+            self.interest = np.vstack([self.interest, padding])
+            self.principal = np.vstack([self.principal, padding])
+            self.count = np.vstack([self.count, padding])
+        return ids[inverse.ravel()]
+
+    def add(self, group, month: int, interest, principal=None):
+        interest = np.asarray(interest, dtype=np.int64)
+        paying = interest > 0
+        if principal is not None:
+            principal = np.asarray(principal, dtype=np.int64)
+            paying |= principal > 0
+            np.add.at(self.principal[:, month], group[paying], principal[paying])
+        np.add.at(self.interest[:, month], group[paying], interest[paying])
+        np.add.at(self.count[:, month], group[paying], 1)
+
+
+def project_savings(ledger, plans, rows, paid, fd_credits):
+    """Monthly savings interest, compounding each credit into the next month's balance."""
+    if not rows:
+        return
+    branches = [row[1].strip() for row in rows]
+    plan_ids = [row[2] for row in rows]
+    balance = np.array([row[3] or 0 for row in rows], dtype=np.int64)
+
+    rates = [plans[p]["rate"] for p in plan_ids]
+    rate_num, rate_den = rate_ratio(plans, plan_ids)
+    min_cents = np.array([plans[p]["min_cents"] for p in plan_ids], dtype=np.int64)
+    group = ledger.group_index(branches, "savings", [plans[p]["name"] for p in plan_ids])
+    already_paid = np.array([row[0] in paid for row in rows], dtype=bool)
+
+    for month in range(ledger.months):
+        eligible = balance >= min_cents
+        if month == 0:
+            # This month's run may already have credited some accounts
+            eligible &= ~already_paid
+
+        def reference(i):
+            monthly = rates[i] / Decimal('100') / Decimal('12')
+            return decimal_to_cents(round_currency(Decimal(int(balance[i])) / 100 * monthly))
+
+        amounts = interest_cents(balance, rate_num, rate_den, 1, 12, reference)
+        amounts[~eligible] = 0
+        ledger.add(group, month, amounts)
+        balance += amounts
+        # FD payouts and maturities land in the savings balance during the month
+        balance += fd_credits[month]
+
+
+def project_fixed_deposits(ledger, plans, rows, account_ids, now, starts):
+    """
+    FD payouts per 30-day period and maturities, returned as per-month credits
+    to each savings account so savings interest can compound on them.
+    """
+    months = ledger.months
+    credits = [np.zeros(len(account_ids), dtype=np.int64) for _ in range(months)]
+    if not rows:
+        return credits
+
+    branches = [row[1].strip() for row in rows]
+    plan_ids = [row[2] for row in rows]
+    principal = np.array([row[3] for row in rows], dtype=np.int64)
+    last_payout = np.array([row[4] for row in rows], dtype=np.int64)
+    end = np.array([row[5] for row in rows], dtype=np.int64)
+    rates = [plans[p]["rate"] for p in plan_ids]
+    rate_num, rate_den = rate_ratio(plans, plan_ids)
+    group = ledger.group_index(branches, "fixed_deposit", plan_ids)
+
+    # Savings account each FD pays into (unmatched when that account is not projected)
+    fd_accounts = np.array([row[0] for row in rows])
+    if len(account_ids):
+        position = np.minimum(np.searchsorted(account_ids, fd_accounts), len(account_ids) - 1)
+        matched = account_ids[position] == fd_accounts
+    else:
+        position = np.zeros(len(rows), dtype=np.int64)
+        matched = np.zeros(len(rows), dtype=bool)
+
+    now_epoch = to_epoch(now)
+    boundaries = np.array([to_epoch(s) for s in starts[1:]], dtype=np.int64)
+    active = end > now_epoch
+
+    def periods_before(limit):
+        """Complete 30-day periods ending strictly before `limit`."""
+        return np.maximum(-((last_payout - limit) // FD_PERIOD_SECONDS) - 1, 0)
+
+    def periodic_reference(periods):
+        def reference(i):
+            monthly = rates[i] / Decimal('100') / Decimal('12')
+            return decimal_to_cents(round_currency(
+                Decimal(int(principal[i])) / 100 * monthly * int(periods[i])))
+        return reference
+
+    # The first run after now pays every overdue period in one posting
+    overdue = np.where(active, (now_epoch - last_payout) // FD_PERIOD_SECONDS, 0)
+    overdue = np.maximum(overdue, 0)
+    one = np.ones(len(rows), dtype=np.int64)
+    overdue_amount = interest_cents(principal, rate_num, rate_den, overdue, 12,
+                                    periodic_reference(overdue))
+    single_amount = interest_cents(principal, rate_num, rate_den, one, 12,
+                                   periodic_reference(one))
+
+    previous = np.zeros(len(rows), dtype=np.int64)
+    for month in range(months):
+        limit = np.minimum(boundaries[month], end)
+        cumulative = np.where(active, periods_before(limit), 0)
+        periods = cumulative - previous
+        amounts = periods * single_amount
+        if month == 0:
+            amounts = overdue_amount + (periods - overdue) * single_amount
+        ledger.add(group, month, amounts)
+        np.add.at(credits[month], position[matched], amounts[matched])
+        previous = cumulative
+
+    # Maturity: principal plus pro-rated daily interest since the last payout
+    total_periods = np.where(active, periods_before(end), 0)
+    final_payout = last_payout + total_periods * FD_PERIOD_SECONDS
+    days = np.maximum((end - final_payout) // SECONDS_PER_DAY, 0)
+
+    def maturity_reference(i):
+        daily = rates[i] / Decimal('100') / Decimal('365')
+        return decimal_to_cents(round_currency(Decimal(int(principal[i])) / 100 * daily * int(days[i])))
+
+    maturity_interest = interest_cents(principal, rate_num, rate_den, days, 365,
+                                       maturity_reference)
+    maturity_month = np.where(end <= now_epoch, 0,
+                              np.searchsorted(boundaries, end, side="right"))
+    in_horizon = maturity_month < months
+    maturity_group = ledger.group_index(branches, "fd_maturity", plan_ids)
+    for month in range(months):
+        maturing = in_horizon & (maturity_month == month)
+        if not maturing.any():
+            continue
+        interest = np.where(maturing, maturity_interest, 0)
+        returned = np.where(maturing, principal, 0)
+        ledger.add(maturity_group, month, interest, returned)
+        np.add.at(credits[month], position[matched & maturing],
+                  (interest + returned)[matched & maturing])
+    return credits
+
+
+def money(cents) -> float:
+    return round(int(cents) / 100, 2)
+
+
+def project_interest(conn, months: int, branch_id: str = None, now: datetime = None) -> dict:
+    """
+    Project savings interest, FD interest and FD maturities for the current
+    month and the following `months - 1` months, per branch and plan.
+    """
+    started = time.perf_counter()
+    now = now or datetime.now()
+    starts = month_starts(now, months)
+
+    # Plain tuple cursor: far cheaper than dict rows for a full-bank load
+    with conn.cursor() as cursor:
+        savings_plans, savings_rows, paid = load_savings(cursor, branch_id, starts[0], starts[1])
+        fd_plans, fd_rows = load_fixed_deposits(cursor, branch_id)
+        cursor.execute("SELECT branch_id, branch_name FROM Branch")
+        branch_names = {row[0].strip(): row[1] for row in cursor.fetchall()}
+    loaded = time.perf_counter()
+
+    ledger = Ledger(months)
+    # Sorted so FDs can find their savings account with searchsorted
+    savings_rows.sort(key=lambda row: row[0])
+    account_ids = np.array([row[0] for row in savings_rows], dtype=str)
+    fd_credits = project_fixed_deposits(ledger, fd_plans, fd_rows, account_ids, now, starts)
+    project_savings(ledger, savings_plans, savings_rows, paid, fd_credits)
+
+    month_labels = [f"{s.year}-{s.month:02d}" for s in starts[:-1]]
+    products = ("savings", "fixed_deposit", "fd_maturity")
+    by_month = {label: {p: 0 for p in products} | {"principal_returned": 0}
+                for label in month_labels}
+    totals = {p: 0 for p in products} | {"principal_returned": 0}
+    breakdown = []
+    for (branch, product, plan), g in sorted(ledger.keys.items()):
+        for month, label in enumerate(month_labels):
+            interest = int(ledger.interest[g, month])
+            principal = int(ledger.principal[g, month])
+            if interest == 0 and principal == 0:
+                continue
+            breakdown.append({
+                "month": label,
+                "branch_id": branch,
+                "branch_name": branch_names.get(branch),
+                "product": product,
+                "plan": plan,
+                "payments": int(ledger.count[g, month]),
+                "interest": money(interest),
+                "principal_returned": money(principal),
+            })
+            by_month[label][product] += interest
+            by_month[label]["principal_returned"] += principal
+            totals[product] += interest
+            totals["principal_returned"] += principal
+
+    # Everything is summed in cents, so the rolled-up totals reconcile exactly
+    assert sum(totals[p] for p in products) == int(ledger.interest.sum())
+
+    return {
+        "generated_at": now.isoformat(),
+        "horizon_months": months,
+        "branch_id": branch_id,
+        "totals": {
+            "savings_interest": money(totals["savings"]),
+            "fd_interest": money(totals["fixed_deposit"]),
+            "fd_maturity_interest": money(totals["fd_maturity"]),
+            "total_interest": money(sum(totals[p] for p in products)),
+            "fd_principal_returned": money(totals["principal_returned"]),
+        },
+        "by_month": [{
+            "month": label,
+            "savings_interest": money(values["savings"]),
+            "fd_interest": money(values["fixed_deposit"]),
+            "fd_maturity_interest": money(values["fd_maturity"]),
+            "total_interest": money(sum(values[p] for p in products)),
+            "fd_principal_returned": money(values["principal_returned"]),
+        } for label, values in by_month.items()],
+        "breakdown": breakdown,
+        "accounts": len(savings_rows),
+        "fixed_deposits": len(fd_rows),
+        "load_ms": round((loaded - started) * 1000, 1),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
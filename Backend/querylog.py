@@ -0,0 +1,236 @@
+import os
+import re
+import time
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+import psycopg2.extensions
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Statements slower than this are logged (parameters are never logged)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 500))
+# Also log EXPLAIN (ANALYZE, BUFFERS) for slow SELECTs. This re-runs the
+# statement, so only enable it while investigating.
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "false").lower() == "true"
+
+# Route template (or "job:<name>") the current statement runs on behalf of
+current_route: ContextVar[str] = ContextVar("current_route", default="background")
+# RequestScope of the HTTP request being handled, if any
+current_request: ContextVar = ContextVar("current_request", default=None)
+_statement_stats: ContextVar = ContextVar("statement_stats", default=None)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(query) -> str:
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", "replace")
+    elif not isinstance(query, str):
+        # psycopg2.sql.Composed and friends
+        query = str(query)
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+def fingerprint(sql: str) -> str:
+    """Short, stable label for a statement: its verb plus a hash of the text."""
+    verb = sql.split(" ", 1)[0].upper() if sql else "EMPTY"
+    digest = hashlib.md5(sql.encode("utf-8")).hexdigest()[:8]
+    return f"{verb}:{digest}"
+
+
+def redact_params(params) -> str:
+    """Describe bound parameters by type only, never by value."""
+    if params is None:
+        return "none"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in params.items()) + "}"
+    try:
+        return "[" + ", ".join(type(v).__name__ for v in params) + "]"
+    except TypeError:
+        return type(params).__name__
+
+
+class StatementStats:
+    """Per-context statement counter used by benchmarks to count round trips."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.by_statement = {}
+        # Worker threads started from a captured context share this object
+        self._lock = threading.Lock()
+
+    def add(self, label: str, elapsed: float):
+        with self._lock:
+            self.count += 1
+            self.total_seconds += elapsed
+            entry = self.by_statement.setdefault(label, [0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+
+
+class RequestScope:
+    """
+    Connections an HTTP request has checked out. Shared between the event
+    loop and the request's worker threads, so a request can be cancelled
+    from the loop: its running statements are cancelled server-side and any
+    further statement fails before it is sent.
+    """
+
+    def __init__(self, lane: str = None):
+        self.lane = lane
+        self.cancelled = None
+        self._connections = set()
+        self._lock = threading.Lock()
+
+    def attach(self, conn):
+        with self._lock:
+            self._connections.add(conn)
+
+    def detach(self, conn):
+        # Waits for a cancel in progress, so it never reaches the connection's next user
+        with self._lock:
+            self._connections.discard(conn)
+
+    def cancel(self, reason: str):
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = reason
+            for conn in self._connections:
+                try:
+                    conn.cancel()
+                except Exception as e:
+                    logger.warning(f"Could not cancel statement ({reason}): {str(e)}")
+
+
+def check_cancelled():
+    request = current_request.get()
+    if request is not None and request.cancelled:
+        raise psycopg2.extensions.QueryCanceledError(
+            f"canceling statement: request {request.cancelled}")
+
+
+@contextmanager
+def capture_statements():
+    """Collect statement counts and timings executed in the current context."""
+    stats = StatementStats()
+    token = _statement_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _statement_stats.reset(token)
+
+
+@contextmanager
+def route_context(route: str):
+    token = current_route.set(route)
+    try:
+        yield
+    finally:
+        current_route.reset(token)
+
+
+def _explain(conn, query, params, label):
+    """Capture the plan of a slow SELECT without disturbing the caller's transaction."""
+    in_transaction = (not conn.autocommit and conn.info.transaction_status
+                      == psycopg2.extensions.TRANSACTION_STATUS_INTRANS)
+    # Plain cursor straight from the base class so the EXPLAIN is not timed again
+    cursor = psycopg2.extensions.connection.cursor(conn)
+    try:
+        if in_transaction:
+            cursor.execute("SAVEPOINT querylog_explain")
+        try:
+            cursor.execute(
+                b"EXPLAIN (ANALYZE, BUFFERS) " + cursor.mogrify(query, params))
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+            logger.warning(f"Plan for slow statement {label}:\n{plan}")
+        finally:
+            if in_transaction:
+                cursor.execute("ROLLBACK TO SAVEPOINT querylog_explain")
+                cursor.execute("RELEASE SAVEPOINT querylog_explain")
+    except Exception as e:
+        logger.warning(f"Could not explain slow statement {label}: {str(e)}")
+    finally:
+        cursor.close()
+
+
+def record_statement(cursor, query, params, elapsed: float, failed: bool = False):
+    sql = normalize_sql(query)
+    label = fingerprint(sql)
+    route = current_route.get()
+
+    metrics.DB_STATEMENT_DURATION.labels(route, label).observe(elapsed)
+    stats = _statement_stats.get()
+    if stats is not None:
+        stats.add(label, elapsed)
+
+    elapsed_ms = elapsed * 1000
+    if elapsed_ms < SLOW_QUERY_MS:
+        return
+
+    metrics.DB_SLOW_STATEMENTS.labels(route, label).inc()
+    logger.warning(
+        f"Slow statement {label} on {route}: {elapsed_ms:.1f} ms"
+        f"{' (failed)' if failed else ''} params={redact_params(params)} sql={sql[:2000]}")
+
+    if SLOW_QUERY_EXPLAIN and not failed and sql.upper().startswith("SELECT"):
+        _explain(cursor.connection, query, params, label)
+
+
+class TimedCursorMixin:
+    """Times every execute()/executemany() and reports it to querylog."""
+
+    def execute(self, query, vars=None):
+        check_cancelled()
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = super().execute(query, vars)
+            failed = False
+            return result
+        finally:
+            record_statement(self, query, vars,
+                             time.perf_counter() - started, failed)
+
+    def executemany(self, query, vars_list):
+        check_cancelled()
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = super().executemany(query, vars_list)
+            failed = False
+            return result
+        finally:
+            record_statement(self, query, None,
+                             time.perf_counter() - started, failed)
+
+
+_timed_factories = {}
+
+
+def _timed_factory(factory):
+    if factory is None:
+        factory = psycopg2.extensions.cursor
+    if issubclass(factory, TimedCursorMixin):
+        return factory
+    if factory not in _timed_factories:
+        _timed_factories[factory] = type(
+            f"Timed{factory.__name__}", (TimedCursorMixin, factory), {})
+    return _timed_factories[factory]
+
+
+class TimedConnection(psycopg2.extensions.connection):
+    """
+    Connection whose cursors are timed, whatever cursor_factory the caller
+    asks for (RealDictCursor everywhere in this code base).
+    """
+
+    def cursor(self, *args, **kwargs):
+        kwargs["cursor_factory"] = _timed_factory(
+            kwargs.get("cursor_factory") or self.cursor_factory)
+        return super().cursor(*args, **kwargs)
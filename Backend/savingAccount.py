@@ -2,9 +2,12 @@
 from psycopg2.extras import RealDictCursor
 from schemas import SavingsAccountCreate, SavingsAccountRead, AccountStatusRequest, SavingsAccountWithCustomerRead
 from schemas import AccountHolderCreate, SavingsAccountPlansRead
-from fastapi import HTTPException, APIRouter, Depends
-from database import get_db
+from fastapi import HTTPException, APIRouter, Depends, Request
+from database import get_db, get_read_db
+from fastjson import model_rows_response
+import conditional
 from auth import get_current_user
+from cache import get_employee_branch, plan_cache
 from schemas import Stype
 from schemas import SavingsAccountRead
 
@@ -15,17 +18,23 @@ router = APIRouter()
 
 
 @router.get("/plans", response_model=list[SavingsAccountPlansRead])
-def get_savings_plans(conn=Depends(get_db), current_user=Depends(get_current_user)):
+def get_savings_plans(request: Request, conn=Depends(get_db), current_user=Depends(get_current_user)):
     """Get all available savings account plans"""
-    try:
+    def load_plans():
         with conn.cursor(cursor_factory=RealDictCursor) as cursor:
             cursor.execute("""
                 SELECT s_plan_id, plan_name, interest_rate, min_balance
                 FROM SavingsAccount_Plans
                 ORDER BY s_plan_id
             """)
-            rows = cursor.fetchall()
-            return [SavingsAccountPlansRead(**row) for row in rows]
+            return [dict(row) for row in cursor.fetchall()]
+
+    try:
+        rows = plan_cache.get_or_load("savingsaccount_plans", load_plans)
+        validators = conditional.for_content(request, rows)
+        if validators.not_modified:
+            return validators.not_modified_response()
+        return validators.apply(model_rows_response(rows, SavingsAccountPlansRead))
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Database error: {str(e)}")
@@ -51,11 +60,7 @@ def create_saving_account(account: SavingsAccountCreate, customer_id: str, conn=
         from datetime import datetime
         with conn.cursor(cursor_factory=RealDictCursor) as cursor:
             # Get branch_id from employee table
-            cursor.execute(
-                "SELECT branch_id FROM Employee WHERE employee_id = %s",
-                (employee_id,)
-            )
-            branch_row = cursor.fetchone()
+            branch_row = get_employee_branch(cursor, employee_id)
             if not branch_row or not branch_row['branch_id']:
                 raise HTTPException(
                     status_code=400, detail="Agent does not have a branch assigned"
@@ -139,9 +144,7 @@ def search_saving_accounts(query: dict, conn=Depends(get_db), current_user=Depen
 
             # Manager: only accounts in their branch
             elif user_type == 'branch_manager':
-                cursor.execute(
-                    "SELECT branch_id FROM Employee WHERE employee_id = %s", (employee_id,))
-                branch_row = cursor.fetchone()
+                branch_row = get_employee_branch(cursor, employee_id)
                 if not branch_row or not branch_row['branch_id']:
                     raise HTTPException(
                         status_code=400, detail="Manager does not have a branch assigned")
@@ -162,7 +165,7 @@ def search_saving_accounts(query: dict, conn=Depends(get_db), current_user=Depen
 
             cursor.execute(base_query, tuple(params))
             rows = cursor.fetchall()
-            return [SavingsAccountWithCustomerRead(**row) for row in rows]
+            return model_rows_response(rows, SavingsAccountWithCustomerRead)
 
     except Exception as e:
         conn.rollback()
@@ -198,7 +201,7 @@ def get_account_holder(saving_account_id: str, conn=Depends(get_db), current_use
 
 
 @router.get("/saving-account/branch", response_model=list[SavingsAccountWithCustomerRead])
-def get_branch_savings_accounts(conn=Depends(get_db), current_user=Depends(get_current_user)):
+def get_branch_savings_accounts(request: Request, conn=Depends(get_read_db), current_user=Depends(get_current_user)):
     """
     Get all savings accounts in the same branch as the current branch manager.
     Only branch managers can access this endpoint.
@@ -218,15 +221,19 @@ def get_branch_savings_accounts(conn=Depends(get_db), current_user=Depends(get_c
 
         with conn.cursor(cursor_factory=RealDictCursor) as cursor:
             # Get branch_id of the current branch manager
-            cursor.execute(
-                "SELECT branch_id FROM employee WHERE employee_id = %s", (employee_id,))
-            manager_row = cursor.fetchone()
+            manager_row = get_employee_branch(cursor, employee_id)
             if not manager_row or not manager_row['branch_id']:
                 raise HTTPException(
                     status_code=400, detail="Branch manager does not have a branch assigned")
 
             branch_id = manager_row['branch_id']
 
+            # Balances move with every posting, so transactions count as a change
+            validators = conditional.evaluate(
+                request, cursor, ("accounts", "customers", "transactions"), branch_id, current_user)
+            if validators.not_modified:
+                return validators.not_modified_response()
+
             # Get all savings accounts in the same branch with customer details
             cursor.execute("""
                 SELECT saving_account_id, open_date, balance, employee_id, s_plan_id, status, branch_id,
@@ -237,7 +244,7 @@ def get_branch_savings_accounts(conn=Depends(get_db), current_user=Depends(get_c
             """, (branch_id,))
 
             rows = cursor.fetchall()
-            return [SavingsAccountWithCustomerRead(**row) for row in rows]
+            return validators.apply(model_rows_response(rows, SavingsAccountWithCustomerRead))
 
     except HTTPException:
         raise
@@ -247,7 +254,7 @@ def get_branch_savings_accounts(conn=Depends(get_db), current_user=Depends(get_c
 
 
 @router.get("/saving-account/branch/stats")
-def get_branch_savings_stats(conn=Depends(get_db), current_user=Depends(get_current_user)):
+def get_branch_savings_stats(conn=Depends(get_read_db), current_user=Depends(get_current_user)):
     """
     Get savings account statistics for the branch manager's branch.
     Only branch managers can access this endpoint.
@@ -267,9 +274,7 @@ def get_branch_savings_stats(conn=Depends(get_db), current_user=Depends(get_curr
 
         with conn.cursor(cursor_factory=RealDictCursor) as cursor:
             # Get branch_id of the current branch manager
-            cursor.execute(
-                "SELECT branch_id FROM employee WHERE employee_id = %s", (employee_id,))
-            manager_row = cursor.fetchone()
+            manager_row = get_employee_branch(cursor, employee_id)
             if not manager_row or not manager_row['branch_id']:
                 raise HTTPException(
                     status_code=400, detail="Branch manager does not have a branch assigned")
@@ -0,0 +1,200 @@
+import os
+import random
+import logging
+from datetime import datetime, timedelta
+from psycopg2.extras import RealDictCursor
+
+logger = logging.getLogger(__name__)
+
+# Spread each run over this many seconds after its cron time
+SCHEDULER_JITTER_SECONDS = int(os.getenv("SCHEDULER_JITTER_SECONDS", 0))
+
+# Field bounds of a cron expression: minute hour day-of-month month day-of-week
+CRON_FIELDS = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day of month", 1, 31),
+    ("month", 1, 12),
+    ("day of week", 0, 7),
+)
+
+
+class CronExpression:
+    """
+    Standard five-field cron expression ("1 0 * * *"). Fields accept *, lists,
+    ranges and steps ("*/15", "1-5", "0,30"). Day of week is 0-7 with Sunday
+    as 0 or 7. As in cron, when both day fields are restricted (neither
+    starts with *) a day matches if either one does.
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got {len(fields)}: {expression!r}")
+        parsed = [self._parse_field(text, name, low, high)
+                  for text, (name, low, high) in zip(fields, CRON_FIELDS)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {d % 7 for d in weekdays}
+        # As in cron, a day field starting with * ("*", "*/2") counts as unrestricted
+        self.any_day = fields[2].startswith("*")
+        self.any_weekday = fields[4].startswith("*")
+
+    @staticmethod
+    def _parse_field(text: str, name: str, low: int, high: int) -> set:
+        values = set()
+        for part in text.split(","):
+            step = 1
+            if "/" in part:
+                part, step_text = part.split("/", 1)
+                step = int(step_text)
+                if step < 1:
+                    raise ValueError(f"Invalid step in {name} field: {text!r}")
+            if part == "*":
+                start, end = low, high
+            elif "-" in part:
+                start, end = (int(v) for v in part.split("-", 1))
+            else:
+                start = int(part)
+                end = high if step > 1 else start
+            if not (low <= start <= end <= high):
+                raise ValueError(f"{name.capitalize()} field out of range {low}-{high}: {text!r}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, day: datetime) -> bool:
+        if day.month not in self.months:
+            return False
+        in_days = day.day in self.days
+        # isoweekday(): Monday 1 .. Sunday 7; cron: Sunday 0 .. Saturday 6
+        in_weekdays = day.isoweekday() % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+
+    def next_after(self, moment: datetime) -> datetime:
+        """First matching minute strictly after `moment`."""
+        start = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        # Every valid expression matches within a few years (Feb 29 on a given weekday)
+        for _ in range(366 * 8):
+            if self._day_matches(day):
+                for hour in sorted(self.hours):
+                    for minute in sorted(self.minutes):
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate >= start:
+                            return candidate
+            day += timedelta(days=1)
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+
+def next_run(cron: CronExpression, after: datetime) -> datetime:
+    """Next cron time after `after`, plus this node's jitter."""
+    due = cron.next_after(after)
+    if SCHEDULER_JITTER_SECONDS > 0:
+        due += timedelta(seconds=random.uniform(0, SCHEDULER_JITTER_SECONDS))
+    return due
+
+
+def sync_schedules(conn, schedules: dict):
+    """
+    Make sure every job has a ScheduledJob row. New jobs, and jobs whose cron
+    expression changed, get a fresh next run; otherwise the persisted next
+    run is kept, so runs missed while no scheduler was up are caught up.
+    """
+    now = datetime.now()
+    with conn.cursor() as cursor:
+        for job_name, cron in schedules.items():
+            cursor.execute("""
+                INSERT INTO ScheduledJob (job_name, cron_expression, next_run_at)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (job_name) DO UPDATE
+                SET cron_expression = EXCLUDED.cron_expression,
+                    next_run_at = CASE
+                        WHEN ScheduledJob.cron_expression <> EXCLUDED.cron_expression
+                        THEN EXCLUDED.next_run_at
+                        ELSE ScheduledJob.next_run_at
+                    END
+            """, (job_name, cron.expression, next_run(cron, now)))
+    conn.commit()
+
+
+def load_schedules(conn) -> dict:
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute("""
+            SELECT job_name, cron_expression, enabled, next_run_at,
+                   last_started_at, last_finished_at, last_status
+            FROM ScheduledJob
+            ORDER BY next_run_at
+        """)
+        rows = {row['job_name']: row for row in cursor.fetchall()}
+    conn.commit()
+    return rows
+
+
+def next_due_at(conn, job_names) -> datetime:
+    """Earliest next run among the given enabled jobs, or None."""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT MIN(next_run_at) FROM ScheduledJob
+            WHERE enabled = true AND job_name = ANY(%s)
+        """, (list(job_names),))
+        due = cursor.fetchone()[0]
+    conn.commit()
+    return due
+
+
+def try_lock(conn) -> bool:
+    """
+    Session-level advisory lock held while jobs run, so jobs never overlap
+    with each other or with another node's scheduler. Released by unlock()
+    or when the connection drops.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(hashtext('scheduled_jobs'))")
+        locked = cursor.fetchone()[0]
+    conn.commit()
+    return locked
+
+
+def unlock(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_unlock(hashtext('scheduled_jobs'))")
+    conn.commit()
+
+
+def due_jobs(conn, job_names, now: datetime) -> list:
+    """Jobs whose next run has passed, oldest first. Read under the lock, so never stale."""
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute("""
+            SELECT job_name, next_run_at FROM ScheduledJob
+            WHERE enabled = true AND next_run_at <= %s AND job_name = ANY(%s)
+            ORDER BY next_run_at, job_name
+        """, (now, list(job_names)))
+        rows = cursor.fetchall()
+    conn.commit()
+    return rows
+
+
+def mark_started(conn, job_name: str):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            UPDATE ScheduledJob SET last_started_at = %s WHERE job_name = %s
+        """, (datetime.now(), job_name))
+    conn.commit()
+
+
+def mark_finished(conn, job_name: str, cron: CronExpression, status: str):
+    """
+    Schedule the next run from now rather than from the missed time, so a
+    scheduler that was down for days runs each job once, not once per day:
+    every job already processes everything outstanding.
+    """
+    now = datetime.now()
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            UPDATE ScheduledJob
+            SET last_finished_at = %s, last_status = %s, next_run_at = %s
+            WHERE job_name = %s
+        """, (now, status, next_run(cron, now), job_name))
+    conn.commit()
@@ -173,6 +173,7 @@ class FixedDepositCreate(BaseModel):
 
 class FixedDepositRead(FixedDepositCreate):
     fixed_deposit_id: str = Field(max_length=10)
+    next_payout_at: datetime | None = None
 
 # AccountHolder Models
 
@@ -260,3 +261,14 @@ class JointAccountRead(BaseModel):
     holder_ids: list[str]
     customer_names: list[str]
     customer_nics: list[str]
+
+# Delta Sync Models
+
+
+class AgentChangesRead(BaseModel):
+    """Rows of an agent's portfolio changed since a sync cursor (all of them when full)"""
+    cursor: str
+    full: bool
+    customers: list[CustomerRead]
+    accounts: list[SavingsAccountWithCustomerRead]
+    fixed_deposits: list[FixedDepositRead]
@@ -0,0 +1,150 @@
+import os
+import logging
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from psycopg2.extras import RealDictCursor
+from psycopg2.extensions import QueryCanceledError
+from database import get_db
+from fastjson import model_rows, model_response
+from auth import get_current_user
+from schemas import AgentChangesRead, CustomerRead, SavingsAccountWithCustomerRead, FixedDepositRead
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# A delta larger than this is answered with a full sync instead
+SYNC_MAX_CHANGES = int(os.getenv("SYNC_MAX_CHANGES", 2000))
+
+# Every transaction below the snapshot's xmin has finished, so it is a safe
+# point to resume from (see init-scripts/12-change-tracking.sql). Only on the
+# server that took the snapshot, though: a replica's snapshot can be ahead of
+# changes it has not replayed yet, so syncs always read from the primary.
+CURSOR_QUERY = "SELECT pg_snapshot_xmin(pg_current_snapshot())::text AS cursor"
+
+CUSTOMERS_QUERY = """
+    SELECT customer_id, name, nic, phone_number, address, date_of_birth, email, status, employee_id
+    FROM customer
+    WHERE employee_id = %(agent)s {since}
+    ORDER BY customer_id
+"""
+
+ACCOUNT_COLUMNS = """
+    v.saving_account_id, v.open_date, v.balance, v.employee_id, v.s_plan_id, v.status,
+    v.branch_id, v.customer_id, v.customer_name, v.customer_nic
+"""
+
+ACCOUNTS_QUERY = f"""
+    SELECT {ACCOUNT_COLUMNS}
+    FROM savings_account_with_customer v
+    WHERE v.employee_id = %(agent)s
+    ORDER BY v.saving_account_id, v.customer_id
+"""
+
+# Accounts carry their holders' names, so a changed customer changes them too
+CHANGED_ACCOUNTS_QUERY = f"""
+    SELECT {ACCOUNT_COLUMNS}
+    FROM savings_account_with_customer v
+    WHERE v.saving_account_id IN (
+        SELECT saving_account_id FROM SavingsAccount
+        WHERE employee_id = %(agent)s AND change_xid >= %(since)s::xid8
+        UNION
+        SELECT ah.saving_account_id FROM Customer c
+        JOIN AccountHolder ah ON ah.customer_id = c.customer_id
+        WHERE c.employee_id = %(agent)s AND c.change_xid >= %(since)s::xid8
+    )
+    AND v.employee_id = %(agent)s
+    ORDER BY v.saving_account_id, v.customer_id
+"""
+
+FIXED_DEPOSITS_QUERY = """
+    SELECT fd.fixed_deposit_id, fd.saving_account_id, fd.f_plan_id, fd.start_date, fd.end_date,
+           fd.principal_amount, fd.interest_payment_type, fd.last_payout_date, fd.status,
+           fd.next_payout_at
+    FROM FixedDeposit fd
+    JOIN SavingsAccount sa ON sa.saving_account_id = fd.saving_account_id
+    WHERE sa.employee_id = %(agent)s {since}
+    ORDER BY fd.fixed_deposit_id
+"""
+
+
+def fetch_portfolio(cursor, agent: str, since: Optional[str], limit: Optional[int]):
+    """
+    Customers, accounts and deposits of `agent`, all of them or those
+    changed since `since`. Returns None when a delta exceeds `limit` rows.
+    """
+    params = {"agent": agent, "since": since}
+    limit_sql = f" LIMIT {limit + 1}" if limit is not None else ""
+    if since is None:
+        statements = [CUSTOMERS_QUERY.format(since=""), ACCOUNTS_QUERY,
+                      FIXED_DEPOSITS_QUERY.format(since="")]
+    else:
+        statements = [
+            CUSTOMERS_QUERY.format(since="AND change_xid >= %(since)s::xid8"),
+            CHANGED_ACCOUNTS_QUERY,
+            FIXED_DEPOSITS_QUERY.format(since="AND fd.change_xid >= %(since)s::xid8"),
+        ]
+
+    results = []
+    for statement in statements:
+        cursor.execute(statement + limit_sql, params)
+        rows = cursor.fetchall()
+        if limit is not None and len(rows) > limit:
+            return None
+        results.append(rows)
+    return results
+
+
+@router.get("/agent/changes", response_model=AgentChangesRead)
+def get_agent_changes(
+    cursor: Optional[str] = Query(None, description="Cursor returned by the previous call; omit for a full sync"),
+    conn=Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """
+    Customers, savings accounts and fixed deposits of the calling agent that
+    were created or changed since `cursor`, plus the cursor to pass next
+    time. Without a cursor, or when more than SYNC_MAX_CHANGES rows of one
+    kind changed, the whole portfolio is returned with full = true and the
+    client should replace its copy instead of merging. Rows can repeat across
+    calls; merge them by id.
+    """
+    if current_user.get('type', '').lower() != 'agent':
+        raise HTTPException(status_code=403, detail="Only agents can sync their portfolio")
+
+    since = cursor
+    if since is not None and not since.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid sync cursor")
+
+    agent = current_user.get('employee_id')
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as db_cursor:
+            # Taken before reading, so nothing committed after it is skipped next time
+            db_cursor.execute(CURSOR_QUERY)
+            next_cursor = db_cursor.fetchone()['cursor']
+
+            portfolio = None
+            if since is not None:
+                portfolio = fetch_portfolio(db_cursor, agent, since, SYNC_MAX_CHANGES)
+                if portfolio is None:
+                    logger.info(f"Delta for agent {agent} over {SYNC_MAX_CHANGES} rows, sending a full sync")
+            full = portfolio is None
+            if full:
+                portfolio = fetch_portfolio(db_cursor, agent, None, None)
+
+        customers, accounts, fixed_deposits = portfolio
+        return model_response({
+            "cursor": next_cursor,
+            "full": full,
+            "customers": model_rows(customers, CustomerRead),
+            "accounts": model_rows(accounts, SavingsAccountWithCustomerRead),
+            "fixed_deposits": model_rows(fixed_deposits, FixedDepositRead),
+        })
+
+    except HTTPException:
+        raise
+    except QueryCanceledError:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Database error: {str(e)}")
@@ -1,14 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from psycopg2.extras import RealDictCursor
-from database import get_db
+from psycopg2.extensions import QueryCanceledError
+from database import get_db, get_read_db, connect
+from fastjson import json_response
 from auth import get_current_user
+from cache import get_employee_branch
 from datetime import datetime, timedelta
 from decimal import Decimal
-from schemas import TransactionsCreate, Trantype
-from transaction import create_transaction
+from metrics import track_job
+from querylog import route_context
+from typing import Optional
+import projection
+import interest
+import jobruns
+import jobqueue
+import scheduler
 import threading
 import time
 import logging
+import os
 
 router = APIRouter()
 
@@ -19,6 +29,23 @@ logger = logging.getLogger(__name__)
 # Background scheduler flag
 scheduler_running = False
 scheduler_thread = None
+# Liveness markers read by /ready
+scheduler_heartbeat = None
+scheduler_current_job = None
+# Set to wake the scheduler early (e.g. to stop it)
+scheduler_wakeup = threading.Event()
+
+# When each automatic job runs (cron: minute hour day-of-month month day-of-week)
+JOB_SCHEDULES = {
+    "savings_interest": os.getenv("SCHEDULE_SAVINGS_INTEREST", "1 0 * * *"),
+    "fd_interest": os.getenv("SCHEDULE_FD_INTEREST", "3 0 * * *"),
+    "fd_maturity": os.getenv("SCHEDULE_FD_MATURITY", "5 0 * * *"),
+}
+# Longest the scheduler sleeps before re-reading the schedule; keeps the
+# /ready heartbeat fresh and picks up runs claimed by other nodes
+SCHEDULER_MAX_SLEEP_SECONDS = 60
+# Wait before retrying when another node's scheduler is running jobs
+SCHEDULER_LOCK_RETRY_SECONDS = 30
 
 
 def round_currency(amount: Decimal) -> Decimal:
@@ -35,115 +62,36 @@ def get_admin_user():
     }
 
 
-def auto_calculate_savings_account_interest():
-    """
-    Automatically calculate and pay interest for all active savings accounts.
-    This function runs monthly and calculates interest based on current balance.
-    Uses transactions to track if interest was already paid for the current month.
-    """
+def run_automatic_job(job_name: str, label: str) -> dict:
+    """Run one job across all branches on the interest worker pool."""
     try:
-        import psycopg2
-        from database import DATABASE_CONFIG
-        conn = psycopg2.connect(**DATABASE_CONFIG)
+        current_date = datetime.now()
+        logger.info(f"Starting automatic {label} at {current_date}")
 
-        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-            current_date = datetime.now()
-            current_month = current_date.month
-            current_year = current_date.year
+        with jobruns.record_run(job_name, "scheduled") as run:
+            report = run["report"] = interest.run_partitioned(job_name, current_date)
+            if report['failed_partitions']:
+                raise RuntimeError(
+                    f"{len(report['failed_partitions'])} of {report['partitions']} partitions failed")
 
-            logger.info(
-                f"Starting automatic savings account interest calculation at {current_date}")
-
-            # Get all active savings accounts with their plan details
-            cursor.execute("""
-                SELECT sa.saving_account_id, sa.balance, sa.open_date,
-                       sap.interest_rate, sap.plan_name, sap.min_balance
-                FROM SavingsAccount sa
-                JOIN SavingsAccount_Plans sap ON sa.s_plan_id = sap.s_plan_id
-                WHERE sa.status = true AND sa.balance >= sap.min_balance
-            """)
-
-            savings_accounts = cursor.fetchall()
-            processed_count = 0
-            total_interest_paid = Decimal('0.00')
-
-            for account in savings_accounts:
-                # Check if interest was already paid for this month
-                cursor.execute("""
-                    SELECT COUNT(*) as count FROM Transactions t
-                    JOIN AccountHolder ah ON t.holder_id = ah.holder_id
-                    WHERE ah.saving_account_id = %s 
-                    AND t.type = 'Interest'
-                    AND t.description LIKE 'Monthly savings account interest%%'
-                    AND EXTRACT(MONTH FROM t.timestamp) = %s
-                    AND EXTRACT(YEAR FROM t.timestamp) = %s
-                """, (account['saving_account_id'], current_month, current_year))
-
-                interest_already_paid = cursor.fetchone()['count'] > 0
-
-                if not interest_already_paid:
-                    # Convert interest rate from string (e.g., "12") to decimal
-                    interest_rate_str = account['interest_rate'].replace(
-                        '%', '').strip()
-                    annual_interest_rate = Decimal(
-                        interest_rate_str) / Decimal('100')
-
-                    # Calculate monthly interest rate (annual rate / 12)
-                    monthly_interest_rate = annual_interest_rate / \
-                        Decimal('12')
-
-                    # Calculate monthly interest based on current balance
-                    interest_amount = account['balance'] * \
-                        monthly_interest_rate
-
-                    # Round to 2 decimal places for currency precision
-                    interest_amount = round_currency(interest_amount)
-
-                    if interest_amount > 0:
-                        # Get a holder for this account (use first one if joint)
-                        cursor.execute("""
-                            SELECT holder_id FROM AccountHolder WHERE saving_account_id = %s LIMIT 1
-                        """, (account['saving_account_id'],))
-                        holder_row = cursor.fetchone()
-
-                        if holder_row:
-                            # Add interest to savings account balance
-                            cursor.execute("""
-                                UPDATE SavingsAccount 
-                                SET balance = balance + %s
-                                WHERE saving_account_id = %s
-                            """, (interest_amount, account['saving_account_id']))
-
-                            # Create interest transaction directly in database
-                            cursor.execute("""
-                                INSERT INTO Transactions (holder_id, type, amount, timestamp, description)
-                                VALUES (%s, %s, %s, %s, %s)
-                            """, (
-                                holder_row['holder_id'],
-                                'Interest',
-                                interest_amount,
-                                current_date,
-                                f"Monthly savings account interest - {current_month:02d}/{current_year} - Account: {account['saving_account_id']}"
-                            ))
-
-                            processed_count += 1
-                            total_interest_paid += interest_amount
-
-                            logger.info(
-                                f"Processed Account {account['saving_account_id']}: Interest {interest_amount}")
-
-        conn.commit()
         logger.info(
-            f"Savings account interest calculation completed: {processed_count} accounts, Total interest: {total_interest_paid}")
+            f"{label.capitalize()} completed: {report['postings']} postings, "
+            f"Total interest: {report['total_interest']}, Total posted: {report['total_amount']}, "
+            f"{report['partitions']} partitions on {report['workers']} workers in {report['runtime_ms']}ms")
+        return report
 
     except Exception as e:
-        logger.error(
-            f"Error in automatic savings account interest calculation: {str(e)}")
-        if 'conn' in locals():
-            conn.rollback()
-    finally:
-        if 'conn' in locals():
-            conn.close()
+        logger.error(f"Error in automatic {label}: {str(e)}")
+        raise
+
+
+def auto_calculate_savings_account_interest():
+    """
+    Automatically calculate and pay interest for all active savings accounts.
+    This function runs monthly and calculates interest based on current balance.
+    Uses transactions to track if interest was already paid for the current month.
+    """
+    return run_automatic_job("savings_interest", "savings account interest calculation")
 
 
 def auto_calculate_fixed_deposit_interest():
@@ -151,256 +99,112 @@ def auto_calculate_fixed_deposit_interest():
     Automatically calculate and pay interest for all active fixed deposits.
     This function runs without API dependencies.
     """
-    try:
-        import psycopg2
-        from database import DATABASE_CONFIG
-        conn = psycopg2.connect(**DATABASE_CONFIG)
-
-        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-            current_date = datetime.now()
-            logger.info(
-                f"Starting automatic interest calculation at {current_date}")
-
-            # Get all active fixed deposits that haven't matured yet
-            cursor.execute("""
-                SELECT fd.fixed_deposit_id, fd.saving_account_id, fd.principal_amount, 
-                       fd.start_date, fd.end_date, fd.last_payout_date, fd.interest_payment_type,
-                       fdp.interest_rate, fdp.months
-                FROM FixedDeposit fd
-                JOIN FixedDeposit_Plans fdp ON fd.f_plan_id = fdp.f_plan_id
-                WHERE fd.status = true AND fd.end_date > %s
-            """, (current_date,))
-
-            fixed_deposits = cursor.fetchall()
-            processed_count = 0
-            total_interest_paid = Decimal('0.00')
-
-            for fd in fixed_deposits:
-                # Calculate days since last payout
-                last_payout = fd['last_payout_date'] or fd['start_date']
-                days_since_payout = (current_date - last_payout).days
-
-                # Only process if at least 30 days have passed since last payout
-                if days_since_payout >= 30:
-                    # Calculate number of complete 30-day periods
-                    complete_periods = days_since_payout // 30
-
-                    # Convert interest rate from string (e.g., "13%") to decimal
-                    interest_rate_str = fd['interest_rate'].replace('%', '')
-                    annual_interest_rate = Decimal(
-                        interest_rate_str) / Decimal('100')
-
-                    # Calculate monthly interest rate (annual rate / 12)
-                    monthly_interest_rate = annual_interest_rate / \
-                        Decimal('12')
-
-                    # Calculate interest for complete periods
-                    interest_amount = fd['principal_amount'] * \
-                        monthly_interest_rate * complete_periods
-
-                    # Round to 2 decimal places for currency precision
-                    interest_amount = round_currency(interest_amount)
-
-                    if interest_amount > 0:
-                        # Get a holder for this account (use first one if joint)
-                        cursor.execute("""
-                            SELECT holder_id FROM AccountHolder WHERE saving_account_id = %s LIMIT 1
-                        """, (fd['saving_account_id'],))
-                        holder_row = cursor.fetchone()
-
-                        if holder_row:
-                            # Add interest to savings account balance
-                            cursor.execute("""
-                                UPDATE SavingsAccount 
-                                SET balance = balance + %s 
-                                WHERE saving_account_id = %s
-                            """, (interest_amount, fd['saving_account_id']))
-
-                            # Create interest transaction directly in database
-                            cursor.execute("""
-                                INSERT INTO Transactions (holder_id, type, amount, timestamp, description)
-                                VALUES (%s, %s, %s, %s, %s)
-                            """, (
-                                holder_row['holder_id'],
-                                'Interest',
-                                interest_amount,
-                                current_date,
-                                f"Auto-calculated fixed deposit interest for {complete_periods} month(s) - FD ID: {fd['fixed_deposit_id']}"
-                            ))
-
-                            # Update last payout date
-                            new_payout_date = last_payout + \
-                                timedelta(days=complete_periods * 30)
-                            cursor.execute("""
-                                UPDATE FixedDeposit 
-                                SET last_payout_date = %s 
-                                WHERE fixed_deposit_id = %s
-                            """, (new_payout_date, fd['fixed_deposit_id']))
-
-                            processed_count += 1
-                            total_interest_paid += interest_amount
-
-                            logger.info(
-                                f"Processed FD {fd['fixed_deposit_id']}: Interest {interest_amount}, Periods: {complete_periods}")
-
-        conn.commit()
-        logger.info(
-            f"Interest calculation completed: {processed_count} deposits, Total interest: {total_interest_paid}")
-
-    except Exception as e:
-        logger.error(f"Error in automatic interest calculation: {str(e)}")
-        if 'conn' in locals():
-            conn.rollback()
-    finally:
-        if 'conn' in locals():
-            conn.close()
+    return run_automatic_job("fd_interest", "fixed deposit interest calculation")
 
 
 def auto_process_matured_deposits():
     """
     Automatically process matured fixed deposits.
     """
+    return run_automatic_job("fd_maturity", "maturity processing")
+
+
+def run_scheduled_job(job_name: str, job) -> bool:
+    """Run one scheduled job, recording its duration and outcome in /metrics"""
+    global scheduler_current_job
+    scheduler_current_job = job_name
     try:
-        import psycopg2
-        from database import DATABASE_CONFIG
-        conn = psycopg2.connect(**DATABASE_CONFIG)
+        with track_job(job_name), route_context(f"job:{job_name}"):
+            job()
+        return True
+    except Exception:
+        return False  # Already logged by the job; keep the scheduler alive
+    finally:
+        scheduler_current_job = None
 
-        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-            current_date = datetime.now()
-            logger.info(
-                f"Starting automatic maturity processing at {current_date}")
-
-            # Get all fixed deposits that have matured
-            cursor.execute("""
-                SELECT fd.fixed_deposit_id, fd.saving_account_id, fd.principal_amount, 
-                       fd.start_date, fd.end_date, fd.last_payout_date,
-                       fdp.interest_rate, fdp.months
-                FROM FixedDeposit fd
-                JOIN FixedDeposit_Plans fdp ON fd.f_plan_id = fdp.f_plan_id
-                WHERE fd.status = true AND fd.end_date <= %s
-            """, (current_date,))
-
-            matured_deposits = cursor.fetchall()
-            processed_count = 0
-            total_amount_returned = Decimal('0.00')
-
-            for fd in matured_deposits:
-                # Calculate any remaining interest from last payout to maturity
-                last_payout = fd['last_payout_date'] or fd['start_date']
-                days_remaining = (fd['end_date'] - last_payout).days
-
-                remaining_interest = Decimal('0.00')
-                if days_remaining > 0:
-                    # Convert interest rate from string to decimal
-                    interest_rate_str = fd['interest_rate'].replace('%', '')
-                    annual_interest_rate = Decimal(
-                        interest_rate_str) / Decimal('100')
-                    daily_interest_rate = annual_interest_rate / Decimal('365')
-
-                    # Calculate proportional interest for remaining days
-                    remaining_interest = fd['principal_amount'] * \
-                        daily_interest_rate * days_remaining
-
-                    # Round to 2 decimal places for currency precision
-                    remaining_interest = round_currency(remaining_interest)
-
-                # Total amount to return (principal + remaining interest)
-                total_return = fd['principal_amount'] + remaining_interest
-
-                # Round total return to 2 decimal places for currency precision
-                total_return = round_currency(total_return)
-
-                # Get a holder for this account
-                cursor.execute("""
-                    SELECT holder_id FROM AccountHolder WHERE saving_account_id = %s LIMIT 1
-                """, (fd['saving_account_id'],))
-                holder_row = cursor.fetchone()
-
-                if holder_row:
-                    # Add total amount to savings account
-                    cursor.execute("""
-                        UPDATE SavingsAccount 
-                        SET balance = balance + %s 
-                        WHERE saving_account_id = %s
-                    """, (total_return, fd['saving_account_id']))
-
-                    # Create maturity transaction
-                    cursor.execute("""
-                        INSERT INTO Transactions (holder_id, type, amount, timestamp, description)
-                        VALUES (%s, %s, %s, %s, %s)
-                    """, (
-                        holder_row['holder_id'],
-                        'Deposit',
-                        total_return,
-                        current_date,
-                        f"Auto-processed fixed deposit maturity - Principal: {fd['principal_amount']}, Interest: {remaining_interest} - FD ID: {fd['fixed_deposit_id']}"
-                    ))
-
-                    # Mark fixed deposit as inactive/completed
-                    cursor.execute("""
-                        UPDATE FixedDeposit 
-                        SET status = false 
-                        WHERE fixed_deposit_id = %s
-                    """, (fd['fixed_deposit_id'],))
-
-                    processed_count += 1
-                    total_amount_returned += total_return
-
-                    logger.info(
-                        f"Matured FD {fd['fixed_deposit_id']}: Total return {total_return}")
-
-        conn.commit()
-        logger.info(
-            f"Maturity processing completed: {processed_count} deposits, Total returned: {total_amount_returned}")
 
-    except Exception as e:
-        logger.error(f"Error in automatic maturity processing: {str(e)}")
-        if 'conn' in locals():
-            conn.rollback()
+SCHEDULED_JOBS = {
+    "savings_interest": auto_calculate_savings_account_interest,
+    "fd_interest": auto_calculate_fixed_deposit_interest,
+    "fd_maturity": auto_process_matured_deposits,
+}
+
+
+def run_due_jobs(conn, crons: dict) -> bool:
+    """
+    Run every job whose next run has passed, one at a time, under the
+    scheduler lock. Returns False if another node holds the lock.
+    """
+    if not scheduler.due_jobs(conn, crons, datetime.now()):
+        return True
+    if not scheduler.try_lock(conn):
+        logger.info("Another scheduler is running jobs; retrying shortly")
+        return False
+
+    try:
+        # Re-read under the lock: another node may have just run them
+        for row in scheduler.due_jobs(conn, crons, datetime.now()):
+            job_name = row['job_name']
+            late = datetime.now() - row['next_run_at']
+            if late > timedelta(seconds=SCHEDULER_MAX_SLEEP_SECONDS):
+                logger.info(f"Catching up {job_name}: run due at {row['next_run_at']} was missed")
+            else:
+                logger.info(f"Running scheduled {job_name}")
+
+            scheduler.mark_started(conn, job_name)
+            succeeded = run_scheduled_job(job_name, SCHEDULED_JOBS[job_name])
+            scheduler.mark_finished(conn, job_name, crons[job_name],
+                                    "succeeded" if succeeded else "failed")
+            if not scheduler_running:
+                break
     finally:
-        if 'conn' in locals():
-            conn.close()
+        scheduler.unlock(conn)
+    return True
 
 
-def run_daily_tasks():
-    """Run the daily scheduled tasks continuously"""
-    global scheduler_running
+def run_scheduler():
+    """
+    Sleep until the next job is due, run what is due, repeat. Next run times
+    live in ScheduledJob, so runs missed while no scheduler was up are
+    caught up on start.
+    """
+    global scheduler_heartbeat
+    crons = {name: scheduler.CronExpression(expression)
+             for name, expression in JOB_SCHEDULES.items()}
+    conn = None
 
     while scheduler_running:
-        current_time = datetime.now()
-
-        # Check if it's 00:01 AM (savings account interest calculation time)
-        if current_time.hour == 0 and current_time.minute == 1:
-            logger.info(
-                "Running scheduled savings account interest calculation")
-            auto_calculate_savings_account_interest()
-            # Sleep for 1 minute to avoid running multiple times
-            time.sleep(60)
-
-        # Check if it's 00:03 AM (fixed deposit interest calculation time)
-        elif current_time.hour == 0 and current_time.minute == 3:
-            logger.info("Running scheduled fixed deposit interest calculation")
-            auto_calculate_fixed_deposit_interest()
-            # Sleep for 1 minute to avoid running multiple times
-            time.sleep(60)
-
-        # Check if it's 00:05 AM (maturity processing time)
-        elif current_time.hour == 0 and current_time.minute == 5:
-            logger.info("Running scheduled maturity processing")
-            auto_process_matured_deposits()
-            # Sleep for 1 minute to avoid running multiple times
-            time.sleep(60)
-
-        else:
-            time.sleep(30)  # Check every 30 seconds
+        scheduler_heartbeat = time.time()
+        scheduler_wakeup.clear()
+        try:
+            if conn is None or conn.closed:
+                conn = connect()
+                scheduler.sync_schedules(conn, crons)
+
+            if run_due_jobs(conn, crons):
+                due = scheduler.next_due_at(conn, crons)
+                wait = SCHEDULER_MAX_SLEEP_SECONDS if due is None else (due - datetime.now()).total_seconds()
+            else:
+                wait = SCHEDULER_LOCK_RETRY_SECONDS
+        except Exception as e:
+            logger.error(f"Scheduler error: {str(e)}")
+            if conn is not None:
+                conn.close()
+                conn = None
+            wait = SCHEDULER_MAX_SLEEP_SECONDS
+
+        scheduler_wakeup.wait(min(max(wait, 0), SCHEDULER_MAX_SLEEP_SECONDS))
+
+    if conn is not None:
+        conn.close()
 
 
 def start_automatic_tasks():
     """
     Start the automatic interest calculation scheduler.
-    Runs daily at:
+    By default runs daily at:
     - 00:01 AM: Savings account interest calculation
-    - 00:03 AM: Fixed deposit interest calculation  
+    - 00:03 AM: Fixed deposit interest calculation
     - 00:05 AM: Fixed deposit maturity processing
     """
     global scheduler_running, scheduler_thread
@@ -409,11 +213,11 @@ def start_automatic_tasks():
 
         # Start scheduler in background thread
         scheduler_thread = threading.Thread(
-            target=run_daily_tasks, daemon=True)
+            target=run_scheduler, daemon=True)
         scheduler_thread.start()
 
-        logger.info(
-            "Automatic tasks started - Savings (00:01), FD Interest (00:03), FD Maturity (00:05)")
+        schedules = ", ".join(f"{name} ({cron})" for name, cron in JOB_SCHEDULES.items())
+        logger.info(f"Automatic tasks started - {schedules}")
         return {"message": "Automatic tasks started successfully"}
     else:
         return {"message": "Automatic tasks already running"}
@@ -423,6 +227,7 @@ def stop_automatic_tasks():
     """Stop the automatic tasks"""
     global scheduler_running
     scheduler_running = False
+    scheduler_wakeup.set()
     logger.info("Automatic fixed deposit tasks stopped")
     return {"message": "Automatic tasks stopped successfully"}
 
@@ -456,353 +261,174 @@ def stop_automatic_tasks_endpoint(current_user=Depends(get_current_user)):
 
 
 @router.get("/automatic-tasks-status")
-def get_automatic_tasks_status(current_user=Depends(get_current_user)):
+def get_automatic_tasks_status(conn=Depends(get_db), current_user=Depends(get_current_user)):
     """
-    Get the status of automatic tasks.
+    Get the status of automatic tasks, including the last recorded run of each job.
     """
     user_type = current_user.get("type").lower()
     if user_type not in ["admin", "branch_manager"]:
         raise HTTPException(
             status_code=403, detail="Only admins and branch managers can check task status.")
 
+    try:
+        last_runs = jobruns.last_runs(conn)
+        schedules = scheduler.load_schedules(conn)
+    except Exception as e:
+        conn.rollback()
+        logger.warning(f"Could not load job schedules: {str(e)}")
+        last_runs, schedules = {}, {}
+
+    def next_run(job_name):
+        schedule = schedules.get(job_name)
+        if not scheduler_running or not schedule or not schedule['enabled']:
+            return "Not scheduled"
+        return schedule['next_run_at'].isoformat()
+
     return {
         "scheduler_running": scheduler_running,
-        "next_savings_interest_calculation": "Daily at 00:01 AM" if scheduler_running else "Not scheduled",
-        "next_fd_interest_calculation": "Daily at 00:03 AM" if scheduler_running else "Not scheduled",
-        "next_maturity_processing": "Daily at 00:05 AM" if scheduler_running else "Not scheduled",
+        "current_job": scheduler_current_job,
+        "next_savings_interest_calculation": next_run("savings_interest"),
+        "next_fd_interest_calculation": next_run("fd_interest"),
+        "next_maturity_processing": next_run("fd_maturity"),
+        "schedules": schedules,
+        "last_runs": last_runs,
         "current_time": datetime.now().isoformat()
     }
 
 
-@router.post("/calculate-savings-account-interest")
-def calculate_savings_account_interest(conn=Depends(get_db), current_user=Depends(get_current_user)):
+def raise_for_failed_partitions(report: dict):
+    """Partitions commit independently; report the ones that did not."""
+    failed = report['failed_partitions']
+    if failed:
+        raise HTTPException(
+            status_code=500,
+            detail=f"{len(failed)} of {report['partitions']} partitions failed; the others were "
+                   f"committed, run again to complete them: {failed}")
+
+
+def run_manual_job(job_name: str, current_date: datetime, dry_run: bool,
+                   triggered_by: str = None, progress=None) -> dict:
+    """Run a job on behalf of a user; real runs are recorded in the job-run history."""
+    if dry_run:
+        report = interest.run_partitioned(job_name, current_date, automatic=False,
+                                          dry_run=True, on_progress=progress)
+        raise_for_failed_partitions(report)
+        return report
+
+    with jobruns.record_run(job_name, "manual", triggered_by) as run:
+        report = run["report"] = interest.run_partitioned(job_name, current_date, automatic=False,
+                                                          on_progress=progress)
+        raise_for_failed_partitions(report)
+    return report
+
+
+def manual_job_result(job_name: str, report: dict, current_date: datetime) -> dict:
+    """Summary a manual run returns, as the endpoints used to respond synchronously."""
+    if job_name == "savings_interest":
+        return {
+            "message": "Savings account interest calculation completed successfully",
+            "processed_accounts": report['postings'],
+            "total_interest_paid": report['total_interest'],
+            "calculation_date": current_date.isoformat(),
+            "month_year": f"{current_date.month:02d}/{current_date.year}",
+            "report": report
+        }
+    if job_name == "fd_interest":
+        return {
+            "message": "Fixed deposit interest calculation completed successfully",
+            "processed_deposits": report['postings'],
+            "total_interest_paid": report['total_interest'],
+            "calculation_date": current_date.isoformat(),
+            "report": report
+        }
+    return {
+        "message": "Fixed deposit maturity processing completed successfully",
+        "matured_deposits": report['postings'],
+        "total_amount_returned": report['total_amount'],
+        "processing_date": current_date.isoformat(),
+        "report": report
+    }
+
+
+def queued_interest_job(job_name: str):
+    """Job queue handler for one of the interest/maturity jobs."""
+    def handler(job: dict, progress) -> dict:
+        dry_run = job['params'].get("dry_run", False)
+        current_date = datetime.now()
+        report = run_manual_job(job_name, current_date, dry_run, job['submitted_by'], progress)
+        return report if dry_run else manual_job_result(job_name, report, current_date)
+    return handler
+
+
+for _job_name in interest.JOBS:
+    jobqueue.register(_job_name, queued_interest_job(_job_name))
+
+
+def submit_manual_job(job_name: str, dry_run: bool, conn, current_user, message: str):
+    try:
+        job = jobqueue.submit(conn, job_name, {"dry_run": dry_run}, current_user.get("username"))
+        return jobqueue.accepted(job, message)
+    except Exception as e:
+        conn.rollback()
+        raise HTTPException(
+            status_code=500, detail=f"Database error: {str(e)}")
+
+
+@router.post("/calculate-savings-account-interest", status_code=202)
+def calculate_savings_account_interest(dry_run: bool = False, conn=Depends(get_db), current_user=Depends(get_current_user)):
     """
     Calculate and pay interest for all active savings accounts monthly.
     Only admins can trigger this calculation.
     Interest is calculated based on current balance and only pays once per month.
+    With dry_run=true, reports what would be posted without writing anything.
+    Runs on the job queue: returns a job ID at once; poll GET /jobs/{job_id}.
     """
     user_type = current_user.get("type").lower()
     if user_type != "admin":
         raise HTTPException(
             status_code=403, detail="Only admins can calculate savings account interest.")
 
-    try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-            current_date = datetime.now()
-            current_month = current_date.month
-            current_year = current_date.year
+    return submit_manual_job("savings_interest", dry_run, conn, current_user,
+                             "Savings account interest calculation queued")
 
-            # Get all active savings accounts with their plan details
-            cursor.execute("""
-                SELECT sa.saving_account_id, sa.balance, sa.open_date,
-                       sap.interest_rate, sap.plan_name, sap.min_balance
-                FROM SavingsAccount sa
-                JOIN SavingsAccount_Plans sap ON sa.s_plan_id = sap.s_plan_id
-                WHERE sa.status = true AND sa.balance >= sap.min_balance
-            """)
-
-            savings_accounts = cursor.fetchall()
-            processed_count = 0
-            total_interest_paid = Decimal('0.00')
-
-            for account in savings_accounts:
-                # Check if interest was already paid for this month
-                cursor.execute("""
-                    SELECT COUNT(*) as count FROM Transactions t
-                    JOIN AccountHolder ah ON t.holder_id = ah.holder_id
-                    WHERE ah.saving_account_id = %s 
-                    AND t.type = 'Interest'
-                    AND t.description LIKE 'Monthly savings account interest%%'
-                    AND EXTRACT(MONTH FROM t.timestamp) = %s
-                    AND EXTRACT(YEAR FROM t.timestamp) = %s
-                """, (account['saving_account_id'], current_month, current_year))
-
-                interest_already_paid = cursor.fetchone()['count'] > 0
-
-                if not interest_already_paid:
-                    # Convert interest rate from string (e.g., "12") to decimal
-                    interest_rate_str = account['interest_rate'].replace(
-                        '%', '').strip()
-                    annual_interest_rate = Decimal(
-                        interest_rate_str) / Decimal('100')
-
-                    # Calculate monthly interest rate (annual rate / 12)
-                    monthly_interest_rate = annual_interest_rate / \
-                        Decimal('12')
-
-                    # Calculate monthly interest based on current balance
-                    interest_amount = account['balance'] * \
-                        monthly_interest_rate
-
-                    # Round to 2 decimal places for currency precision
-                    interest_amount = round_currency(interest_amount)
-
-                    if interest_amount > 0:
-                        # Get a holder for this account (use first one if joint)
-                        cursor.execute("""
-                            SELECT holder_id FROM AccountHolder WHERE saving_account_id = %s LIMIT 1
-                        """, (account['saving_account_id'],))
-                        holder_row = cursor.fetchone()
-
-                        if holder_row:
-                            # Add interest to savings account balance
-                            cursor.execute("""
-                                UPDATE SavingsAccount 
-                                SET balance = balance + %s
-                                WHERE saving_account_id = %s
-                            """, (interest_amount, account['saving_account_id']))
-
-                            # Create interest transaction
-                            transaction_data = TransactionsCreate(
-                                holder_id=holder_row['holder_id'],
-                                type=Trantype.interest,
-                                amount=interest_amount,
-                                timestamp=current_date,
-                                description=f"Monthly savings account interest - {current_month:02d}/{current_year} - Account: {account['saving_account_id']}"
-                            )
-
-                            # Record the transaction
-                            create_transaction(
-                                transaction_data, conn, current_user)
-
-                            processed_count += 1
-                            total_interest_paid += interest_amount
-
-            conn.commit()
-
-            return {
-                "message": "Savings account interest calculation completed successfully",
-                "processed_accounts": processed_count,
-                "total_interest_paid": float(total_interest_paid),
-                "calculation_date": current_date.isoformat(),
-                "month_year": f"{current_month:02d}/{current_year}"
-            }
 
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(
-            status_code=500, detail=f"Database error: {str(e)}")
-
-
-@router.post("/calculate-fixed-deposit-interest")
-def calculate_fixed_deposit_interest(conn=Depends(get_db), current_user=Depends(get_current_user)):
+@router.post("/calculate-fixed-deposit-interest", status_code=202)
+def calculate_fixed_deposit_interest(dry_run: bool = False, conn=Depends(get_db), current_user=Depends(get_current_user)):
     """
     Calculate and pay interest for all active fixed deposits based on 30-day monthly cycles.
     Only admins can trigger this calculation.
     Interest is calculated proportionally if maturity date hasn't been reached.
+    With dry_run=true, reports what would be posted without writing anything.
+    Runs on the job queue: returns a job ID at once; poll GET /jobs/{job_id}.
     """
     user_type = current_user.get("type").lower()
     if user_type != "admin":
         raise HTTPException(
             status_code=403, detail="Only admins can calculate fixed deposit interest.")
 
-    try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-            current_date = datetime.now()
+    return submit_manual_job("fd_interest", dry_run, conn, current_user,
+                             "Fixed deposit interest calculation queued")
 
-            # Get all active fixed deposits that haven't matured yet
-            cursor.execute("""
-                SELECT fd.fixed_deposit_id, fd.saving_account_id, fd.principal_amount, 
-                       fd.start_date, fd.end_date, fd.last_payout_date, fd.interest_payment_type,
-                       fdp.interest_rate, fdp.months
-                FROM FixedDeposit fd
-                JOIN FixedDeposit_Plans fdp ON fd.f_plan_id = fdp.f_plan_id
-                WHERE fd.status = true AND fd.end_date > %s
-            """, (current_date,))
-
-            fixed_deposits = cursor.fetchall()
-            processed_count = 0
-            total_interest_paid = Decimal('0.00')
-
-            for fd in fixed_deposits:
-                # Calculate days since last payout
-                last_payout = fd['last_payout_date'] or fd['start_date']
-                days_since_payout = (current_date - last_payout).days
-
-                # Only process if at least 30 days have passed since last payout
-                if days_since_payout >= 30:
-                    # Calculate number of complete 30-day periods
-                    complete_periods = days_since_payout // 30
-
-                    # Convert interest rate from string (e.g., "13%") to decimal
-                    interest_rate_str = fd['interest_rate'].replace('%', '')
-                    annual_interest_rate = Decimal(
-                        interest_rate_str) / Decimal('100')
-
-                    # Calculate monthly interest rate (annual rate / 12)
-                    monthly_interest_rate = annual_interest_rate / \
-                        Decimal('12')
-
-                    # Calculate interest for complete periods
-                    interest_amount = fd['principal_amount'] * \
-                        monthly_interest_rate * complete_periods
-
-                    # Round to 2 decimal places for currency precision
-                    interest_amount = round_currency(interest_amount)
-
-                    if interest_amount > 0:
-                        # Get a holder for this account (use first one if joint)
-                        cursor.execute("""
-                            SELECT holder_id FROM AccountHolder WHERE saving_account_id = %s LIMIT 1
-                        """, (fd['saving_account_id'],))
-                        holder_row = cursor.fetchone()
-
-                        if holder_row:
-                            # Add interest to savings account balance
-                            cursor.execute("""
-                                UPDATE SavingsAccount 
-                                SET balance = balance + %s 
-                                WHERE saving_account_id = %s
-                            """, (interest_amount, fd['saving_account_id']))
-
-                            # Create interest transaction
-                            transaction_data = TransactionsCreate(
-                                holder_id=holder_row['holder_id'],
-                                type=Trantype.interest,
-                                amount=interest_amount,
-                                timestamp=current_date,
-                                description=f"Fixed deposit interest for {complete_periods} month(s) - FD ID: {fd['fixed_deposit_id']}"
-                            )
-
-                            # Record the transaction
-                            create_transaction(
-                                transaction_data, conn, current_user)
-
-                            # Update last payout date
-                            new_payout_date = last_payout + \
-                                timedelta(days=complete_periods * 30)
-                            cursor.execute("""
-                                UPDATE FixedDeposit 
-                                SET last_payout_date = %s 
-                                WHERE fixed_deposit_id = %s
-                            """, (new_payout_date, fd['fixed_deposit_id']))
-
-                            processed_count += 1
-                            total_interest_paid += interest_amount
-
-            conn.commit()
-
-            return {
-                "message": "Fixed deposit interest calculation completed successfully",
-                "processed_deposits": processed_count,
-                "total_interest_paid": float(total_interest_paid),
-                "calculation_date": current_date.isoformat()
-            }
 
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(
-            status_code=500, detail=f"Database error: {str(e)}")
-
-
-@router.post("/mature-fixed-deposits")
-def mature_fixed_deposits(conn=Depends(get_db), current_user=Depends(get_current_user)):
+@router.post("/mature-fixed-deposits", status_code=202)
+def mature_fixed_deposits(dry_run: bool = False, conn=Depends(get_db), current_user=Depends(get_current_user)):
     """
     Process matured fixed deposits by returning principal + final interest to savings account.
     Only admins can trigger this process.
+    With dry_run=true, reports what would be posted without writing anything.
+    Runs on the job queue: returns a job ID at once; poll GET /jobs/{job_id}.
     """
     user_type = current_user.get("type").lower()
     if user_type != "admin":
         raise HTTPException(
             status_code=403, detail="Only admins can process matured fixed deposits.")
 
-    try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-            current_date = datetime.now()
-
-            # Get all fixed deposits that have matured
-            cursor.execute("""
-                SELECT fd.fixed_deposit_id, fd.saving_account_id, fd.principal_amount, 
-                       fd.start_date, fd.end_date, fd.last_payout_date,
-                       fdp.interest_rate, fdp.months
-                FROM FixedDeposit fd
-                JOIN FixedDeposit_Plans fdp ON fd.f_plan_id = fdp.f_plan_id
-                WHERE fd.status = true AND fd.end_date <= %s
-            """, (current_date,))
-
-            matured_deposits = cursor.fetchall()
-            processed_count = 0
-            total_amount_returned = Decimal('0.00')
-
-            for fd in matured_deposits:
-                # Calculate any remaining interest from last payout to maturity
-                last_payout = fd['last_payout_date'] or fd['start_date']
-                days_remaining = (fd['end_date'] - last_payout).days
-
-                remaining_interest = Decimal('0.00')
-                if days_remaining > 0:
-                    # Convert interest rate from string to decimal
-                    interest_rate_str = fd['interest_rate'].replace('%', '')
-                    annual_interest_rate = Decimal(
-                        interest_rate_str) / Decimal('100')
-                    daily_interest_rate = annual_interest_rate / Decimal('365')
-
-                    # Calculate proportional interest for remaining days
-                    remaining_interest = fd['principal_amount'] * \
-                        daily_interest_rate * days_remaining
-
-                    # Round to 2 decimal places for currency precision
-                    remaining_interest = round_currency(remaining_interest)
-
-                # Total amount to return (principal + remaining interest)
-                total_return = fd['principal_amount'] + remaining_interest
-
-                # Round total return to 2 decimal places for currency precision
-                total_return = round_currency(total_return)
-
-                # Get a holder for this account
-                cursor.execute("""
-                    SELECT holder_id FROM AccountHolder WHERE saving_account_id = %s LIMIT 1
-                """, (fd['saving_account_id'],))
-                holder_row = cursor.fetchone()
-
-                if holder_row:
-                    # Add total amount to savings account
-                    cursor.execute("""
-                        UPDATE SavingsAccount 
-                        SET balance = balance + %s 
-                        WHERE saving_account_id = %s
-                    """, (total_return, fd['saving_account_id']))
-
-                    # Create maturity transaction
-                    transaction_data = TransactionsCreate(
-                        holder_id=holder_row['holder_id'],
-                        type=Trantype.deposit,
-                        amount=total_return,
-                        timestamp=current_date,
-                        description=f"Fixed deposit maturity - Principal: {fd['principal_amount']}, Interest: {remaining_interest} - FD ID: {fd['fixed_deposit_id']}"
-                    )
-
-                    # Record the transaction
-                    create_transaction(transaction_data, conn, current_user)
-
-                    # Mark fixed deposit as inactive/completed
-                    cursor.execute("""
-                        UPDATE FixedDeposit 
-                        SET status = false 
-                        WHERE fixed_deposit_id = %s
-                    """, (fd['fixed_deposit_id'],))
-
-                    processed_count += 1
-                    total_amount_returned += total_return
-
-            conn.commit()
-
-            return {
-                "message": "Fixed deposit maturity processing completed successfully",
-                "matured_deposits": processed_count,
-                "total_amount_returned": float(total_amount_returned),
-                "processing_date": current_date.isoformat()
-            }
-
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(
-            status_code=500, detail=f"Database error: {str(e)}")
+    return submit_manual_job("fd_maturity", dry_run, conn, current_user,
+                             "Fixed deposit maturity processing queued")
 
 
 @router.get("/savings-account-interest-report")
-def get_savings_account_interest_report(conn=Depends(get_db), current_user=Depends(get_current_user)):
+def get_savings_account_interest_report(conn=Depends(get_read_db), current_user=Depends(get_current_user)):
     """
     Generate a report showing savings accounts that haven't received interest this month.
     Uses vw_account_summary view for efficient querying.
@@ -847,9 +473,7 @@ def get_savings_account_interest_report(conn=Depends(get_db), current_user=Depen
             if user_type == "branch_manager":
                 # Get employee's branch
                 employee_id = current_user.get("employee_id")
-                cursor.execute(
-                    "SELECT branch_id FROM Employee WHERE employee_id = %s", (employee_id,))
-                employee = cursor.fetchone()
+                employee = get_employee_branch(cursor, employee_id)
                 if not employee:
                     raise HTTPException(status_code=404, detail="Employee not found")
                 
@@ -900,23 +524,25 @@ def get_savings_account_interest_report(conn=Depends(get_db), current_user=Depen
                     "customer_name": account['customer_name']
                 })
 
-            return {
+            return json_response({
                 "report_date": current_date.isoformat(),
                 "month_year": f"{current_month:02d}/{current_year}",
                 "total_accounts_pending": len(pending_accounts),
                 "total_potential_interest": float(total_potential_interest),
                 "accounts": report_data
-            }
+            })
 
     except HTTPException:
         raise
+    except QueryCanceledError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Database error: {str(e)}")
 
 
 @router.get("/fixed-deposit-interest-report")
-def get_fixed_deposit_interest_report(conn=Depends(get_db), current_user=Depends(get_current_user)):
+def get_fixed_deposit_interest_report(conn=Depends(get_read_db), current_user=Depends(get_current_user)):
     """
     Generate a report showing fixed deposits due for interest payment.
     For branch managers, only show deposits from their branch.
@@ -950,15 +576,13 @@ def get_fixed_deposit_interest_report(conn=Depends(get_db), current_user=Depends
                 FROM vw_fd_details
                 WHERE status = TRUE 
                 AND end_date > %s
-                AND EXTRACT(DAY FROM %s - COALESCE(last_payout_date, start_date)) >= 30
+                AND next_payout_date <= %s
             """
             
             if user_type == "branch_manager":
                 # Get employee's branch
                 employee_id = current_user.get("employee_id")
-                cursor.execute(
-                    "SELECT branch_id FROM Employee WHERE employee_id = %s", (employee_id,))
-                employee = cursor.fetchone()
+                employee = get_employee_branch(cursor, employee_id)
                 if not employee:
                     raise HTTPException(status_code=404, detail="Employee not found")
                 
@@ -1015,12 +639,97 @@ def get_fixed_deposit_interest_report(conn=Depends(get_db), current_user=Depends
                     "customer_name": fd['customer_name']
                 })
 
-            return {
+            return json_response({
                 "report_date": current_date.isoformat(),
                 "total_deposits_due": len(due_deposits),
                 "total_potential_interest": float(total_potential_interest),
                 "deposits": report_data
-            }
+            })
+
+    except HTTPException:
+        raise
+    except QueryCanceledError:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Database error: {str(e)}")
+
+
+@router.get("/interest-projection")
+def get_interest_projection(
+    months: int = Query(12, ge=1, le=60),
+    branch_id: Optional[str] = None,
+    conn=Depends(get_read_db),
+    current_user=Depends(get_current_user)
+):
+    """
+    Project savings interest, FD interest and FD maturities over the next `months`
+    months, broken down per branch and plan. Computed in bulk over the whole book,
+    so it is cheap enough to run on demand for treasury planning.
+    Branch managers only see their own branch.
+    """
+    user_type = current_user.get("type").lower()
+    if user_type not in ["admin", "branch_manager"]:
+        raise HTTPException(
+            status_code=403, detail="Only admins and branch managers can view interest projections.")
+
+    try:
+        if user_type == "branch_manager":
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                employee = get_employee_branch(cursor, current_user.get("employee_id"))
+            if not employee:
+                raise HTTPException(status_code=404, detail="Employee not found")
+            branch_id = employee['branch_id']
+
+        result = projection.project_interest(conn, months, branch_id)
+        logger.info(
+            f"Interest projection: {result['accounts']} accounts, {result['fixed_deposits']} FDs, "
+            f"{months} months in {result['elapsed_ms']}ms")
+        return json_response(result)
+
+    except HTTPException:
+        raise
+    except QueryCanceledError:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Database error: {str(e)}")
+
+
+@router.get("/job-runs")
+def get_job_runs(
+    job_name: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    days: int = Query(90, ge=1, le=730),
+    conn=Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """
+    Recent runs of the interest and maturity jobs with a duration trend per job:
+    the median of the last few successful runs against the runs before them,
+    flagged when a job is getting markedly slower.
+    """
+    user_type = current_user.get("type").lower()
+    if user_type not in ["admin", "branch_manager"]:
+        raise HTTPException(
+            status_code=403, detail="Only admins and branch managers can view job runs.")
+    if job_name and job_name not in interest.JOBS:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown job: {job_name}. Expected one of {', '.join(interest.JOBS)}")
+
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            runs = jobruns.recent_runs(cursor, days, job_name)
+
+        trends = {}
+        for name in ([job_name] if job_name else interest.JOBS):
+            trends[name] = jobruns.job_trend([r for r in runs if r['job_name'] == name])
+
+        return {
+            "days": days,
+            "trends": trends,
+            "runs": runs[:limit]
+        }
 
     except HTTPException:
         raise
@@ -2,6 +2,7 @@ from psycopg2.extras import RealDictCursor
 from fastapi import APIRouter, Depends, HTTPException
 from schemas import TransactionsCreate, TransactionsRead, TransactionsSearchResult, Trantype, AccountSearchRequest
 from database import get_db
+from fastjson import model_rows_response
 from auth import get_current_user
 from datetime import date
 from pydantic import BaseModel
@@ -102,8 +103,8 @@ def search_transactions_by_account(
             """, (holder_ids,))
             transactions = cursor.fetchall()
 
-            # Convert to TransactionsSearchResult format
-            return [TransactionsSearchResult(**dict(tx)) for tx in transactions]
+            # Rows already have the TransactionsSearchResult shape
+            return model_rows_response(transactions, TransactionsSearchResult)
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Database error: {str(e)}")
@@ -1,11 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from typing import Optional, Dict, Any
 from psycopg2.extras import RealDictCursor
-from database import get_db
+from psycopg2.extensions import QueryCanceledError
+from database import get_db, get_read_db, connect
+from fastjson import json_response
+import conditional
 from auth import get_current_user
+from cache import get_employee_branch
+import jobqueue
 
 router = APIRouter()
 
+# Change marker of the materialized view, for agents' conditional GETs
+MARK_INTEREST_SUMMARY = "SELECT bump_change_markers('interest_summary', ARRAY[NULL]::text[])"
+
 # ==================== Helper Functions ====================
 def get_user_context(current_user: Dict[str, Any], cursor) -> Dict[str, Any]:
     """Get user context including employee_id, branch_id, and type"""
@@ -20,11 +28,7 @@ def get_user_context(current_user: Dict[str, Any], cursor) -> Dict[str, Any]:
     
     # Get branch_id for agents and managers
     if employee_id and user_type in ['agent', 'branch_manager']:
-        cursor.execute(
-            "SELECT branch_id FROM Employee WHERE employee_id = %s",
-            (employee_id,)
-        )
-        result = cursor.fetchone()
+        result = get_employee_branch(cursor, employee_id)
         if result:
             context['branch_id'] = result['branch_id']
     
@@ -41,8 +45,9 @@ def check_user_access(user_type: str, allowed_types: list):
 # ==================== REPORT 1: Agent-wise Transaction Summary ====================
 @router.get("/report/agent-transactions")
 def get_agent_transaction_report(
+    request: Request,
     employee_id: Optional[str] = None,
-    conn=Depends(get_db),
+    conn=Depends(get_read_db),
     current_user=Depends(get_current_user)
 ):
     """
@@ -74,6 +79,12 @@ def get_agent_transaction_report(
             
             query += " ORDER BY total_value DESC"
 
+            validators = conditional.evaluate(
+                request, cursor, ("employees", "customers", "accounts", "transactions"),
+                context['branch_id'], current_user)
+            if validators.not_modified:
+                return validators.not_modified_response()
+
             cursor.execute(query, tuple(params))
             report = cursor.fetchall()
             
@@ -81,7 +92,7 @@ def get_agent_transaction_report(
             total_transactions = sum(row['total_transactions'] or 0 for row in report)
             total_value = sum(row['total_value'] or 0 for row in report)
             
-            return {
+            return validators.apply(json_response({
                 "success": True,
                 "report_name": "Agent-wise Transaction Summary",
                 "data": report,
@@ -91,19 +102,22 @@ def get_agent_transaction_report(
                     "total_value": float(total_value) if total_value else 0
                 },
                 "count": len(report)
-            }
+            }))
     
     except HTTPException:
         raise
+    except QueryCanceledError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 # ==================== REPORT 2: Account-wise Transaction Summary ====================
 @router.get("/report/account-transactions")
 def get_account_transaction_report(
+    request: Request,
     saving_account_id: Optional[str] = None,
     customer_id: Optional[str] = None,
-    conn=Depends(get_db),
+    conn=Depends(get_read_db),
     current_user=Depends(get_current_user)
 ):
     """
@@ -144,6 +158,12 @@ def get_account_transaction_report(
             
             query += " ORDER BY current_balance DESC, open_date DESC"
             
+            validators = conditional.evaluate(
+                request, cursor, ("accounts", "customers", "transactions"),
+                context['branch_id'], current_user)
+            if validators.not_modified:
+                return validators.not_modified_response()
+
             cursor.execute(query, tuple(params))
             report = cursor.fetchall()
             
@@ -151,7 +171,7 @@ def get_account_transaction_report(
             total_balance = sum(row['current_balance'] or 0 for row in report)
             total_accounts = len(report)
             
-            return {
+            return validators.apply(json_response({
                 "success": True,
                 "report_name": "Account-wise Transaction Summary",
                 "data": report,
@@ -161,17 +181,20 @@ def get_account_transaction_report(
                     "average_balance": float(total_balance / total_accounts) if total_accounts > 0 else 0
                 },
                 "count": len(report)
-            }
+            }))
     
     except HTTPException:
         raise
+    except QueryCanceledError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 # ==================== REPORT 3: Active Fixed Deposits with Payout Dates ====================
 @router.get("/report/active-fixed-deposits")
 def get_active_fd_report(
-    conn=Depends(get_db),
+    request: Request,
+    conn=Depends(get_read_db),
     current_user=Depends(get_current_user)
 ):
     """
@@ -203,6 +226,12 @@ def get_active_fd_report(
             
             query += " ORDER BY next_payout_date ASC NULLS LAST, start_date DESC"
             
+            validators = conditional.evaluate(
+                request, cursor, ("fixed_deposits", "accounts", "customers", "employees"),
+                context['branch_id'], current_user)
+            if validators.not_modified:
+                return validators.not_modified_response()
+
             cursor.execute(query, tuple(params))
             report = cursor.fetchall()
             
@@ -211,7 +240,7 @@ def get_active_fd_report(
             total_interest = sum(row['total_interest'] or 0 for row in report)
             pending_payouts = sum(1 for row in report if row['fd_status'] == 'Payout Pending')
             
-            return {
+            return validators.apply(json_response({
                 "success": True,
                 "report_name": "Active Fixed Deposits Report",
                 "data": report,
@@ -222,16 +251,19 @@ def get_active_fd_report(
                     "pending_payouts": pending_payouts
                 },
                 "count": len(report)
-            }
+            }))
     
     except HTTPException:
         raise
+    except QueryCanceledError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 # ==================== REPORT 4: Monthly Interest Distribution Summary ====================
 @router.get("/report/monthly-interest-distribution")
 def get_monthly_interest_distribution_report(
+    request: Request,
     year: Optional[int] = None,
     month: Optional[int] = None,
     conn=Depends(get_db),
@@ -248,9 +280,20 @@ def get_monthly_interest_distribution_report(
             
             check_user_access(user_type, ['agent', 'branch_manager', 'admin'])
             
+            # Managers and admins refresh the view below, so their copy only
+            # goes stale when the interest postings behind it change
+            scopes = ("transactions", "accounts", "customers")
+            if user_type not in ['branch_manager', 'admin']:
+                scopes += ("interest_summary",)
+            validators = conditional.evaluate(
+                request, cursor, scopes, context['branch_id'], current_user)
+            if validators.not_modified:
+                return validators.not_modified_response()
+
             # Refresh materialized view for managers and admins
             if user_type in ['branch_manager', 'admin']:
                 cursor.execute("REFRESH MATERIALIZED VIEW vw_monthly_interest_summary_mv")
+                cursor.execute(MARK_INTEREST_SUMMARY)
                 conn.commit()
             
             # Aggregate from materialized view
@@ -304,7 +347,7 @@ def get_monthly_interest_distribution_report(
             total_interest_paid = sum(row['total_interest_paid'] or 0 for row in report)
             total_accounts = sum(row['account_count'] or 0 for row in report)
             
-            return {
+            return validators.apply(json_response({
                 "success": True,
                 "report_name": "Monthly Interest Distribution Summary",
                 "data": report,
@@ -314,18 +357,21 @@ def get_monthly_interest_distribution_report(
                     "unique_months": len(set(row['month'] for row in report))
                 },
                 "count": len(report)
-            }
+            }))
     
     except HTTPException:
         raise
+    except QueryCanceledError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 # ==================== REPORT 5: Customer Activity Report ====================
 @router.get("/report/customer-activity")
 def get_customer_activity_report(
+    request: Request,
     customer_id: Optional[str] = None,
-    conn=Depends(get_db),
+    conn=Depends(get_read_db),
     current_user=Depends(get_current_user)
 ):
     """
@@ -362,6 +408,12 @@ def get_customer_activity_report(
             
             query += " ORDER BY current_total_balance DESC, net_change DESC"
             
+            validators = conditional.evaluate(
+                request, cursor, ("customers", "accounts", "transactions", "fixed_deposits"),
+                context['branch_id'], current_user)
+            if validators.not_modified:
+                return validators.not_modified_response()
+
             cursor.execute(query, tuple(params))
             report = cursor.fetchall()
             
@@ -370,7 +422,7 @@ def get_customer_activity_report(
             total_withdrawals = sum(row['total_withdrawals'] or 0 for row in report)
             total_balance = sum(row['current_total_balance'] or 0 for row in report)
             
-            return {
+            return validators.apply(json_response({
                 "success": True,
                 "report_name": "Customer Activity Report",
                 "data": report,
@@ -382,48 +434,75 @@ def get_customer_activity_report(
                     "net_flow": float(total_deposits - total_withdrawals) if (total_deposits and total_withdrawals) else 0
                 },
                 "count": len(report)
-            }
+            }))
     
     except HTTPException:
         raise
+    except QueryCanceledError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 # ==================== Utility: Refresh All Materialized Views ====================
-@router.post("/refresh-views")
+MATERIALIZED_VIEWS = [
+    "vw_monthly_interest_summary_mv"
+]
+
+
+def refresh_views_job(job: Dict[str, Any], progress) -> Dict[str, Any]:
+    """Job queue handler: refresh each materialized view, committing after each one."""
+    conn = connect()
+    try:
+        refreshed = []
+        with conn.cursor() as cursor:
+            for view in MATERIALIZED_VIEWS:
+                cursor.execute(f"REFRESH MATERIALIZED VIEW {view}")
+                cursor.execute(MARK_INTEREST_SUMMARY)
+                conn.commit()
+                refreshed.append(view)
+                progress(len(refreshed) / len(MATERIALIZED_VIEWS), f"Refreshed {view}")
+
+        return {
+            "success": True,
+            "message": "All materialized views refreshed successfully",
+            "refreshed_views": refreshed,
+            "refreshed_by": job['params'].get('user_type'),
+            "employee_id": job['params'].get('employee_id')
+        }
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+jobqueue.register("refresh_views", refresh_views_job)
+
+
+@router.post("/refresh-views", status_code=202)
 def refresh_materialized_views(
     conn=Depends(get_db),
     current_user=Depends(get_current_user)
 ):
-    """Refresh all materialized views - Only Branch Managers and Admins"""
+    """
+    Refresh all materialized views - Only Branch Managers and Admins.
+    Runs on the job queue: returns a job ID at once; poll GET /jobs/{job_id}.
+    """
     try:
         with conn.cursor() as cursor:
             context = get_user_context(current_user, cursor)
             user_type = context['type']
             
             check_user_access(user_type, ['branch_manager', 'admin'])
-            
-            materialized_views = [
-                "vw_monthly_interest_summary_mv"
-            ]
-            
-            refreshed = []
-            for view in materialized_views:
-                cursor.execute(f"REFRESH MATERIALIZED VIEW {view}")
-                refreshed.append(view)
-            
-            conn.commit()
-            
-            return {
-                "success": True,
-                "message": "All materialized views refreshed successfully",
-                "refreshed_views": refreshed,
-                "refreshed_by": user_type,
-                "employee_id": context['employee_id']
-            }
+
+        job = jobqueue.submit(conn, "refresh_views", {
+            "user_type": user_type,
+            "employee_id": context['employee_id']
+        }, current_user.get('username'))
+        return jobqueue.accepted(job, "Materialized view refresh queued")
     
     except HTTPException:
         raise
     except Exception as e:
         conn.rollback()
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")    
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -0,0 +1,104 @@
+-- ============================================================================
+-- Micro Banking System - Cache invalidation events
+-- ============================================================================
+-- Every API worker keeps small in-process caches (principals, employee ->
+-- branch, branches, savings and fixed deposit plans). These triggers publish
+-- a NOTIFY on the 'cache_invalidation' channel whenever one of the source
+-- rows changes, so each worker can evict the matching entries. NOTIFY is
+-- transactional: listeners only see the event once the change is committed.
+-- ============================================================================
+
+-- Generic change notifier. The trigger arguments name the key columns that
+-- are copied into the payload, e.g.
+--   {"table": "employee", "op": "UPDATE",
+--    "old": {"employee_id": "EMP103"}, "new": {"employee_id": "EMP103"}}
+CREATE OR REPLACE FUNCTION notify_cache_invalidation()
+RETURNS TRIGGER AS $$
+DECLARE
+    old_keys JSONB := NULL;
+    new_keys JSONB := NULL;
+BEGIN
+    IF TG_LEVEL = 'ROW' THEN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            SELECT jsonb_object_agg(k, to_jsonb(OLD) -> k)
+            INTO old_keys
+            FROM unnest(TG_ARGV) AS k;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            SELECT jsonb_object_agg(k, to_jsonb(NEW) -> k)
+            INTO new_keys
+            FROM unnest(TG_ARGV) AS k;
+        END IF;
+    END IF;
+
+    PERFORM pg_notify('cache_invalidation', jsonb_build_object(
+        'table', lower(TG_TABLE_NAME),
+        'op', TG_OP,
+        'old', old_keys,
+        'new', new_keys
+    )::text);
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS branch_cache_invalidation ON Branch;
+CREATE TRIGGER branch_cache_invalidation
+AFTER INSERT OR UPDATE OR DELETE ON Branch
+FOR EACH ROW
+EXECUTE FUNCTION notify_cache_invalidation('branch_id');
+
+DROP TRIGGER IF EXISTS employee_cache_invalidation ON Employee;
+CREATE TRIGGER employee_cache_invalidation
+AFTER INSERT OR UPDATE OR DELETE ON Employee
+FOR EACH ROW
+EXECUTE FUNCTION notify_cache_invalidation('employee_id');
+
+DROP TRIGGER IF EXISTS authentication_cache_invalidation ON Authentication;
+CREATE TRIGGER authentication_cache_invalidation
+AFTER INSERT OR UPDATE OR DELETE ON Authentication
+FOR EACH ROW
+EXECUTE FUNCTION notify_cache_invalidation('username', 'employee_id');
+
+DROP TRIGGER IF EXISTS savings_plan_cache_invalidation ON SavingsAccount_Plans;
+CREATE TRIGGER savings_plan_cache_invalidation
+AFTER INSERT OR UPDATE OR DELETE ON SavingsAccount_Plans
+FOR EACH ROW
+EXECUTE FUNCTION notify_cache_invalidation('s_plan_id');
+
+DROP TRIGGER IF EXISTS fd_plan_cache_invalidation ON FixedDeposit_Plans;
+CREATE TRIGGER fd_plan_cache_invalidation
+AFTER INSERT OR UPDATE OR DELETE ON FixedDeposit_Plans
+FOR EACH ROW
+EXECUTE FUNCTION notify_cache_invalidation('f_plan_id');
+
+-- TRUNCATE has no rows to describe, so it invalidates the whole table
+DROP TRIGGER IF EXISTS branch_cache_truncate ON Branch;
+CREATE TRIGGER branch_cache_truncate
+AFTER TRUNCATE ON Branch
+FOR EACH STATEMENT
+EXECUTE FUNCTION notify_cache_invalidation();
+
+DROP TRIGGER IF EXISTS employee_cache_truncate ON Employee;
+CREATE TRIGGER employee_cache_truncate
+AFTER TRUNCATE ON Employee
+FOR EACH STATEMENT
+EXECUTE FUNCTION notify_cache_invalidation();
+
+DROP TRIGGER IF EXISTS authentication_cache_truncate ON Authentication;
+CREATE TRIGGER authentication_cache_truncate
+AFTER TRUNCATE ON Authentication
+FOR EACH STATEMENT
+EXECUTE FUNCTION notify_cache_invalidation();
+
+DROP TRIGGER IF EXISTS savings_plan_cache_truncate ON SavingsAccount_Plans;
+CREATE TRIGGER savings_plan_cache_truncate
+AFTER TRUNCATE ON SavingsAccount_Plans
+FOR EACH STATEMENT
+EXECUTE FUNCTION notify_cache_invalidation();
+
+DROP TRIGGER IF EXISTS fd_plan_cache_truncate ON FixedDeposit_Plans;
+CREATE TRIGGER fd_plan_cache_truncate
+AFTER TRUNCATE ON FixedDeposit_Plans
+FOR EACH STATEMENT
+EXECUTE FUNCTION notify_cache_invalidation();
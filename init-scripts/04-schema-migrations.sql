@@ -0,0 +1,21 @@
+-- ============================================================================
+-- Micro Banking System - Schema version tracking
+-- ============================================================================
+-- One row per applied init script. The API's /ready endpoint compares the
+-- highest version with database.SCHEMA_VERSION, so a worker running newer
+-- code against an older schema reports itself as not ready.
+-- Every later script must insert its own row here.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    applied_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO schema_migrations (version, name) VALUES
+(1, '01-init-database'),
+(2, '02-seed-extra-data'),
+(3, '03-cache-invalidation'),
+(4, '04-schema-migrations')
+ON CONFLICT (version) DO NOTHING;
@@ -0,0 +1,40 @@
+-- ============================================================================
+-- Micro Banking System - Sequential transaction IDs and reference numbers
+-- ============================================================================
+-- set_transaction_id() and set_ref_number() used to draw random numbers in
+-- 10000..99999 and retry until unused. That costs an index probe per retry,
+-- gets slower as the table fills and loops forever once 90,000 rows exist.
+-- Both now come from sequences that start above the old random range.
+-- ============================================================================
+
+CREATE SEQUENCE IF NOT EXISTS transaction_id_seq;
+CREATE SEQUENCE IF NOT EXISTS transaction_ref_seq;
+
+SELECT setval('transaction_id_seq',
+              GREATEST(COALESCE((SELECT MAX(transaction_id) FROM Transactions), 0), 99999));
+SELECT setval('transaction_ref_seq',
+              GREATEST(COALESCE((SELECT MAX(ref_number) FROM Transactions), 0), 99999));
+
+CREATE OR REPLACE FUNCTION set_transaction_id()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.transaction_id IS NULL THEN
+        NEW.transaction_id := nextval('transaction_id_seq');
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION set_ref_number()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.ref_number IS NULL THEN
+        NEW.ref_number := nextval('transaction_ref_seq');
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+INSERT INTO schema_migrations (version, name) VALUES
+(5, '05-transaction-sequences')
+ON CONFLICT (version) DO NOTHING;
@@ -0,0 +1,32 @@
+-- ============================================================================
+-- Micro Banking System - Job run history
+-- ============================================================================
+-- One row per run of the interest and maturity jobs, scheduled or manual:
+-- when and where it ran, what it posted and how long it took. Backs
+-- GET /tasks/job-runs, which reports duration trends per job.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS JobRun (
+    run_id BIGSERIAL PRIMARY KEY,
+    job_name VARCHAR(50) NOT NULL,
+    trigger VARCHAR(20) NOT NULL CHECK (trigger IN ('scheduled', 'manual')),
+    triggered_by VARCHAR(50),
+    node VARCHAR(100) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'running'
+        CHECK (status IN ('running', 'succeeded', 'failed')),
+    started_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMP,
+    duration_ms NUMERIC(12, 1),
+    rows_processed INT,
+    total_interest NUMERIC(16, 2),
+    total_amount NUMERIC(16, 2),
+    partitions INT,
+    failed_partitions INT,
+    error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobrun_job_started ON JobRun(job_name, started_at DESC);
+
+INSERT INTO schema_migrations (version, name) VALUES
+(6, '06-job-runs')
+ON CONFLICT (version) DO NOTHING;
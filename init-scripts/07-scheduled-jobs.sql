@@ -0,0 +1,21 @@
+-- ============================================================================
+-- Micro Banking System - Persisted job schedules
+-- ============================================================================
+-- One row per automatic job with its cron expression and next run time.
+-- The scheduler sleeps until the earliest next_run_at and, after a restart,
+-- runs anything whose next_run_at passed while it was down.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS ScheduledJob (
+    job_name VARCHAR(50) PRIMARY KEY,
+    cron_expression VARCHAR(100) NOT NULL,
+    enabled BOOLEAN NOT NULL DEFAULT true,
+    next_run_at TIMESTAMP NOT NULL,
+    last_started_at TIMESTAMP,
+    last_finished_at TIMESTAMP,
+    last_status VARCHAR(20)
+);
+
+INSERT INTO schema_migrations (version, name) VALUES
+(7, '07-scheduled-jobs')
+ON CONFLICT (version) DO NOTHING;
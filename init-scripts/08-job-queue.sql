@@ -0,0 +1,50 @@
+-- ============================================================================
+-- Micro Banking System - Durable job queue
+-- ============================================================================
+-- Long-running admin operations (interest runs, maturity processing, view
+-- refreshes) are queued here and executed by worker threads in the API
+-- processes. Workers claim jobs with FOR UPDATE SKIP LOCKED and are woken
+-- by NOTIFY on the job_queue channel.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS JobQueue (
+    job_id BIGSERIAL PRIMARY KEY,
+    kind VARCHAR(50) NOT NULL,
+    params JSONB NOT NULL DEFAULT '{}',
+    status VARCHAR(20) NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'succeeded', 'failed')),
+    progress NUMERIC(5, 2) NOT NULL DEFAULT 0,
+    progress_message VARCHAR(200),
+    result JSONB,
+    error TEXT,
+    attempts INT NOT NULL DEFAULT 0,
+    submitted_by VARCHAR(50),
+    submitted_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    worker VARCHAR(100),
+    heartbeat_at TIMESTAMP
+);
+
+-- Workers only ever scan the queued and running jobs
+CREATE INDEX IF NOT EXISTS idx_jobqueue_queued ON JobQueue(job_id) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS idx_jobqueue_running ON JobQueue(heartbeat_at) WHERE status = 'running';
+CREATE INDEX IF NOT EXISTS idx_jobqueue_submitted ON JobQueue(submitted_at DESC);
+
+CREATE OR REPLACE FUNCTION notify_job_queued()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('job_queue', NEW.job_id::text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS job_queued_trigger ON JobQueue;
+CREATE TRIGGER job_queued_trigger
+AFTER INSERT ON JobQueue
+FOR EACH ROW
+EXECUTE FUNCTION notify_job_queued();
+
+INSERT INTO schema_migrations (version, name) VALUES
+(8, '08-job-queue')
+ON CONFLICT (version) DO NOTHING;
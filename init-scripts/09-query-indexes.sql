@@ -0,0 +1,56 @@
+-- ============================================================================
+-- Micro Banking System - Indexes for the hot query shapes
+-- ============================================================================
+-- Composite and partial indexes matching the predicates the API and the
+-- interest jobs actually run. Built CONCURRENTLY so the migration can be
+-- applied to a live database without blocking writes; each statement runs
+-- on its own, outside a transaction block (psql -f does this by default).
+--
+-- Before/after plans against a generated dataset:
+--     python -m perf.explain_indexes --scale 100k
+-- ============================================================================
+
+-- FD interest and maturity jobs: status = true AND end_date > / <= now.
+-- Only active deposits are ever scanned, so the index skips closed ones.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_fd_active_end_date
+    ON FixedDeposit(end_date) WHERE status = true;
+
+-- create_fixed_deposit's "already has an active FD" check, the FD list of
+-- an account and the FD -> account joins of the jobs
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_fd_account_status
+    ON FixedDeposit(saving_account_id, status);
+
+-- Holders of an account: account and transaction lookups, joint accounts,
+-- and the jobs' MIN(holder_id) per account, answered from the index alone
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_holder_account
+    ON AccountHolder(saving_account_id, holder_id);
+
+-- Branch account lists, joint accounts by branch, job partitioning
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_savings_branch_status
+    ON SavingsAccount(branch_id, status);
+
+-- Transaction history of holders, newest first. Replaces the holder_id
+-- index: same leading column, and the ORDER BY needs no sort.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transaction_holder_time
+    ON Transactions(holder_id, timestamp DESC);
+DROP INDEX CONCURRENTLY IF EXISTS idx_transaction_holder_id;
+
+-- "Interest already paid this month" checks of the interest jobs. Partial
+-- on type: interest postings are a small share of all transactions, so
+-- this is far smaller than a (holder_id, type, timestamp) index.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transaction_interest
+    ON Transactions(holder_id, timestamp) WHERE type = 'Interest';
+
+-- Report date ranges; transactions are inserted in time order, so a BRIN
+-- index stays a few pages at any size
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transaction_time_brin
+    ON Transactions USING brin(timestamp);
+
+ANALYZE FixedDeposit;
+ANALYZE AccountHolder;
+ANALYZE SavingsAccount;
+ANALYZE Transactions;
+
+INSERT INTO schema_migrations (version, name)
+VALUES (9, '09-query-indexes')
+ON CONFLICT (version) DO NOTHING;
@@ -0,0 +1,61 @@
+-- ============================================================================
+-- Micro Banking System - Fixed deposit payout schedule
+-- ============================================================================
+-- next_payout_at is when the interest or maturity job next has something to
+-- pay on a deposit: 30 days after the last payout, or the end date if that
+-- comes first. NULL once the deposit is closed. It is a stored generated
+-- column, so FD creation, interest payouts and maturity settlement keep it
+-- current by writing the columns it derives from, and "which FDs are due"
+-- becomes a range scan over the due rows only.
+-- ============================================================================
+
+ALTER TABLE FixedDeposit ADD COLUMN IF NOT EXISTS next_payout_at timestamp
+    GENERATED ALWAYS AS (
+        CASE WHEN status THEN
+            LEAST(COALESCE(last_payout_date, start_date) + INTERVAL '30 days', end_date)
+        END
+    ) STORED;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_fd_next_payout
+    ON FixedDeposit(next_payout_at) WHERE next_payout_at IS NOT NULL;
+
+-- Read the schedule instead of recomputing it per row
+CREATE OR REPLACE VIEW vw_fd_details AS
+SELECT
+    fd.fixed_deposit_id,
+    fd.saving_account_id,
+    fd.start_date,
+    fd.end_date,
+    fd.principal_amount,
+    fd.interest_payment_type,
+    fd.last_payout_date,
+    fd.status,
+    fd.next_payout_at AS next_payout_date,
+    fdp.f_plan_id,
+    fdp.months AS plan_months,
+    fdp.interest_rate,
+    (fd.principal_amount * fdp.interest_rate / 100) AS total_interest,
+    sa.branch_id,
+    b.branch_name,
+    c.customer_id,
+    c.name AS customer_name,
+    c.nic AS customer_nic,
+    e.employee_id AS agent_id,
+    e.name AS agent_name,
+    CASE
+        WHEN fd.end_date < CURRENT_DATE THEN 'Matured'
+        WHEN fd.next_payout_at < CURRENT_DATE THEN 'Payout Pending'
+        ELSE 'Active'
+    END AS fd_status
+FROM FixedDeposit fd
+JOIN FixedDeposit_Plans fdp ON fd.f_plan_id = fdp.f_plan_id
+JOIN SavingsAccount sa ON fd.saving_account_id = sa.saving_account_id
+JOIN Branch b ON sa.branch_id = b.branch_id
+JOIN AccountHolder ah ON sa.saving_account_id = ah.saving_account_id
+JOIN Customer c ON ah.customer_id = c.customer_id
+JOIN Employee e ON c.employee_id = e.employee_id
+WHERE fd.status = TRUE;
+
+INSERT INTO schema_migrations (version, name) VALUES
+(10, '10-fd-next-payout')
+ON CONFLICT (version) DO NOTHING;
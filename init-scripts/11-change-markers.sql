@@ -0,0 +1,251 @@
+-- ============================================================================
+-- Micro Banking System - Change markers for conditional GETs
+-- ============================================================================
+-- One version counter per (scope, branch) that statement-level triggers
+-- bump whenever rows of that scope change in that branch. List and report
+-- endpoints hash the markers they depend on into an ETag, so a dashboard
+-- revalidating unchanged data gets a 304 after one lookup in this small
+-- table instead of the full query.
+--
+-- Scopes:
+--   customers       Customer, by the branch of the customer's agent
+--   accounts        SavingsAccount (except balance) and AccountHolder
+--   fixed_deposits  FixedDeposit, by the branch of the savings account
+--   transactions    Transactions inserts; every balance change posts one,
+--                   so this also covers SavingsAccount.balance
+--   employees       Employee (except last_login_time)
+--   interest_summary  refreshes of vw_monthly_interest_summary_mv, global
+--
+-- Each counter is striped over 16 rows picked by backend PID, so postings
+-- in the same branch rarely wait on each other's marker row lock. Readers
+-- sum the stripes; versions only grow, so the sum changes on every bump.
+-- Global scopes and rows without a branch use branch_id '*'. Plans are
+-- served from the in-process plan cache and validated by content instead.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS change_markers (
+    scope varchar(30) NOT NULL,
+    branch_id varchar(7) NOT NULL,
+    shard smallint NOT NULL,
+    version bigint NOT NULL,
+    changed_at timestamptz NOT NULL,
+    PRIMARY KEY (scope, branch_id, shard)
+);
+
+CREATE OR REPLACE FUNCTION bump_change_markers(p_scope text, p_branches text[])
+RETURNS void AS $$
+    -- Fixed order, so two statements bumping the same branches cannot deadlock
+    INSERT INTO change_markers AS m (scope, branch_id, shard, version, changed_at)
+    SELECT p_scope, branch, pg_backend_pid() % 16, 1, clock_timestamp()
+    FROM (
+        SELECT DISTINCT COALESCE(rtrim(b), '*') AS branch FROM unnest(p_branches) AS b
+    ) branches
+    ORDER BY branch
+    ON CONFLICT (scope, branch_id, shard)
+    DO UPDATE SET version = m.version + 1, changed_at = EXCLUDED.changed_at;
+$$ LANGUAGE sql;
+
+-- Statement-level trigger functions. INSERT and DELETE triggers expose the
+-- affected rows as changed_rows; UPDATE triggers expose the new rows as
+-- changed_rows and the old ones as old_rows, so moves mark both branches.
+
+CREATE OR REPLACE FUNCTION mark_customer_changes()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        PERFORM bump_change_markers('customers', ARRAY(
+            SELECT e.branch_id::text FROM old_rows c
+            LEFT JOIN Employee e ON e.employee_id = c.employee_id
+            UNION
+            SELECT e.branch_id::text FROM changed_rows c
+            LEFT JOIN Employee e ON e.employee_id = c.employee_id));
+    ELSE
+        PERFORM bump_change_markers('customers', ARRAY(
+            SELECT e.branch_id::text FROM changed_rows c
+            LEFT JOIN Employee e ON e.employee_id = c.employee_id));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION mark_account_changes()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_change_markers('accounts', ARRAY(SELECT branch_id::text FROM changed_rows));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Row level, for updates filtered by a WHEN clause; the argument names the scope
+CREATE OR REPLACE FUNCTION mark_row_branch_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_change_markers(TG_ARGV[0], ARRAY[OLD.branch_id::text, NEW.branch_id::text]);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION mark_holder_changes()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_change_markers('accounts', ARRAY(
+        SELECT sa.branch_id::text FROM changed_rows h
+        JOIN SavingsAccount sa ON sa.saving_account_id = h.saving_account_id));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION mark_fixed_deposit_changes()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        PERFORM bump_change_markers('fixed_deposits', ARRAY(
+            SELECT sa.branch_id::text FROM old_rows fd
+            JOIN SavingsAccount sa ON sa.saving_account_id = fd.saving_account_id
+            UNION
+            SELECT sa.branch_id::text FROM changed_rows fd
+            JOIN SavingsAccount sa ON sa.saving_account_id = fd.saving_account_id));
+    ELSE
+        PERFORM bump_change_markers('fixed_deposits', ARRAY(
+            SELECT sa.branch_id::text FROM changed_rows fd
+            JOIN SavingsAccount sa ON sa.saving_account_id = fd.saving_account_id));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION mark_transaction_changes()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_change_markers('transactions', ARRAY(
+        SELECT DISTINCT sa.branch_id::text FROM changed_rows t
+        JOIN AccountHolder ah ON ah.holder_id = t.holder_id
+        JOIN SavingsAccount sa ON sa.saving_account_id = ah.saving_account_id));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION mark_employee_changes()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_change_markers('employees', ARRAY(SELECT branch_id::text FROM changed_rows));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Customer
+DROP TRIGGER IF EXISTS customer_change_marker_insert ON Customer;
+CREATE TRIGGER customer_change_marker_insert
+AFTER INSERT ON Customer
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION mark_customer_changes();
+
+DROP TRIGGER IF EXISTS customer_change_marker_update ON Customer;
+CREATE TRIGGER customer_change_marker_update
+AFTER UPDATE ON Customer
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS changed_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION mark_customer_changes();
+
+DROP TRIGGER IF EXISTS customer_change_marker_delete ON Customer;
+CREATE TRIGGER customer_change_marker_delete
+AFTER DELETE ON Customer
+REFERENCING OLD TABLE AS changed_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION mark_customer_changes();
+
+-- SavingsAccount: balance-only updates are covered by the transactions scope
+DROP TRIGGER IF EXISTS account_change_marker_insert ON SavingsAccount;
+CREATE TRIGGER account_change_marker_insert
+AFTER INSERT ON SavingsAccount
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION mark_account_changes();
+
+DROP TRIGGER IF EXISTS account_change_marker_update ON SavingsAccount;
+CREATE TRIGGER account_change_marker_update
+AFTER UPDATE ON SavingsAccount
+FOR EACH ROW
+WHEN ((OLD.status, OLD.branch_id, OLD.s_plan_id, OLD.employee_id, OLD.open_date)
+      IS DISTINCT FROM (NEW.status, NEW.branch_id, NEW.s_plan_id, NEW.employee_id, NEW.open_date))
+EXECUTE FUNCTION mark_row_branch_change('accounts');
+
+DROP TRIGGER IF EXISTS account_change_marker_delete ON SavingsAccount;
+CREATE TRIGGER account_change_marker_delete
+AFTER DELETE ON SavingsAccount
+REFERENCING OLD TABLE AS changed_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION mark_account_changes();
+
+-- AccountHolder
+DROP TRIGGER IF EXISTS holder_change_marker_insert ON AccountHolder;
+CREATE TRIGGER holder_change_marker_insert
+AFTER INSERT ON AccountHolder
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION mark_holder_changes();
+
+DROP TRIGGER IF EXISTS holder_change_marker_delete ON AccountHolder;
+CREATE TRIGGER holder_change_marker_delete
+AFTER DELETE ON AccountHolder
+REFERENCING OLD TABLE AS changed_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION mark_holder_changes();
+
+-- FixedDeposit
+DROP TRIGGER IF EXISTS fd_change_marker_insert ON FixedDeposit;
+CREATE TRIGGER fd_change_marker_insert
+AFTER INSERT ON FixedDeposit
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION mark_fixed_deposit_changes();
+
+DROP TRIGGER IF EXISTS fd_change_marker_update ON FixedDeposit;
+CREATE TRIGGER fd_change_marker_update
+AFTER UPDATE ON FixedDeposit
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS changed_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION mark_fixed_deposit_changes();
+
+DROP TRIGGER IF EXISTS fd_change_marker_delete ON FixedDeposit;
+CREATE TRIGGER fd_change_marker_delete
+AFTER DELETE ON FixedDeposit
+REFERENCING OLD TABLE AS changed_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION mark_fixed_deposit_changes();
+
+-- Transactions are append-only
+DROP TRIGGER IF EXISTS transaction_change_marker_insert ON Transactions;
+CREATE TRIGGER transaction_change_marker_insert
+AFTER INSERT ON Transactions
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION mark_transaction_changes();
+
+-- Employee: logins only touch last_login_time and are not marked
+DROP TRIGGER IF EXISTS employee_change_marker_insert ON Employee;
+CREATE TRIGGER employee_change_marker_insert
+AFTER INSERT ON Employee
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION mark_employee_changes();
+
+DROP TRIGGER IF EXISTS employee_change_marker_update ON Employee;
+CREATE TRIGGER employee_change_marker_update
+AFTER UPDATE ON Employee
+FOR EACH ROW
+WHEN ((OLD.name, OLD.status, OLD.branch_id, OLD.type)
+      IS DISTINCT FROM (NEW.name, NEW.status, NEW.branch_id, NEW.type))
+EXECUTE FUNCTION mark_row_branch_change('employees');
+
+DROP TRIGGER IF EXISTS employee_change_marker_delete ON Employee;
+CREATE TRIGGER employee_change_marker_delete
+AFTER DELETE ON Employee
+REFERENCING OLD TABLE AS changed_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION mark_employee_changes();
+
+INSERT INTO schema_migrations (version, name) VALUES
+(11, '11-change-markers')
+ON CONFLICT (version) DO NOTHING;
@@ -0,0 +1,159 @@
+-- ============================================================================
+-- Micro Banking System - Live events for dashboard streams
+-- ============================================================================
+-- Postings, balance changes and job completions are published on the
+-- 'live_events' NOTIFY channel. Each API worker holds one LISTEN connection
+-- (notifications.py) and fans the events out to its server-sent event
+-- streams, filtered by the caller's branch or portfolio. NOTIFY is
+-- transactional, so only committed changes are ever pushed.
+--
+-- The triggers are per statement: one touching more than 20 rows publishes
+-- one 'bulk' event per branch instead of one event per row, and the
+-- dashboards refetch on those. The interest and maturity jobs post up to
+-- 1000 postings per statement (interest.POSTING_BATCH_SIZE), so only their
+-- smallest partitions send per-row events. Code posting row by row sends
+-- an event per row. Every event carries branch_id and agent_id (the
+-- employee managing the account) for routing.
+--
+-- A transaction that sent notifications takes a cluster-wide lock while it
+-- queues them at commit, so postings serialize briefly on it. The bulk
+-- events keep that cost flat for batch jobs.
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION notify_transactions_posted()
+RETURNS TRIGGER AS $$
+DECLARE
+    posted INT;
+BEGIN
+    SELECT COUNT(*) INTO posted FROM changed_rows;
+    IF posted <= 20 THEN
+        PERFORM pg_notify('live_events', jsonb_build_object(
+            'type', 'transaction',
+            'transaction_id', t.transaction_id,
+            'holder_id', rtrim(t.holder_id),
+            'saving_account_id', rtrim(sa.saving_account_id),
+            'transaction_type', t.type,
+            'amount', t.amount,
+            'timestamp', t.timestamp,
+            'description', t.description,
+            'branch_id', rtrim(sa.branch_id),
+            'agent_id', rtrim(sa.employee_id)
+        )::text)
+        FROM changed_rows t
+        JOIN AccountHolder ah ON ah.holder_id = t.holder_id
+        JOIN SavingsAccount sa ON sa.saving_account_id = ah.saving_account_id;
+    ELSE
+        PERFORM pg_notify('live_events', jsonb_build_object(
+            'type', 'bulk', 'kind', 'transaction', 'branch_id', branch_id, 'count', rows
+        )::text)
+        FROM (
+            SELECT rtrim(sa.branch_id) AS branch_id, COUNT(*) AS rows
+            FROM changed_rows t
+            JOIN AccountHolder ah ON ah.holder_id = t.holder_id
+            JOIN SavingsAccount sa ON sa.saving_account_id = ah.saving_account_id
+            GROUP BY sa.branch_id
+        ) per_branch;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION notify_balance_changes()
+RETURNS TRIGGER AS $$
+DECLARE
+    changed INT;
+BEGIN
+    SELECT COUNT(*) INTO changed
+    FROM changed_rows n
+    JOIN old_rows o ON o.saving_account_id = n.saving_account_id
+    WHERE n.balance IS DISTINCT FROM o.balance;
+
+    IF changed = 0 THEN
+        RETURN NULL;
+    ELSIF changed <= 20 THEN
+        PERFORM pg_notify('live_events', jsonb_build_object(
+            'type', 'balance',
+            'saving_account_id', rtrim(n.saving_account_id),
+            'balance', n.balance,
+            'previous_balance', o.balance,
+            'branch_id', rtrim(n.branch_id),
+            'agent_id', rtrim(n.employee_id)
+        )::text)
+        FROM changed_rows n
+        JOIN old_rows o ON o.saving_account_id = n.saving_account_id
+        WHERE n.balance IS DISTINCT FROM o.balance;
+    ELSE
+        PERFORM pg_notify('live_events', jsonb_build_object(
+            'type', 'bulk', 'kind', 'balance', 'branch_id', branch_id, 'count', rows
+        )::text)
+        FROM (
+            SELECT rtrim(n.branch_id) AS branch_id, COUNT(*) AS rows
+            FROM changed_rows n
+            JOIN old_rows o ON o.saving_account_id = n.saving_account_id
+            WHERE n.balance IS DISTINCT FROM o.balance
+            GROUP BY n.branch_id
+        ) per_branch;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION notify_job_finished()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'jobqueue' THEN
+        PERFORM pg_notify('live_events', jsonb_build_object(
+            'type', 'job',
+            'job_id', NEW.job_id,
+            'kind', NEW.kind,
+            'status', NEW.status,
+            'error', left(NEW.error, 200),
+            'submitted_by', NEW.submitted_by
+        )::text);
+    ELSE
+        PERFORM pg_notify('live_events', jsonb_build_object(
+            'type', 'job_run',
+            'run_id', NEW.run_id,
+            'job_name', NEW.job_name,
+            'trigger', NEW.trigger,
+            'status', NEW.status,
+            'rows_processed', NEW.rows_processed,
+            'duration_ms', NEW.duration_ms,
+            'submitted_by', NEW.triggered_by
+        )::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS transactions_live_events ON Transactions;
+CREATE TRIGGER transactions_live_events
+AFTER INSERT ON Transactions
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION notify_transactions_posted();
+
+DROP TRIGGER IF EXISTS balance_live_events ON SavingsAccount;
+CREATE TRIGGER balance_live_events
+AFTER UPDATE ON SavingsAccount
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS changed_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION notify_balance_changes();
+
+DROP TRIGGER IF EXISTS jobqueue_live_events ON JobQueue;
+CREATE TRIGGER jobqueue_live_events
+AFTER UPDATE OF status ON JobQueue
+FOR EACH ROW
+WHEN (OLD.status IS DISTINCT FROM NEW.status AND NEW.status IN ('succeeded', 'failed'))
+EXECUTE FUNCTION notify_job_finished();
+
+DROP TRIGGER IF EXISTS jobrun_live_events ON JobRun;
+CREATE TRIGGER jobrun_live_events
+AFTER UPDATE OF status ON JobRun
+FOR EACH ROW
+WHEN (OLD.status = 'running' AND NEW.status <> 'running')
+EXECUTE FUNCTION notify_job_finished();
+
+INSERT INTO schema_migrations (version, name) VALUES
+(13, '13-live-events')
+ON CONFLICT (version) DO NOTHING;
@@ -0,0 +1,91 @@
+-- ============================================================================
+-- Micro Banking System - Bulk customer onboarding
+-- ============================================================================
+-- An uploaded CSV is COPYed into CustomerImportRow as text, one batch per
+-- upload, so nothing is rejected before every row can be reported on. A
+-- queued job then validates the batch in a few set-based statements,
+-- allocates customer IDs for the accepted rows in one range and inserts
+-- them into Customer in a single transaction. Rejected rows keep their
+-- error for the downloadable report.
+--
+-- Staged rows are UNLOGGED: they are only an intermediate copy of the
+-- upload. After a server crash the rows of unfinished batches are gone and
+-- the file has to be uploaded again.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS CustomerImport (
+    batch_id BIGSERIAL PRIMARY KEY,
+    submitted_by VARCHAR(50),
+    -- Branch managers may only assign customers to agents of their branch
+    branch_id CHAR(7),
+    default_employee_id CHAR(10),
+    all_or_nothing BOOLEAN NOT NULL DEFAULT FALSE,
+    status VARCHAR(20) NOT NULL DEFAULT 'staged'
+        CHECK (status IN ('staged', 'merged', 'rejected', 'failed')),
+    rows_staged INT NOT NULL DEFAULT 0,
+    rows_merged INT,
+    rows_rejected INT,
+    first_customer_id CHAR(10),
+    last_customer_id CHAR(10),
+    error TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMP
+);
+
+-- batch_id comes from the session so COPY can fill it without a column in
+-- the file (see onboarding.stage_upload)
+CREATE UNLOGGED TABLE IF NOT EXISTS CustomerImportRow (
+    batch_id BIGINT NOT NULL DEFAULT current_setting('onboarding.batch_id')::BIGINT,
+    row_id BIGINT GENERATED ALWAYS AS IDENTITY,
+    row_no INT,
+    name TEXT,
+    nic TEXT,
+    phone_number TEXT,
+    address TEXT,
+    date_of_birth TEXT,
+    email TEXT,
+    employee_id TEXT,
+    error TEXT,
+    customer_id CHAR(10),
+    PRIMARY KEY (batch_id, row_id)
+);
+
+-- True for a YYYY-MM-DD string naming a real day; PostgreSQL 15 has no
+-- pg_input_is_valid() and a failing cast would abort the whole batch
+CREATE OR REPLACE FUNCTION is_iso_date(value TEXT)
+RETURNS BOOLEAN AS $$
+    SELECT CASE
+        WHEN value !~ '^[12][0-9]{3}-(0[1-9]|1[0-2])-(0[1-9]|[12][0-9]|3[01])$' THEN FALSE
+        ELSE substr(value, 9, 2)::INT <= extract(DAY FROM
+            make_date(substr(value, 1, 4)::INT, substr(value, 6, 2)::INT, 1)
+            + INTERVAL '1 month - 1 day')
+    END
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Bulk imports allocate their own range of IDs; single inserts still get the next one
+CREATE OR REPLACE FUNCTION set_customer_id()
+RETURNS TRIGGER AS $$
+DECLARE
+    new_id TEXT;
+    max_num INT;
+BEGIN
+    IF NEW.customer_id IS NOT NULL THEN
+        RETURN NEW;
+    END IF;
+
+    -- Get the highest existing customer number and add 1
+    SELECT COALESCE(MAX(CAST(TRIM(SUBSTRING(customer_id FROM 5)) AS INT)), 0) + 1
+    INTO max_num
+    FROM Customer
+    WHERE customer_id LIKE 'CUST%';
+
+    new_id := 'CUST' || LPAD(max_num::text, 3, '0');
+    NEW.customer_id := new_id;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+INSERT INTO schema_migrations (version, name) VALUES
+(14, '14-customer-import')
+ON CONFLICT (version) DO NOTHING;
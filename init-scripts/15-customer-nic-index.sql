@@ -0,0 +1,15 @@
+-- ============================================================================
+-- Micro Banking System - Customer NIC index
+-- ============================================================================
+-- Serves the duplicate-NIC checks of bulk customer imports
+-- (14-customer-import.sql) and customer search by NIC. Kept apart from
+-- migration 14 so that one can run as a single transaction while this
+-- builds CONCURRENTLY, outside a transaction block, without blocking
+-- writes to Customer.
+-- ============================================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_customer_nic ON Customer(nic);
+
+INSERT INTO schema_migrations (version, name) VALUES
+(15, '15-customer-nic-index')
+ON CONFLICT (version) DO NOTHING;
@@ -0,0 +1,32 @@
+-- ============================================================================
+-- Micro Banking System - Deferred change markers for batch jobs
+-- ============================================================================
+-- A marker bump locks its (scope, branch, stripe) row until the bumping
+-- transaction commits. The interest and maturity jobs commit once per
+-- partition, so bumping from their triggers held the branch's markers for
+-- the whole run: postings on the same stripe waited for it and could
+-- deadlock with it on account rows.
+--
+-- A transaction that sets change_markers.deferred to 'on' (set_config(...,
+-- true), so it ends with the transaction) makes the triggers skip the bump;
+-- it must bump the branches it touched itself, as its last statement
+-- before COMMIT (see interest.mark_changes).
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION bump_change_markers(p_scope text, p_branches text[])
+RETURNS void AS $$
+    -- Fixed order, so two statements bumping the same branches cannot deadlock
+    INSERT INTO change_markers AS m (scope, branch_id, shard, version, changed_at)
+    SELECT p_scope, branch, pg_backend_pid() % 16, 1, clock_timestamp()
+    FROM (
+        SELECT DISTINCT COALESCE(rtrim(b), '*') AS branch FROM unnest(p_branches) AS b
+    ) branches
+    WHERE COALESCE(current_setting('change_markers.deferred', true), '') <> 'on'
+    ORDER BY branch
+    ON CONFLICT (scope, branch_id, shard)
+    DO UPDATE SET version = m.version + 1, changed_at = EXCLUDED.changed_at;
+$$ LANGUAGE sql;
+
+INSERT INTO schema_migrations (version, name) VALUES
+(16, '16-deferred-change-markers')
+ON CONFLICT (version) DO NOTHING;
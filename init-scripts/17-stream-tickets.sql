@@ -0,0 +1,24 @@
+-- ============================================================================
+-- Micro Banking System - Stream tickets for live event streams
+-- ============================================================================
+-- EventSource cannot send an Authorization header, so browsers open
+-- /events/stream with a ticket in the query string instead of the access
+-- token, which would end up in access and proxy logs. A ticket is issued
+-- to an authenticated caller by POST /events/ticket, is valid for a few
+-- seconds and is deleted when a stream redeems it. Only its SHA-256 is
+-- stored. Any API worker can redeem a ticket issued by another.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS StreamTicket (
+    ticket_hash CHAR(64) PRIMARY KEY,
+    username VARCHAR(30) NOT NULL REFERENCES Authentication(username) ON DELETE CASCADE,
+    -- The stream ends when the access token the ticket was issued for does
+    token_expires_at TIMESTAMPTZ,
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_stream_ticket_expires ON StreamTicket(expires_at);
+
+INSERT INTO schema_migrations (version, name) VALUES
+(17, '17-stream-tickets')
+ON CONFLICT (version) DO NOTHING;